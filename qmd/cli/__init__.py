@@ -3,17 +3,21 @@
 This module exports:
 - Context: CLI context class
 - _index_collection: Helper function for indexing
+- format_scan_stats: Console summary of a collection scan
+- jobs_option: Shared --jobs option for crawling commands
 - check_virtual_env: Virtual environment check helper
 - console: Rich console for output
 """
 
 import os
+from typing import Iterable, Optional
 
+import click
 from rich.console import Console
 from rich.table import Table
 
 from qmd.database.manager import DatabaseManager
-from qmd.index.crawler import Crawler
+from qmd.index.crawler import Crawler, ScanStats
 from qmd.models.config import AppConfig, CollectionConfig
 
 console = Console()
@@ -27,17 +31,62 @@ class Context:
         self.db = DatabaseManager(self.config.db_path)
 
 
-def _index_collection(col: CollectionConfig, db: DatabaseManager) -> int:
-    """Scan and upsert all documents for a single collection. Returns indexed count."""
-    crawler = Crawler(col.path, col.glob_pattern)
-    count = 0
-    for rel_path, content, doc_hash, title in crawler.scan():
-        context_text = db.get_context_for_path(col.name, rel_path)
-        db.upsert_document(
-            col.name, rel_path, doc_hash, title, content, context=context_text
-        )
-        count += 1
-    return count
+def _index_collection(
+    col: CollectionConfig,
+    db: DatabaseManager,
+    jobs: Optional[int] = None,
+    paths: Optional[Iterable[str]] = None,
+) -> ScanStats:
+    """Scan and upsert changed documents for a single collection.
+
+    Unchanged files (same size/mtime/inode as the persisted stat cache) are
+    skipped without being read; documents whose files vanished are marked
+    inactive. ``jobs`` sets the crawler's read/hash threads (default: CPU
+    count). ``paths`` limits the scan to those relative paths (``qmd watch``)
+    instead of walking the collection. Returns the scan's added/modified/
+    deleted counts.
+    """
+    crawler = Crawler(
+        col.path,
+        col.glob_pattern,
+        stat_cache=db.get_file_stats(col.name),
+        jobs=jobs,
+        ordered=False,
+    )
+    # One connection and batched commits for the whole collection
+    with db.bulk_session() as session:
+        session.upsert_documents(col.name, crawler.scan(paths))
+        session.save_file_stats(col.name, crawler.updated_stats, crawler.deleted_paths)
+        if paths is not None:
+            crawler.stats.deleted = session.deactivate_documents(
+                col.name, crawler.deleted_paths
+            )
+        elif crawler.completed:
+            # Set-difference sweep: documents no longer on disk leave the search path
+            crawler.stats.deleted = session.deactivate_missing_documents(
+                col.name, crawler.seen_paths
+            )
+    return crawler.stats
+
+
+def jobs_option(func):
+    """Shared ``--jobs/-j`` option for commands that crawl collections."""
+    return click.option(
+        "--jobs",
+        "-j",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Parallel file read/hash workers (default: CPU count)",
+    )(func)
+
+
+def format_scan_stats(stats: ScanStats) -> str:
+    """Format a scan's change counts for console output."""
+    return (
+        f"Indexed [green]{stats.indexed}[/green] documents "
+        f"[dim](added {stats.added}, modified {stats.modified}, "
+        f"deleted {stats.deleted}, unchanged {stats.unchanged})[/dim]"
+    )
 
 
 def print_table(title: str, columns: list[tuple[str, str]]) -> Table:
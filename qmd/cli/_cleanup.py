@@ -11,7 +11,7 @@ def cleanup(ctx_obj):
     """Clean up database: inactive documents, orphaned vectors, LLM cache, VACUUM.
 
     TS equivalent operations:
-    1. Clear llm_cache (LLM API cache)
+    1. Clear llm_cache and rerank_cache (LLM result caches)
     2. Cleanup orphaned vectors
     3. Delete inactive documents
     4. VACUUM database
@@ -5,7 +5,7 @@ import sys
 
 import click
 
-from qmd.cli import console, _index_collection
+from qmd.cli import console, _index_collection, format_scan_stats, jobs_option
 from qmd.models.config import CollectionConfig
 
 
@@ -25,9 +25,10 @@ def collection():
     default="**/*.md",
     help="Alias for --glob (TS version compatibility)",
 )
+@jobs_option
 @click.pass_obj
 @click.pass_context
-def collection_add(ctx, ctx_obj, path, name, glob):
+def collection_add(ctx, ctx_obj, path, name, glob, jobs):
     """Add a new collection and immediately index it
 
     On Windows PowerShell, glob patterns may be expanded by the shell before
@@ -75,9 +76,9 @@ def collection_add(ctx, ctx_obj, path, name, glob):
 
         # Auto-index immediately (mirrors TS collectionAdd behaviour)
         console.print(f"Indexing [cyan]{name}[/cyan]...")
-        count = _index_collection(new_col, ctx_obj.db)
-        console.print(f"  Indexed [green]{count}[/green] documents")
-        if count > 0:
+        stats = _index_collection(new_col, ctx_obj.db, jobs=jobs)
+        console.print(f"  {format_scan_stats(stats)}")
+        if stats.indexed > 0:
             console.print(
                 f"[dim]Tip: Run 'qmd embed' to generate vector embeddings.[/dim]"
             )
@@ -8,7 +8,9 @@ from qmd.cli import console
 @click.command()
 @click.option("--collection", help="Specific collection to embed")
 @click.option(
-    "--force", is_flag=True, help="Clear all existing embeddings and re-embed"
+    "--force",
+    is_flag=True,
+    help="Clear all existing embeddings and re-embed (needed after changing chunk_strategy)",
 )
 @click.pass_obj
 def embed(ctx_obj, collection, force):
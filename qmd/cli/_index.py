@@ -4,12 +4,13 @@ import subprocess
 
 import click
 
-from qmd.cli import console, _index_collection
+from qmd.cli import console, _index_collection, format_scan_stats, jobs_option
 
 
 @click.command()
+@jobs_option
 @click.pass_obj
-def index(ctx_obj):
+def index(ctx_obj, jobs):
     """Index all documents in collections defined in config"""
     if not ctx_obj.config.collections:
         console.print("[yellow]No collections to index.[/yellow]")
@@ -18,9 +19,9 @@ def index(ctx_obj):
     total_indexed = 0
     for col in ctx_obj.config.collections:
         console.print(f"Indexing collection: [cyan]{col.name}[/cyan]...")
-        count = _index_collection(col, ctx_obj.db)
-        console.print(f"  Indexed [green]{count}[/green] documents")
-        total_indexed += count
+        stats = _index_collection(col, ctx_obj.db, jobs=jobs)
+        console.print(f"  {format_scan_stats(stats)}")
+        total_indexed += stats.indexed
 
     console.print(
         f"\n[bold green]Total indexed:[/bold green] {total_indexed} documents"
@@ -29,8 +30,9 @@ def index(ctx_obj):
 
 @click.command()
 @click.option("--pull", is_flag=True, help="Run 'git pull' before indexing")
+@jobs_option
 @click.pass_obj
-def update(ctx_obj, pull):
+def update(ctx_obj, pull, jobs):
     """Update all collections (re-scan, run update hooks)"""
     if not ctx_obj.config.collections:
         console.print("[yellow]No collections to update.[/yellow]")
@@ -74,9 +76,9 @@ def update(ctx_obj, pull):
             except Exception as e:
                 console.print(f"  [red]Update command failed: {e}[/red]")
 
-        count = _index_collection(col, ctx_obj.db)
-        console.print(f"  Indexed [green]{count}[/green] documents")
-        total_indexed += count
+        stats = _index_collection(col, ctx_obj.db, jobs=jobs)
+        console.print(f"  {format_scan_stats(stats)}")
+        total_indexed += stats.indexed
         console.print("")
 
     console.print(f"[bold green]Total indexed:[/bold green] {total_indexed} documents")
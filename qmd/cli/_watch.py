@@ -0,0 +1,109 @@
+"""Watch command: live incremental re-index and re-embed."""
+
+import threading
+import time
+
+import click
+
+from qmd.cli import console, _index_collection, format_scan_stats, jobs_option
+
+
+@click.command()
+@click.option("--collection", "-c", help="Only watch this collection")
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0.0),
+    default=1.0,
+    show_default=True,
+    help="Seconds of quiet before a batch of changes is indexed",
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0.1),
+    default=2.0,
+    show_default=True,
+    help="Stat polling interval in seconds (polling backend only)",
+)
+@click.option("--poll", is_flag=True, help="Force stat polling even if watchdog is installed")
+@click.option("--no-embed", is_flag=True, help="Index only; do not queue embeddings")
+@jobs_option
+@click.pass_obj
+def watch(ctx_obj, collection, debounce, interval, poll, no_embed, jobs):
+    """Watch collections and re-index touched files as they change.
+
+    Only the changed paths are re-crawled and upserted; their new content
+    hashes are then queued to the server's embed worker, so the index stays
+    fresh within seconds without full rescans. Uses watchdog (inotify etc.)
+    when installed, otherwise stat polling. Ctrl+C to stop.
+    """
+    from qmd.index.watcher import CollectionWatcher
+
+    cols = [
+        c
+        for c in ctx_obj.config.collections
+        if collection is None or c.name == collection
+    ]
+    if not cols:
+        console.print("[yellow]No collections to watch.[/yellow]")
+        return
+    by_name = {c.name: c for c in cols}
+    db = ctx_obj.db
+
+    watcher = CollectionWatcher(
+        [(c.name, c.path, c.glob_pattern) for c in cols],
+        debounce=debounce,
+        poll_interval=interval,
+        use_polling=poll,
+    )
+    console.print(
+        f"Watching [cyan]{len(cols)}[/cyan] collection(s) "
+        f"[dim](backend: {watcher.backend}, debounce {debounce}s)[/dim]"
+    )
+
+    # Hashes indexed but not yet confirmed embedded; retried after each batch
+    pending_hashes: set = set()
+
+    def index_batch(paths_by_col) -> None:
+        for name, paths in paths_by_col.items():
+            col = by_name[name]
+            stats = _index_collection(col, db, jobs=jobs, paths=paths)
+            if stats.indexed or stats.deleted:
+                console.print(f"[cyan]{name}[/cyan]: {format_scan_stats(stats)}")
+            pending_hashes.update(stats.hashes)
+
+    def embed_pending() -> None:
+        if no_embed or not pending_hashes:
+            return
+        # Content that already has vectors (e.g. a renamed file) needs no job
+        pending_hashes.intersection_update(db.get_hashes_for_embedding())
+        if not pending_hashes:
+            return
+        from qmd.server.client import EmbedServerClient
+
+        try:
+            EmbedServerClient().embed_index(hashes=sorted(pending_hashes))
+        except Exception as e:
+            console.print(f"  [yellow]Embed deferred:[/yellow] [dim]{e}[/dim]")
+            return
+        # An already-running job may have been attached to instead; keep
+        # whatever it did not cover for the next batch.
+        pending_hashes.intersection_update(db.get_hashes_for_embedding())
+        if not pending_hashes:
+            console.print("  [dim]Embeddings up to date[/dim]")
+
+    # Catch up on changes made while nothing was watching
+    t0 = time.perf_counter()
+    index_batch({c.name: None for c in cols})
+    embed_pending()
+    console.print(f"[dim]Initial scan done in {time.perf_counter() - t0:.1f}s[/dim]")
+
+    stop = threading.Event()
+    try:
+        for batch in watcher.batches(stop):
+            index_batch(batch)
+            embed_pending()
+    except KeyboardInterrupt:
+        stop.set()
+        console.print("\n[dim]Stopped watching.[/dim]")
+    finally:
+        watcher.close()
@@ -20,6 +20,7 @@ from qmd.cli._collection import collection
 from qmd.cli._context import context
 from qmd.cli._server import server
 from qmd.cli._index import index, update
+from qmd.cli._watch import watch
 from qmd.cli._search import search, vsearch, query
 from qmd.cli._doc import ls, get, multi_get
 from qmd.cli._embed import embed
@@ -45,6 +46,7 @@ cli.add_command(index)
 cli.add_command(search)
 cli.add_command(ls)
 cli.add_command(update)
+cli.add_command(watch)
 cli.add_command(get)
 cli.add_command(multi_get)
 cli.add_command(status)
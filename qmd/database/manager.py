@@ -1,38 +1,201 @@
+import json
 import sqlite3
 import os
 import re
-import sqlite_vec
 import logging
 import time
-from typing import List, Optional, Dict, Any
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Set, Tuple
 from datetime import datetime
+from .pool import ConnectionPool
 from .schema import SCHEMA, FTS_SCHEMA, TRIGGERS
 
 logger = logging.getLogger(__name__)
 
+# Documents written per commit in bulk sessions
+DEFAULT_COMMIT_INTERVAL = 500
+# Documents fetched per read transaction when streaming content to embed
+EMBED_PAGE_SIZE = 64
+
+UPSERT_CONTENT_SQL = (
+    "INSERT OR IGNORE INTO content (hash, doc, created_at) VALUES (?, ?, datetime('now'))"
+)
+
+UPSERT_DOCUMENT_SQL = """
+    INSERT INTO documents (collection, path, hash, title, created_at, modified_at)
+    VALUES (?, ?, ?, ?, datetime('now'), datetime('now'))
+    ON CONFLICT(collection, path) DO UPDATE SET
+        hash = excluded.hash,
+        title = excluded.title,
+        modified_at = excluded.modified_at,
+        active = 1
+"""
+
+
+def _create_vec_table(conn: sqlite3.Connection, dimensions: int) -> None:
+    """(Re)create vectors_vec keyed by chunk_hash; stale metadata rows are cleared."""
+    conn.execute("DROP TABLE IF EXISTS vectors_vec")
+    # The metadata rows would point at vectors that are gone
+    conn.execute("DELETE FROM content_vectors")
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE vectors_vec USING vec0(
+            chunk_hash TEXT PRIMARY KEY,
+            embedding float[{dimensions}] distance_metric=cosine
+        )
+    """)
+
+
+def _vec_table_info(conn: sqlite3.Connection) -> Optional[Tuple[Optional[int], bool]]:
+    """(dimensions, current layout?) of vectors_vec, or None when it doesn't exist."""
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='vectors_vec'"
+    ).fetchone()
+    if row is None:
+        return None
+    match = re.search(r"float\[(\d+)\]", row["sql"])
+    current = "chunk_hash" in row["sql"] and "distance_metric=cosine" in row["sql"]
+    return (int(match.group(1)) if match else None), current
+
+
+def _deactivate_missing(
+    conn: sqlite3.Connection, collection: str, seen_paths: Iterable[str]
+) -> int:
+    """Set-difference sweep: deactivate collection documents not in seen_paths."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_paths (path TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.seen_paths")
+    conn.executemany(
+        "INSERT OR IGNORE INTO temp.seen_paths (path) VALUES (?)",
+        ((path,) for path in seen_paths),
+    )
+    cursor = conn.execute(
+        """
+        UPDATE documents SET active = 0, modified_at = datetime('now')
+        WHERE collection = ? AND active = 1
+          AND path NOT IN (SELECT path FROM temp.seen_paths)
+        """,
+        (collection,),
+    )
+    conn.execute("DROP TABLE temp.seen_paths")
+    return cursor.rowcount
+
+
+def _deactivate_paths(
+    conn: sqlite3.Connection, collection: str, paths: Iterable[str]
+) -> int:
+    """Deactivate the given collection paths (targeted counterpart of the sweep)."""
+    cursor = conn.executemany(
+        """
+        UPDATE documents SET active = 0, modified_at = datetime('now')
+        WHERE collection = ? AND path = ? AND active = 1
+        """,
+        [(collection, path) for path in paths],
+    )
+    return cursor.rowcount
+
+
+def _save_file_stats(
+    conn: sqlite3.Connection,
+    collection: str,
+    stats: Dict[str, Tuple[int, int, int, str]],
+    deleted_paths: Iterable[str],
+) -> None:
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO file_stats (collection, path, size, mtime_ns, inode, hash)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [(collection, path, *st) for path, st in stats.items()],
+    )
+    conn.executemany(
+        "DELETE FROM file_stats WHERE collection = ? AND path = ?",
+        [(collection, path) for path in deleted_paths],
+    )
+
+
+class BulkWriter:
+    """
+    Batched document writer bound to one connection (see DatabaseManager.bulk_session).
+
+    Buffers document rows and flushes them with executemany every
+    ``commit_interval`` documents, so per-file connection setup, extension
+    loading and fsyncs are paid once per batch instead of once per file.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, commit_interval: int):
+        self.conn = conn
+        self.commit_interval = max(1, commit_interval)
+        self._contents: List[Tuple[str, str]] = []
+        self._documents: List[Tuple[str, str, str, str]] = []
+
+    def upsert_document(
+        self, collection: str, path: str, doc_hash: str, title: str, content: str
+    ) -> None:
+        self._contents.append((doc_hash, content))
+        self._documents.append((collection, path, doc_hash, title))
+        if len(self._documents) >= self.commit_interval:
+            self.commit()
+
+    def upsert_documents(
+        self, collection: str, documents: Iterable[Tuple[str, str, str, str]]
+    ) -> int:
+        """Stream (path, content, hash, title) tuples into the session."""
+        count = 0
+        for path, content, doc_hash, title in documents:
+            self.upsert_document(collection, path, doc_hash, title, content)
+            count += 1
+        return count
+
+    def deactivate_missing_documents(
+        self, collection: str, seen_paths: Iterable[str]
+    ) -> int:
+        self.flush()
+        return _deactivate_missing(self.conn, collection, seen_paths)
+
+    def deactivate_documents(self, collection: str, paths: Iterable[str]) -> int:
+        self.flush()
+        return _deactivate_paths(self.conn, collection, paths)
+
+    def save_file_stats(
+        self,
+        collection: str,
+        stats: Dict[str, Tuple[int, int, int, str]],
+        deleted_paths: Iterable[str] = (),
+    ) -> None:
+        _save_file_stats(self.conn, collection, stats, deleted_paths)
+
+    def flush(self) -> None:
+        """Write buffered rows without committing."""
+        if not self._documents:
+            return
+        # Content first: the documents_ai/au triggers read the body for FTS
+        self.conn.executemany(UPSERT_CONTENT_SQL, self._contents)
+        self.conn.executemany(UPSERT_DOCUMENT_SQL, self._documents)
+        self._contents.clear()
+        self._documents.clear()
+
+    def commit(self) -> None:
+        self.flush()
+        self.conn.commit()
+
 
 class DatabaseManager:
     def __init__(self, db_path: str = "qmd.db"):
         self.db_path = db_path
+        self._pool = ConnectionPool(db_path)
         self._init_db()
 
-    def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-
-        # Enable WAL mode for better concurrency
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA synchronous=NORMAL")
+    @property
+    def pool(self) -> ConnectionPool:
+        """Connection pool shared with searchers working on the same database."""
+        return self._pool
 
-        # Load sqlite-vec extension
-        conn.enable_load_extension(True)
-        sqlite_vec.load(conn)
-        conn.enable_load_extension(False)
-
-        # Enable foreign keys
-        conn.execute("PRAGMA foreign_keys=ON")
+    def _get_connection(self):
+        """Return this thread's pooled query connection (pragmas/sqlite-vec already set up)."""
+        return self._pool.reader()
 
-        return conn
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._pool.close()
 
     def _init_db(self):
         # Ensure directory exists
@@ -40,20 +203,67 @@ class DatabaseManager:
         if db_dir:
             os.makedirs(db_dir, exist_ok=True)
 
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             conn.executescript(SCHEMA)
             conn.executescript(FTS_SCHEMA)
             conn.executescript(TRIGGERS)
-            conn.commit()
+            self._migrate_llm_cache(conn)
+            self._migrate_content_vectors(conn)
+            self._migrate_vectors_vec(conn)
+
+    @staticmethod
+    def _migrate_content_vectors(conn) -> None:
+        """Older databases lack chunk_hash (content-addressed vectors), heading and len."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(content_vectors)")}
+        if "len" not in columns:
+            conn.execute("ALTER TABLE content_vectors ADD COLUMN len INTEGER NOT NULL DEFAULT 0")
+        if "chunk_hash" not in columns:
+            conn.execute(
+                "ALTER TABLE content_vectors ADD COLUMN chunk_hash TEXT NOT NULL DEFAULT ''"
+            )
+        if "heading" not in columns:
+            conn.execute(
+                "ALTER TABLE content_vectors ADD COLUMN heading TEXT NOT NULL DEFAULT ''"
+            )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_content_vectors_chunk ON content_vectors(chunk_hash)"
+        )
+
+    @staticmethod
+    def _migrate_vectors_vec(conn) -> None:
+        """
+        Older databases key vectors_vec by hash_seq (document hash + seq).
+
+        Rebuilt here, at open time, rather than only by ensure_vec_table():
+        search reads vectors_vec.chunk_hash, so a legacy table would break
+        /vsearch and /query until the next embed. The old vectors can't be
+        mapped to chunk hashes and are cleared; the next embed regenerates them.
+        """
+        info = _vec_table_info(conn)
+        if info is None or info[1] or info[0] is None:
+            return
+        logger.warning("Rebuilding legacy vectors_vec table; run `qmd embed` to regenerate vectors")
+        _create_vec_table(conn, info[0])
+
+    @staticmethod
+    def _migrate_llm_cache(conn) -> None:
+        """Older databases have llm_cache without the LRU column."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(llm_cache)")}
+        if "accessed_at" not in columns:
+            conn.execute(
+                "ALTER TABLE llm_cache ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0"
+            )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)"
+        )
 
     # Collection operations
     def add_collection(self, name: str, path: str, glob_pattern: str):
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             conn.execute(
                 "INSERT INTO collections (name, path, glob_pattern, created_at) VALUES (?, ?, ?, datetime('now'))",
                 (name, path, glob_pattern),
             )
-            conn.commit()
 
     def list_collections(self) -> List[Dict[str, Any]]:
         with self._get_connection() as conn:
@@ -61,10 +271,10 @@ class DatabaseManager:
             return [dict(row) for row in cursor.fetchall()]
 
     def remove_collection(self, name: str):
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             conn.execute("DELETE FROM collections WHERE name = ?", (name,))
             conn.execute("DELETE FROM documents WHERE collection = ?", (name,))
-            conn.commit()
+            conn.execute("DELETE FROM file_stats WHERE collection = ?", (name,))
 
     # Document operations
     def upsert_document(
@@ -76,27 +286,86 @@ class DatabaseManager:
         content: str,
         context: Optional[str] = None,
     ):
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             # 1. Upsert content
-            conn.execute(
-                "INSERT OR IGNORE INTO content (hash, doc, created_at) VALUES (?, ?, datetime('now'))",
-                (doc_hash, content),
-            )
+            conn.execute(UPSERT_CONTENT_SQL, (doc_hash, content))
 
             # 2. Upsert document metadata
-            conn.execute(
-                """
-                INSERT INTO documents (collection, path, hash, title, created_at, modified_at)
-                VALUES (?, ?, ?, ?, datetime('now'), datetime('now'))
-                ON CONFLICT(collection, path) DO UPDATE SET
-                    hash = excluded.hash,
-                    title = excluded.title,
-                    modified_at = excluded.modified_at,
-                    active = 1
-                """,
-                (collection, path, doc_hash, title),
+            conn.execute(UPSERT_DOCUMENT_SQL, (collection, path, doc_hash, title))
+
+    @contextmanager
+    def bulk_session(
+        self, commit_interval: int = DEFAULT_COMMIT_INTERVAL
+    ) -> Iterator["BulkWriter"]:
+        """
+        Open a single-connection write session for bulk indexing.
+
+        Rows are buffered and written with executemany, committing every
+        ``commit_interval`` documents; the remainder is committed on exit.
+        On error the uncommitted tail is rolled back. The pool's writer lock
+        is held for the whole session.
+
+        Example:
+            with db.bulk_session() as session:
+                session.upsert_documents("notes", crawler.scan())
+        """
+        with self._pool.writer() as conn:
+            writer = BulkWriter(conn, commit_interval)
+            yield writer
+            writer.flush()
+
+    def bulk_upsert_documents(
+        self,
+        collection: str,
+        documents: Iterable[Tuple[str, str, str, str]],
+        commit_interval: int = DEFAULT_COMMIT_INTERVAL,
+    ) -> int:
+        """
+        Upsert (path, content, hash, title) tuples — e.g. ``Crawler.scan()``
+        output — over one connection. Returns the number of documents written.
+        """
+        with self.bulk_session(commit_interval) as session:
+            return session.upsert_documents(collection, documents)
+
+    def deactivate_missing_documents(
+        self, collection: str, seen_paths: Iterable[str]
+    ) -> int:
+        """
+        Mark active documents whose path was not seen in the latest scan as inactive.
+
+        Runs as a single set-difference UPDATE so vanished files drop out of
+        FTS (via trigger) and vector candidates immediately; `qmd cleanup`
+        later purges them.
+
+        Returns:
+            Number of documents deactivated
+        """
+        with self._pool.writer() as conn:
+            deactivated = _deactivate_missing(conn, collection, seen_paths)
+            return deactivated
+
+    # File stat cache (incremental indexing)
+    def get_file_stats(self, collection: str) -> Dict[str, Tuple[int, int, int, str]]:
+        """Return {path: (size, mtime_ns, inode, hash)} for a collection."""
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                "SELECT path, size, mtime_ns, inode, hash FROM file_stats WHERE collection = ?",
+                (collection,),
             )
-            conn.commit()
+            return {
+                row["path"]: (row["size"], row["mtime_ns"], row["inode"], row["hash"])
+                for row in cursor.fetchall()
+            }
+
+    def save_file_stats(
+        self,
+        collection: str,
+        stats: Dict[str, Tuple[int, int, int, str]],
+        deleted_paths: Iterable[str] = (),
+    ) -> None:
+        """Upsert stat entries and drop entries for vanished paths."""
+        with self._pool.writer() as conn:
+            _save_file_stats(conn, collection, stats, deleted_paths)
 
     def get_document_by_hash(self, doc_hash: str) -> Optional[Dict[str, Any]]:
         with self._get_connection() as conn:
@@ -208,7 +477,7 @@ class DatabaseManager:
             return stats
 
     def rename_collection(self, old_name: str, new_name: str):
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             # Check if new name exists
             exists = conn.execute(
                 "SELECT 1 FROM collections WHERE name = ?", (new_name,)
@@ -227,7 +496,10 @@ class DatabaseManager:
                 "UPDATE path_contexts SET collection = ? WHERE collection = ?",
                 (new_name, old_name),
             )
-            conn.commit()
+            conn.execute(
+                "UPDATE file_stats SET collection = ? WHERE collection = ?",
+                (new_name, old_name),
+            )
 
     def get_all_active_documents(self) -> List[Dict[str, Any]]:
         with self._get_connection() as conn:
@@ -238,7 +510,7 @@ class DatabaseManager:
 
     # Path context operations
     def set_path_context(self, collection: str, path: str, context: str):
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             conn.execute(
                 """
                 INSERT INTO path_contexts (collection, path, context)
@@ -247,7 +519,6 @@ class DatabaseManager:
                 """,
                 (collection, path, context),
             )
-            conn.commit()
 
     def list_path_contexts(
         self, collection: Optional[str] = None
@@ -262,12 +533,11 @@ class DatabaseManager:
             return [dict(row) for row in cursor.fetchall()]
 
     def remove_path_context(self, collection: str, path: str):
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             conn.execute(
                 "DELETE FROM path_contexts WHERE collection = ? AND path = ?",
                 (collection, path),
             )
-            conn.commit()
 
     def get_context_for_path(self, collection: str, path: str) -> str:
         """Get the inherited context for a path.
@@ -311,44 +581,31 @@ class DatabaseManager:
         """
         动态创建 vectors_vec 虚拟表，或验证现有表维度是否匹配。
 
+        旧版表以 hash_seq（文档 hash + 序号）为主键；升级为内容寻址的
+        chunk_hash 时重建该表并清空 content_vectors（旧向量无法映射到
+        chunk_hash），下次 embed 会全部重新生成。
+
         Args:
             dimensions: 向量维度（Jina ZH 为 768）
         """
-        with self._get_connection() as conn:
-            row = conn.execute(
-                "SELECT sql FROM sqlite_master WHERE type='table' AND name='vectors_vec'"
-            ).fetchone()
-
-            if row:
-                # Parse existing dimensions from CREATE statement
-                match = re.search(r"float\[(\d+)\]", row["sql"])
-                existing_dims = int(match.group(1)) if match else None
-                has_hash_seq = "hash_seq" in row["sql"]
-                has_cosine = "distance_metric=cosine" in row["sql"]
-
-                if existing_dims == dimensions and has_hash_seq and has_cosine:
-                    return  # Already exists and correct
-
-                # Drop and recreate if dimensions mismatch
-                conn.execute("DROP TABLE IF EXISTS vectors_vec")
-
-            # Create new vectors_vec table
-            conn.execute(f"""
-                CREATE VIRTUAL TABLE vectors_vec USING vec0(
-                    hash_seq TEXT PRIMARY KEY,
-                    embedding float[{dimensions}] distance_metric=cosine
-                )
-            """)
-            conn.commit()
+        with self._pool.writer() as conn:
+            info = _vec_table_info(conn)
+            if info == (dimensions, True):
+                return  # Already exists and correct
+            # Drop and recreate if dimensions or key mismatch
+            _create_vec_table(conn, dimensions)
 
     def insert_embedding(
         self,
         doc_hash: str,
         seq: int,
         pos: int,
-        embedding: bytes,
+        chunk_hash: str,
+        embedding: Optional[bytes],
         model: str = "BAAI/bge-m3",
         embedded_at: Optional[str] = None,
+        heading: str = "",
+        length: int = 0,
     ) -> None:
         """
         写入 chunk 级向量元数据到 content_vectors 表。
@@ -357,36 +614,102 @@ class DatabaseManager:
             doc_hash: 文档 hash
             seq: chunk 序号
             pos: chunk 在原文中的字符位置
-            embedding: 向量数据（bytes 格式）
+            chunk_hash: chunk 内容 hash（见 ``qmd.utils.chunker.chunk_hash``）
+            embedding: 向量数据（bytes 格式）；None 表示复用已有向量
             model: 模型名称
             embedded_at: 时间戳（默认 datetime('now')）
+            heading: chunk 所在的 Markdown 标题路径
+            length: chunk 字符数（用于在原文中截取 snippet）
+        """
+        self.insert_embeddings_batch(
+            [(doc_hash, seq, pos, chunk_hash, embedding, heading, length)],
+            model=model,
+            embedded_at=embedded_at,
+        )
+
+    def insert_embeddings_batch(
+        self,
+        rows: Iterable[Tuple[Any, ...]],
+        model: str = "BAAI/bge-m3",
+        embedded_at: Optional[str] = None,
+    ) -> int:
+        """
+        批量写入 chunk 向量：一个事务内对 content_vectors 与 vectors_vec 各做 executemany。
+
+        向量按 chunk_hash 内容寻址存储，多个文档（或同一文档的新旧版本）中
+        相同的 chunk 共用一条向量。
+
+        Args:
+            rows: (doc_hash, seq, pos, chunk_hash, embedding bytes[, heading[, length]])
+                  元组；embedding 为 None 时只写映射，复用 vectors_vec 中已有的
+                  向量；heading 为 Markdown 标题路径，length 为 chunk 字符数（可省略）
+            model: 模型名称
+            embedded_at: 时间戳（默认当前时间）
+
+        Returns:
+            写入的 chunk 数
         """
+        rows = list(rows)
+        if not rows:
+            return 0
         if embedded_at is None:
             embedded_at = datetime.now().isoformat()
 
-        with self._get_connection() as conn:
-            # Insert metadata
-            conn.execute(
+        # One vector per chunk hash, even if the batch repeats a chunk
+        vectors = {row[3]: row[4] for row in rows if row[4] is not None}
+        with self._pool.writer() as conn:
+            conn.executemany(
                 """
-                INSERT OR REPLACE INTO content_vectors (hash, seq, pos, model, embedded_at)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT OR REPLACE INTO content_vectors
+                    (hash, seq, pos, chunk_hash, heading, len, model, embedded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (doc_hash, seq, pos, model, embedded_at),
-            )
-
-            # Insert vector — vec0 virtual tables do NOT support INSERT OR REPLACE,
-            # so we must DELETE first then INSERT.
-            hash_seq = f"{doc_hash}_{seq}"
-            conn.execute(
-                "DELETE FROM vectors_vec WHERE hash_seq = ?",
-                (hash_seq,),
+                [
+                    (
+                        *row[:4],
+                        row[5] if len(row) > 5 else "",
+                        row[6] if len(row) > 6 else 0,
+                        model,
+                        embedded_at,
+                    )
+                    for row in rows
+                ],
             )
-            conn.execute(
-                "INSERT INTO vectors_vec VALUES (?, ?)",
-                (hash_seq, embedding),
+            # vec0 has no INSERT OR REPLACE: delete then insert
+            conn.executemany(
+                "DELETE FROM vectors_vec WHERE chunk_hash = ?",
+                [(h,) for h in vectors],
             )
+            conn.executemany("INSERT INTO vectors_vec VALUES (?, ?)", vectors.items())
+        return len(rows)
+
+    def get_existing_chunk_hashes(self, chunk_hashes: Iterable[str]) -> Set[str]:
+        """
+        返回已有向量的 chunk_hash 子集（这些 chunk 无需重新推理）。
 
-            conn.commit()
+        Args:
+            chunk_hashes: 待查询的 chunk hash
+
+        Returns:
+            vectors_vec 中已存在的 chunk hash 集合
+        """
+        chunk_hashes = list(dict.fromkeys(chunk_hashes))
+        if not chunk_hashes:
+            return set()
+        conn = self._get_connection()
+        found: Set[str] = set()
+        # vec0 primary-key lookups are cheap; keep the IN list bounded
+        for i in range(0, len(chunk_hashes), 500):
+            part = chunk_hashes[i : i + 500]
+            placeholders = ",".join("?" for _ in part)
+            found.update(
+                row[0]
+                for row in conn.execute(
+                    f"SELECT chunk_hash FROM vectors_vec WHERE chunk_hash IN ({placeholders})",
+                    part,
+                )
+            )
+        return found
 
     def clear_all_embeddings(self) -> None:
         """
@@ -395,7 +718,7 @@ class DatabaseManager:
         注意：如果 vectors_vec 表不存在（旧数据库），会自动忽略。
         建议在升级后删除旧数据库重新索引。
         """
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             # 清空 content_vectors 表
             conn.execute("DELETE FROM content_vectors")
 
@@ -411,7 +734,6 @@ class DatabaseManager:
                 else:
                     raise
 
-            conn.commit()
 
     def get_hashes_for_embedding(self, limit: Optional[int] = None) -> List[str]:
         """
@@ -448,6 +770,88 @@ class DatabaseManager:
                 """
             ).fetchone()[0]
 
+    @staticmethod
+    def _embedding_filter(
+        collection: Optional[str], hashes: Optional[Iterable[str]]
+    ) -> Tuple[str, List[Any]]:
+        """WHERE clause over content ``c`` selecting active, not-yet-embedded content."""
+        where = """
+            NOT EXISTS (SELECT 1 FROM content_vectors cv WHERE cv.hash = c.hash)
+            AND c.hash IN (
+                SELECT d.hash FROM documents d
+                WHERE d.active = 1 AND (? IS NULL OR d.collection = ?)
+            )
+        """
+        params: List[Any] = [collection, collection]
+        if hashes is not None:
+            where += " AND c.hash IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(hashes)))
+        return where, params
+
+    def count_content_for_embedding(
+        self,
+        collection: Optional[str] = None,
+        hashes: Optional[Iterable[str]] = None,
+        max_chars: Optional[int] = None,
+        overlap_chars: Optional[int] = None,
+    ) -> Tuple[int, int]:
+        """
+        预统计待 embed 的内容数与 chunk 数（不读取正文到 Python）。
+
+        The chunk count is estimated from ``length(doc)`` with the chunker's
+        size/overlap, so progress totals are available before any chunking.
+
+        Returns:
+            (unique content hashes, estimated chunks)
+        """
+        from qmd.utils.chunker import CHUNK_OVERLAP_CHARS, CHUNK_SIZE_CHARS
+
+        max_chars = max_chars or CHUNK_SIZE_CHARS
+        overlap_chars = CHUNK_OVERLAP_CHARS if overlap_chars is None else overlap_chars
+        where, params = self._embedding_filter(collection, hashes)
+        step = max(1, max_chars - overlap_chars)
+        with self._get_connection() as conn:
+            row = conn.execute(
+                f"""
+                SELECT count(*),
+                       coalesce(sum(CASE WHEN length(c.doc) <= ? THEN 1
+                                ELSE (length(c.doc) - ? + ? - 1) / ? END), 0)
+                FROM content c
+                WHERE {where}
+                """,
+                [max_chars, overlap_chars, step, step, *params],
+            ).fetchone()
+            return row[0], row[1]
+
+    def iter_content_for_embedding(
+        self,
+        collection: Optional[str] = None,
+        hashes: Optional[Iterable[str]] = None,
+        page_size: int = EMBED_PAGE_SIZE,
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        流式返回待 embed 的 (hash, doc)，每个内容 hash 只返回一次。
+
+        Rows are read in keyset-paginated pages (``c.hash > last``) of
+        ``page_size`` documents, each page its own short read transaction,
+        so memory stays bounded and no WAL snapshot is held while the
+        caller chunks and embeds — checkpoints proceed and later reads see
+        vectors written in the meantime.
+        """
+        where, params = self._embedding_filter(collection, hashes)
+        sql = (
+            f"SELECT c.hash, c.doc FROM content c WHERE {where} AND c.hash > ? "
+            "ORDER BY c.hash LIMIT ?"
+        )
+        last = ""
+        while True:
+            rows = self._get_connection().execute(sql, [*params, last, page_size]).fetchall()
+            for row in rows:
+                yield row["hash"], row["doc"]
+            if len(rows) < page_size:
+                return
+            last = rows[-1]["hash"]
+
     def get_chunks_for_hash(self, doc_hash: str) -> List[Dict[str, Any]]:
         """
         获取文档的所有 chunks（用于重新 embed）。
@@ -497,11 +901,10 @@ class DatabaseManager:
         Returns:
             Number of documents deleted
         """
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             # First, FTS entries will be auto-deleted by trigger
             cursor = conn.execute("DELETE FROM documents WHERE active = 0")
             deleted_count = cursor.rowcount
-            conn.commit()
             return deleted_count
 
     def cleanup_orphaned_vectors(self) -> int:
@@ -511,7 +914,7 @@ class DatabaseManager:
         Returns:
             Number of orphaned vectors removed
         """
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             # Delete from content_vectors where hash is not in active documents
             cursor = conn.execute(
                 """
@@ -528,9 +931,9 @@ class DatabaseManager:
                 try:
                     conn.execute(
                         """
-                        DELETE FROM vectors_vec 
-                        WHERE hash_seq NOT IN (
-                            SELECT hash || '_' || seq FROM content_vectors
+                        DELETE FROM vectors_vec
+                        WHERE chunk_hash NOT IN (
+                            SELECT chunk_hash FROM content_vectors
                         )
                         """
                     )
@@ -538,33 +941,33 @@ class DatabaseManager:
                     # vectors_vec might not exist or have different structure
                     pass
 
-            conn.commit()
             return orphaned_count
 
     def cleanup_llm_cache(self) -> int:
         """
-        Clear LLM cache table if it exists.
+        Clear the LLM result cache (query expansions, rerank scores).
 
         Returns:
-            Number of cache entries cleared (0 if table doesn't exist)
+            Number of cache entries cleared (missing tables count as 0)
         """
-        with self._get_connection() as conn:
-            try:
-                cursor = conn.execute("SELECT count(*) FROM llm_cache")
-                count = cursor.fetchone()[0]
-                conn.execute("DELETE FROM llm_cache")
-                conn.commit()
-                return count
-            except Exception:
-                # Table doesn't exist
-                return 0
+        count = 0
+        with self._pool.writer() as conn:
+            for table in ("llm_cache", "rerank_cache"):
+                try:
+                    cursor = conn.execute(f"SELECT count(*) FROM {table}")
+                    count += cursor.fetchone()[0]
+                    conn.execute(f"DELETE FROM {table}")
+                except Exception:
+                    # Table doesn't exist
+                    pass
+        return count
 
     def vacuum_database(self) -> None:
         """
         Run VACUUM to reclaim space and defragment database.
         This should be called after major deletions.
         """
-        with self._get_connection() as conn:
+        with self._pool.writer() as conn:
             conn.execute("VACUUM")
 
     def cleanup_all(self) -> Dict[str, Any]:
@@ -0,0 +1,152 @@
+"""
+Thread-aware SQLite connection pool.
+
+Each connection is opened once, with the WAL pragmas applied and the
+sqlite-vec extension loaded, then reused for the lifetime of the pool:
+
+- Readers: one connection per thread (sqlite3 connections are not safe to
+  share across threads without locking), reused across queries. Readers
+  of threads that have exited are closed on the next ``reader()`` call;
+  short-lived threads can also hand theirs back with ``release_reader()``.
+- Writer: a single shared connection serialized by a lock, so every write
+  in the process goes through one SQLite writer.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import sqlite_vec
+
+
+def open_connection(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a connection with QMD's standard pragmas and sqlite-vec loaded."""
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+
+    # Enable WAL mode for better concurrency
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    # Load sqlite-vec extension
+    conn.enable_load_extension(True)
+    sqlite_vec.load(conn)
+    conn.enable_load_extension(False)
+
+    # Enable foreign keys
+    conn.execute("PRAGMA foreign_keys=ON")
+
+    return conn
+
+
+class ConnectionPool:
+    """Per-thread reader connections plus one lock-guarded writer connection."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # thread ident -> (owning thread, its reader connection)
+        self._readers: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._registry_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _open(self, check_same_thread: bool) -> sqlite3.Connection:
+        conn = open_connection(self.db_path, check_same_thread=check_same_thread)
+        with self._registry_lock:
+            self._connections.append(conn)
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Return this thread's query connection, opening it on first use."""
+        ident = threading.get_ident()
+        thread = threading.current_thread()
+        with self._registry_lock:
+            entry = self._readers.get(ident)
+            if entry is not None and entry[0] is thread:
+                return entry[1]
+            stale = self._reap_dead_readers()
+        for conn in stale:
+            conn.close()
+        # Opened without the same-thread check so close() and the dead-thread
+        # sweep can close it; only the owning thread ever queries through it.
+        conn = self._open(check_same_thread=False)
+        with self._registry_lock:
+            self._readers[ident] = (thread, conn)
+        return conn
+
+    def release_reader(self) -> None:
+        """Close the calling thread's reader, if any (for short-lived threads)."""
+        with self._registry_lock:
+            entry = self._readers.pop(threading.get_ident(), None)
+            if entry is None:
+                return
+            self._connections.remove(entry[1])
+        entry[1].close()
+
+    def _reap_dead_readers(self) -> List[sqlite3.Connection]:
+        """Unregister readers whose thread has exited (or whose ident was reused)."""
+        stale = []
+        for ident, (thread, conn) in list(self._readers.items()):
+            if not thread.is_alive() or ident == threading.get_ident():
+                del self._readers[ident]
+                self._connections.remove(conn)
+                stale.append(conn)
+        return stale
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Hold the single writer connection for the duration of the block.
+
+        Commits on success and rolls back on error. Re-entrant within the
+        same thread: nested blocks join the outermost transaction.
+        """
+        with self._write_lock:
+            with self._transaction() as conn:
+                yield conn
+
+    @contextmanager
+    def try_writer(self) -> Iterator[Optional[sqlite3.Connection]]:
+        """
+        Like ``writer()``, but yields None instead of waiting when another
+        thread holds the writer — for best-effort writes on latency-sensitive
+        paths (query caches) that must not queue behind indexing.
+        """
+        if not self._write_lock.acquire(blocking=False):
+            yield None
+            return
+        try:
+            with self._transaction() as conn:
+                yield conn
+        finally:
+            self._write_lock.release()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # Caller holds _write_lock
+        if self._writer is None:
+            self._writer = self._open(check_same_thread=False)
+        conn = self._writer
+        self._write_depth += 1
+        try:
+            yield conn
+            if self._write_depth == 1:
+                conn.commit()
+        except BaseException:
+            if self._write_depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._write_depth -= 1
+
+    def close(self) -> None:
+        """Close every connection opened by this pool."""
+        with self._write_lock, self._registry_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._readers.clear()
+            self._writer = None
@@ -29,17 +29,57 @@ CREATE TABLE IF NOT EXISTS content (
     created_at TEXT NOT NULL
 );
 
--- 向量元数据（chunk 级）
+-- 向量元数据（chunk 级）：文档 chunk → 内容寻址的 chunk_hash（vectors_vec 主键）
 CREATE TABLE IF NOT EXISTS content_vectors (
     hash TEXT NOT NULL,
     seq INTEGER NOT NULL DEFAULT 0,
     pos INTEGER NOT NULL DEFAULT 0,
+    len INTEGER NOT NULL DEFAULT 0,  -- chunk 字符数（0 = 旧数据，未记录）
+    chunk_hash TEXT NOT NULL DEFAULT '',
+    heading TEXT NOT NULL DEFAULT '',  -- Markdown 标题路径（"A > B"），无则为空
     model TEXT NOT NULL,
     embedded_at TEXT NOT NULL,
     PRIMARY KEY (hash, seq),
     FOREIGN KEY (hash) REFERENCES content(hash) ON DELETE CASCADE
 );
 
+-- 文件 stat 缓存（增量索引：size/mtime/inode 未变则跳过读取与 hash）
+CREATE TABLE IF NOT EXISTS file_stats (
+    collection TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (collection, path)
+);
+
+-- 查询向量缓存（query embedding，跨重启复用；见 qmd/search/embed_cache.py）
+CREATE TABLE IF NOT EXISTS query_embeddings (
+    model TEXT NOT NULL,
+    query TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (model, query)
+);
+
+-- LLM 结果缓存（内容寻址：hash = sha256(操作 + 输入 + 模型)），按 accessed_at 做 LRU 淘汰
+CREATE TABLE IF NOT EXISTS llm_cache (
+    hash TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    accessed_at REAL NOT NULL DEFAULT 0
+);
+
+-- Rerank 分数缓存（结构同 llm_cache；独立表与 LRU 上限，避免大量廉价分数挤掉查询扩展）
+CREATE TABLE IF NOT EXISTS rerank_cache (
+    hash TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    accessed_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_rerank_cache_accessed ON rerank_cache(accessed_at);
+
 -- 路径上下文（层级）
 CREATE TABLE IF NOT EXISTS path_contexts (
     collection TEXT,
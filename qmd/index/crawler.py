@@ -1,34 +1,256 @@
 import os
+import stat
+import time
 import hashlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterator, Tuple, Optional
+from typing import (
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
 from ..models.document import Document
 
+# Files modified this close to the scan start are stored "racy": another
+# write inside the same mtime tick would otherwise go unnoticed next scan.
+RACY_WINDOW_NS = 2_000_000_000
+# Size recorded for racy entries: never matches a real stat, so the next scan
+# re-reads the file once and compares hashes (unchanged vs modified)
+RACY_SIZE = -1
+
+
+def default_jobs() -> int:
+    """Default crawler parallelism: one reader thread per CPU (capped at 32)."""
+    return min(32, os.cpu_count() or 1)
+
+
+class FileStat(NamedTuple):
+    """Persisted per-file stat entry (see ``file_stats`` table)."""
+
+    size: int
+    mtime_ns: int
+    inode: int
+    hash: str
+
+
+# (file_path, rel_path, stat_result, cached FileStat or None)
+_Candidate = Tuple[Path, str, os.stat_result, Optional[FileStat]]
+
+
+@dataclass
+class ScanStats:
+    """Per-scan change counts reported by ``Crawler.scan``."""
+
+    added: int = 0
+    modified: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    # Content hashes of added/modified documents (what still needs embedding)
+    hashes: List[str] = field(default_factory=list)
+
+    @property
+    def indexed(self) -> int:
+        """Number of documents that were (re-)read and need upserting."""
+        return self.added + self.modified
+
+
 class Crawler:
-    def __init__(self, root_path: str, glob_pattern: str = "**/*.md"):
+    def __init__(
+        self,
+        root_path: str,
+        glob_pattern: str = "**/*.md",
+        stat_cache: Optional[Mapping[str, Tuple[int, int, int, str]]] = None,
+        jobs: Optional[int] = None,
+        ordered: bool = True,
+    ):
+        """
+        Args:
+            root_path: Collection root directory
+            glob_pattern: Glob pattern relative to root_path
+            stat_cache: Previously persisted {rel_path: (size, mtime_ns, inode, hash)}.
+                        Files whose stat matches are skipped without being read.
+                        None disables incremental scanning.
+            jobs: Worker threads for reading/hashing (default: CPU count, 1 = serial)
+            ordered: Yield in walk order (True) or as soon as each read finishes
+        """
         self.root_path = Path(root_path)
         self.glob_pattern = glob_pattern
+        self.stat_cache = stat_cache
+        self.jobs = max(1, jobs if jobs is not None else default_jobs())
+        self.ordered = ordered
+        self.stats = ScanStats()
+        self.seen_paths: Set[str] = set()
+        self.updated_stats: Dict[str, FileStat] = {}
+        self.deleted_paths: List[str] = []
+        self.completed = False
 
-    def scan(self) -> Iterator[Tuple[str, str, str, str]]:
+    def scan(
+        self, paths: Optional[Iterable[str]] = None
+    ) -> Iterator[Tuple[str, str, str, str]]:
         """
         Scans the directory for files matching the glob pattern.
         Returns an iterator of (relative_path, content, hash, title).
+
+        ``paths`` restricts the scan to those relative paths (e.g. files
+        reported by ``qmd watch``) instead of walking the whole tree; any of
+        them that no longer exist are reported in ``deleted_paths``.
+
+        With a stat cache only added/modified files are yielded. After the
+        iterator is exhausted, ``stats``, ``updated_stats`` (stat entries to
+        persist), ``seen_paths`` and ``deleted_paths`` describe what changed.
+        ``completed`` is only set once the whole tree has been walked, so a
+        missing root or an aborted scan never looks like mass deletion.
+
+        With ``jobs > 1`` file reads and hashing run on a thread pool while
+        the directory walk continues; results stream back as they are ready.
         """
+        self.stats = ScanStats()
+        self.seen_paths = set()
+        self.updated_stats = {}
+        self.deleted_paths = []
+        self.completed = False
+
         if not self.root_path.exists():
             return
 
-        for file_path in self.root_path.glob(self.glob_pattern):
-            if not file_path.is_file():
+        scan_start_ns = time.time_ns()
+
+        if paths is not None:
+            paths = sorted(set(paths))
+            files = (self.root_path / p for p in paths)
+        else:
+            files = self.root_path.glob(self.glob_pattern)
+
+        if self.jobs > 1:
+            results = self._read_parallel(self._candidates(files))
+        else:
+            results = (
+                (candidate, self._read_file(candidate[0]))
+                for candidate in self._candidates(files)
+            )
+
+        for (file_path, rel_path, st, cached), data in results:
+            if not data:
+                continue
+
+            racy = st.st_mtime_ns >= scan_start_ns - RACY_WINDOW_NS
+            self.updated_stats[rel_path] = FileStat(
+                RACY_SIZE if racy else st.st_size, st.st_mtime_ns, st.st_ino, data[2]
+            )
+
+            if cached is not None and cached.hash == data[2]:
+                # Touched but content identical: refresh the stat entry only
+                self.stats.unchanged += 1
                 continue
-            
-            data = self._read_file(file_path)
-            if data:
-                yield data
+
+            if cached is None:
+                self.stats.added += 1
+            else:
+                self.stats.modified += 1
+            self.stats.hashes.append(data[2])
+            yield data
+
+        if paths is not None:
+            self.deleted_paths = [p for p in paths if p not in self.seen_paths]
+            self.stats.deleted = len(self.deleted_paths)
+        elif self.stat_cache is not None:
+            self.deleted_paths = [
+                p for p in self.stat_cache if p not in self.seen_paths
+            ]
+            self.stats.deleted = len(self.deleted_paths)
+        self.completed = True
+
+    def _candidates(self, files: Iterable[Path]) -> Iterator[_Candidate]:
+        """Stat files and yield those that must be read (stat-cache misses)."""
+        for file_path in files:
+            try:
+                st = file_path.stat()
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+
+            rel_path = str(file_path.relative_to(self.root_path))
+            self.seen_paths.add(rel_path)
+
+            cached = self._cached_stat(rel_path)
+            if (
+                cached is not None
+                and cached.size == st.st_size
+                and cached.mtime_ns == st.st_mtime_ns
+                and cached.inode == st.st_ino
+            ):
+                self.stats.unchanged += 1
+                continue
+
+            yield file_path, rel_path, st, cached
+
+    def _read_parallel(
+        self, candidates: Iterator[_Candidate]
+    ) -> Iterator[Tuple[_Candidate, Optional[Tuple[str, str, str, str]]]]:
+        """
+        Read and hash candidates on a thread pool with a bounded in-flight window.
+
+        Threads rather than processes: file reads and SHA-256 over large
+        buffers release the GIL (``_read_file`` hashes the raw bytes, so
+        only the single UTF-8 decode holds it), and a process pool would
+        have to pickle every document body back to the parent.
+        """
+        max_in_flight = self.jobs * 4
+        executor = ThreadPoolExecutor(
+            max_workers=self.jobs, thread_name_prefix="qmd-crawl"
+        )
+        try:
+            if self.ordered:
+                window: Deque[Tuple[_Candidate, Future]] = deque()
+                for candidate in candidates:
+                    window.append(
+                        (candidate, executor.submit(self._read_file, candidate[0]))
+                    )
+                    if len(window) >= max_in_flight:
+                        candidate, future = window.popleft()
+                        yield candidate, future.result()
+                while window:
+                    candidate, future = window.popleft()
+                    yield candidate, future.result()
+            else:
+                pending: Dict[Future, _Candidate] = {}
+                for candidate in candidates:
+                    pending[executor.submit(self._read_file, candidate[0])] = candidate
+                    if len(pending) >= max_in_flight:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield pending.pop(future), future.result()
+                for future in as_completed(list(pending)):
+                    yield pending.pop(future), future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _cached_stat(self, rel_path: str) -> Optional[FileStat]:
+        if not self.stat_cache:
+            return None
+        entry = self.stat_cache.get(rel_path)
+        return FileStat(*entry) if entry is not None else None
 
     def _read_file(self, file_path: Path) -> Optional[Tuple[str, str, str, str]]:
         try:
-            content = file_path.read_text(encoding="utf-8")
-            doc_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            # Hash the raw bytes and decode once: no decode/re-encode round
+            # trip just to hash (identical digest for LF-only UTF-8 files)
+            raw = file_path.read_bytes()
+            doc_hash = hashlib.sha256(raw).hexdigest()
+            content = raw.decode("utf-8")
+            if "\r" in content:
+                # Universal newlines, as read_text() did
+                content = content.replace("\r\n", "\n").replace("\r", "\n")
             title = self._extract_title(content) or file_path.name
             rel_path = str(file_path.relative_to(self.root_path))
             return rel_path, content, doc_hash, title
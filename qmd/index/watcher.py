@@ -0,0 +1,196 @@
+"""
+Filesystem watcher for live incremental re-indexing (``qmd watch``).
+
+Change events are collected per collection and debounced: a batch is only
+released once no new event has arrived for ``debounce`` seconds, so an
+editor's save storm or a ``git checkout`` turns into one re-crawl of just
+the touched paths.
+
+Two event sources are supported:
+
+- watchdog (inotify / FSEvents / ReadDirectoryChangesW) when the optional
+  ``watchdog`` package is installed (``pip install qmd-python[watch]``)
+- stat polling otherwise: each tick compares (size, mtime_ns, inode) of the
+  matching files against the previous snapshot; no file is read
+"""
+
+import fnmatch
+import os
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence, Set, Tuple
+
+DEFAULT_DEBOUNCE = 1.0
+DEFAULT_POLL_INTERVAL = 2.0
+
+# (name, root_path, glob_pattern)
+WatchTarget = Tuple[str, str, str]
+
+
+def matches_glob(rel_path: str, pattern: str) -> bool:
+    """Match a relative path against a collection glob such as ``**/*.md``."""
+    rel_path = rel_path.replace(os.sep, "/")
+    if fnmatch.fnmatch(rel_path, pattern):
+        return True
+    # "**/" also matches zero directories ("**/*.md" matches "a.md")
+    while pattern.startswith("**/"):
+        pattern = pattern[3:]
+        if fnmatch.fnmatch(rel_path, pattern):
+            return True
+    return False
+
+
+class Debouncer:
+    """Thread-safe per-collection path accumulator with a quiet-period release."""
+
+    def __init__(self, delay: float = DEFAULT_DEBOUNCE):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Set[str]] = {}
+        self._last_event = 0.0
+
+    def add(self, collection: str, rel_path: str, now: Optional[float] = None) -> None:
+        with self._lock:
+            self._pending.setdefault(collection, set()).add(rel_path)
+            self._last_event = time.monotonic() if now is None else now
+
+    def ready(self, now: Optional[float] = None) -> bool:
+        """True once events are pending and none arrived for ``delay`` seconds."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return bool(self._pending) and now - self._last_event >= self.delay
+
+    def drain(self) -> Dict[str, Set[str]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            return pending
+
+
+class StatSnapshot:
+    """Stat-only view of a collection used by the polling backend."""
+
+    def __init__(self, root_path: str, glob_pattern: str):
+        self.root_path = Path(root_path)
+        self.glob_pattern = glob_pattern
+        self._entries = self._take()
+
+    def _take(self) -> Dict[str, Tuple[int, int, int]]:
+        entries: Dict[str, Tuple[int, int, int]] = {}
+        if not self.root_path.exists():
+            return entries
+        for file_path in self.root_path.glob(self.glob_pattern):
+            try:
+                st = file_path.stat()
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                rel_path = str(file_path.relative_to(self.root_path))
+                entries[rel_path] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        return entries
+
+    def poll(self) -> Set[str]:
+        """Return paths added, modified or removed since the previous poll."""
+        current = self._take()
+        previous, self._entries = self._entries, current
+        changed = {p for p, st in current.items() if previous.get(p) != st}
+        changed.update(p for p in previous if p not in current)
+        return changed
+
+
+class CollectionWatcher:
+    """
+    Watch several collections and yield debounced batches of touched paths.
+
+    Example:
+        watcher = CollectionWatcher([(col.name, col.path, col.glob_pattern)])
+        for batch in watcher.batches(stop_event):
+            for name, paths in batch.items():
+                _index_collection(col, db, paths=paths)
+    """
+
+    def __init__(
+        self,
+        targets: Sequence[WatchTarget],
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_polling: bool = False,
+    ):
+        self.targets = list(targets)
+        self.debounce = Debouncer(debounce)
+        self.poll_interval = poll_interval
+        self._observer = None if use_polling else self._start_watchdog()
+        self._snapshots: Dict[str, StatSnapshot] = {}
+        if self._observer is None:
+            self._snapshots = {
+                name: StatSnapshot(root, pattern) for name, root, pattern in self.targets
+            }
+
+    @property
+    def backend(self) -> str:
+        return "polling" if self._observer is None else "watchdog"
+
+    def _start_watchdog(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+
+        debounce = self.debounce
+
+        class _Handler(FileSystemEventHandler):
+            def __init__(self, name: str, root: str, pattern: str):
+                self.name = name
+                self.root = os.path.abspath(root)
+                self.pattern = pattern
+
+            def _record(self, path: str) -> None:
+                rel_path = os.path.relpath(os.path.abspath(path), self.root)
+                if not rel_path.startswith("..") and matches_glob(rel_path, self.pattern):
+                    debounce.add(self.name, rel_path)
+
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                self._record(event.src_path)
+                dest = getattr(event, "dest_path", "")
+                if dest:
+                    self._record(dest)
+
+        observer = Observer()
+        for name, root, pattern in self.targets:
+            if os.path.isdir(root):
+                observer.schedule(_Handler(name, root, pattern), root, recursive=True)
+        observer.start()
+        return observer
+
+    def poll_once(self) -> None:
+        """Feed stat-poll changes into the debouncer (polling backend only)."""
+        for name, snapshot in self._snapshots.items():
+            for rel_path in snapshot.poll():
+                self.debounce.add(name, rel_path)
+
+    def batches(self, stop: threading.Event) -> Iterator[Dict[str, Set[str]]]:
+        """Yield {collection: touched paths} batches until ``stop`` is set."""
+        tick = min(self.poll_interval, max(self.debounce.delay / 2, 0.05))
+        next_poll = 0.0
+        try:
+            while not stop.is_set():
+                now = time.monotonic()
+                if self._observer is None and now >= next_poll:
+                    self.poll_once()
+                    next_poll = now + self.poll_interval
+                if self.debounce.ready():
+                    yield self.debounce.drain()
+                stop.wait(tick)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
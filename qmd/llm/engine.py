@@ -18,6 +18,8 @@ from pathlib import Path
 import logging
 import os
 
+import numpy as np
+
 from qmd.models.downloader import ModelDownloader
 
 logger = logging.getLogger(__name__)
@@ -230,7 +232,7 @@ class LLMEngine:
             **(dict(providers=providers) if providers else {}),
         )
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for a list of texts.
 
@@ -238,13 +240,13 @@ class LLMEngine:
             texts: List of text strings
 
         Returns:
-            List of embedding vectors
+            Contiguous float32 array of shape (len(texts), dim)
         """
         if self.mode == "server" and self._client is not None:
             # Try server mode
             result = self._client.embed_texts(texts)
             if result is not None:
-                return result
+                return np.asarray(result, dtype=np.float32)
             else:
                 # Server unavailable, fallback to standalone
                 logger.warning("MCP server unavailable, falling back to standalone")
@@ -255,11 +257,10 @@ class LLMEngine:
         self._ensure_model()
         assert self._model is not None
 
-        # fastembed returns an iterator of numpy arrays
-        embeddings = list(self._model.embed(texts))
-        return [emb.tolist() for emb in embeddings]
+        # fastembed returns an iterator of float32 numpy arrays; stack them once
+        return np.asarray(list(self._model.embed(texts)), dtype=np.float32)
 
-    def embed_query(self, text: str) -> List[float]:
+    def embed_query(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single query string.
 
@@ -267,13 +268,13 @@ class LLMEngine:
             text: Query string
 
         Returns:
-            Embedding vector
+            float32 embedding vector of shape (dim,)
         """
         if self.mode == "server" and self._client is not None:
             # Server handles prefix internally; just send raw text
             result = self._client.embed_texts([text])
             if result is not None:
-                return result[0]
+                return np.asarray(result[0], dtype=np.float32)
             logger.warning("MCP server unavailable, falling back to standalone")
             self.mode = "standalone"
             self._client = None
@@ -281,7 +282,7 @@ class LLMEngine:
         self._ensure_model()
         assert self._model is not None
 
-        return list(self._model.embed([text]))[0].tolist()
+        return np.asarray(next(iter(self._model.embed([text]))), dtype=np.float32)
 
     def close(self) -> None:
         """Cleanup resources."""
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 import os
 import yaml
 from pathlib import Path
@@ -23,6 +23,40 @@ class AppConfig(BaseModel):
     # Model download source: "auto" (detect location), "huggingface", "modelscope"
     model_source: str = "auto"
 
+    # Query embedding cache (server): in-memory entries, TTL seconds, sqlite persistence
+    query_cache_size: int = 1024
+    query_cache_ttl: float = 7 * 24 * 3600
+    query_cache_persist: bool = True
+
+    # LLM result cache (query expansion) rows kept in sqlite, LRU-evicted
+    llm_cache_max_entries: int = 10_000
+
+    # Rerank score cache: entries (memory, and sqlite rows when persisted in
+    # its own rerank_cache table); memory-only unless rerank_cache_persist
+    rerank_cache_size: int = 20_000
+    rerank_cache_persist: bool = False
+
+    # Server executors: worker threads and admission limit (running + queued);
+    # requests beyond the limit get 503 instead of waiting
+    server_gpu_workers: int = 2
+    server_gpu_queue: int = 32
+    server_sqlite_workers: int = 4
+    server_sqlite_queue: int = 64
+
+    # Embed micro-batching: max wait for co-batched requests, pending-text limit
+    server_embed_batch_wait_ms: float = 5.0
+    server_embed_queue: int = 4096
+
+    # Embedding chunker: "chars" (~4 chars per token), "tokens" (the embed
+    # model's tokenizer fills chunks to an exact token budget; falls back to
+    # "chars" when the tokenizer is unavailable) or "markdown" (split on
+    # headings and code fences; chunks record their heading path).
+    # Existing vectors keep the chunking they were built with: after changing
+    # this (or the token sizes), run `qmd embed --force` to re-chunk.
+    chunk_strategy: Literal["chars", "tokens", "markdown"] = "chars"
+    chunk_size_tokens: int = 800
+    chunk_overlap_tokens: int = 120
+
     @classmethod
     def load(cls, path: Optional[Path] = None) -> "AppConfig":
         config_path = path or get_default_config_path()
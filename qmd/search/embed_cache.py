@@ -0,0 +1,231 @@
+"""
+Query embedding cache.
+
+Repeated queries (dashboards, agents, the original query re-used across
+``/query`` expansion variants) are embedded once. Entries are keyed on
+normalized query text plus model name; a bounded in-memory LRU sits in
+front of an optional sqlite table (``query_embeddings``) so warm entries
+survive server restarts. Persistence is write-behind: new entries are
+buffered and flushed in one transaction whenever the shared writer is free,
+so a cache miss never waits on the embed writer or the indexer.
+"""
+
+import logging
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from qmd.database.pool import ConnectionPool
+from qmd.utils.cache import LRUCache
+from qmd.utils.chunker import embedding_to_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 7 * 24 * 3600.0
+# Rows kept in the sqlite table; pruned every PRUNE_EVERY writes
+DEFAULT_PERSIST_SIZE = 10_000
+PRUNE_EVERY = 64
+# Entries buffered while the writer is busy; the oldest are dropped beyond
+# this (they stay in the in-memory LRU)
+MAX_PENDING = 256
+
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key normalization: NFKC plus whitespace collapsing.
+
+    Case is preserved — the embedding model is case-sensitive, so "Rust"
+    and "rust" may legitimately embed differently.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class QueryEmbeddingCache:
+    """
+    LRU/TTL cache of query embeddings with optional sqlite persistence.
+
+    Example:
+        cache = QueryEmbeddingCache(model="jina-v2-zh", pool=db.pool)
+        embed = cache.wrap(model_embed_fn)
+        vec = embed("如何使用向量检索")   # second call is a cache hit
+    """
+
+    def __init__(
+        self,
+        model: str,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        ttl: Optional[float] = DEFAULT_CACHE_TTL,
+        pool: Optional[ConnectionPool] = None,
+        persist_size: int = DEFAULT_PERSIST_SIZE,
+    ):
+        """
+        Args:
+            model: Embedding model name (part of the key)
+            maxsize: In-memory entries
+            ttl: Seconds an entry stays valid (memory and sqlite); None = forever
+            pool: Connection pool of an initialized QMD database; enables
+                  persistence in its ``query_embeddings`` table
+            persist_size: Max rows kept in sqlite
+        """
+        self.model = model
+        self.ttl = ttl
+        self.pool = pool
+        self.persist_size = persist_size
+        self._memory: LRUCache[np.ndarray] = LRUCache(maxsize, ttl)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._writes = 0
+        self._pending: Dict[str, tuple] = {}
+        self._pending_lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        query = normalize_query(text)
+        vec = self._memory.get(query)
+        if vec is None and self.pool is not None:
+            vec = self._load(query)
+            if vec is not None:
+                self.disk_hits += 1
+                self._memory.put(query, vec)
+        if vec is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vec
+
+    def put(self, text: str, embedding: Any) -> np.ndarray:
+        query = normalize_query(text)
+        vec = np.array(embedding, dtype=np.float32)
+        vec.setflags(write=False)  # shared between callers
+        self._memory.put(query, vec)
+        if self.pool is not None:
+            self._store(query, vec)
+        return vec
+
+    def get_or_embed(self, text: str, embed_fn: Callable[[str], Any]) -> np.ndarray:
+        vec = self.get(text)
+        if vec is None:
+            vec = self.put(text, embed_fn(text))
+        return vec
+
+    def get_or_embed_many(
+        self, texts: List[str], embed_batch_fn: Callable[[List[str]], Any]
+    ) -> List[np.ndarray]:
+        """Cached vectors for ``texts``; all misses are embedded in one batch call."""
+        vecs: List[Optional[np.ndarray]] = [self.get(t) for t in texts]
+        missing: Dict[str, List[int]] = {}
+        for i, vec in enumerate(vecs):
+            if vec is None:
+                missing.setdefault(normalize_query(texts[i]), []).append(i)
+        if missing:
+            fresh = embed_batch_fn([texts[idx[0]] for idx in missing.values()])
+            for idx, embedding in zip(missing.values(), fresh):
+                vec = self.put(texts[idx[0]], embedding)
+                for i in idx:
+                    vecs[i] = vec
+        return vecs
+
+    def wrap(self, embed_fn: Callable[[str], Any]) -> Callable[[str], np.ndarray]:
+        """Return ``embed_fn`` with this cache in front of it."""
+
+        def _cached(text: str) -> np.ndarray:
+            return self.get_or_embed(text, embed_fn)
+
+        return _cached
+
+    def wrap_batch(
+        self, embed_batch_fn: Callable[[List[str]], Any]
+    ) -> Callable[[List[str]], List[np.ndarray]]:
+        """Return ``embed_batch_fn`` with this cache in front of it."""
+
+        def _cached(texts: List[str]) -> List[np.ndarray]:
+            return self.get_or_embed_many(texts, embed_batch_fn)
+
+        return _cached
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "size": len(self._memory),
+            "maxsize": self._memory.maxsize,
+            "persistent": self.pool is not None,
+        }
+
+    # ------------------------------------------------------------------
+    # sqlite persistence (best effort: a failing cache never fails a query)
+    # ------------------------------------------------------------------
+
+    def _load(self, query: str) -> Optional[np.ndarray]:
+        try:
+            row = self.pool.reader().execute(
+                "SELECT embedding, created_at FROM query_embeddings WHERE model = ? AND query = ?",
+                (self.model, query),
+            ).fetchone()
+        except Exception as e:
+            logger.debug(f"Query embedding cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        if self.ttl is not None and time.time() - row["created_at"] >= self.ttl:
+            return None
+        return np.frombuffer(row["embedding"], dtype="<f4")
+
+    def _store(self, query: str, vec: np.ndarray) -> None:
+        with self._pending_lock:
+            self._pending.pop(query, None)
+            self._pending[query] = (self.model, query, embedding_to_bytes(vec), time.time())
+            while len(self._pending) > MAX_PENDING:
+                del self._pending[next(iter(self._pending))]
+        self.flush(block=False)
+
+    def flush(self, block: bool = True) -> None:
+        """
+        Write buffered entries to sqlite in one transaction.
+
+        With ``block=False`` (the query path) the flush is skipped when the
+        writer is busy; the entries stay buffered for the next attempt.
+        """
+        if self.pool is None or not self._pending:
+            return
+        try:
+            with (self.pool.writer() if block else self.pool.try_writer()) as conn:
+                if conn is None:
+                    return
+                with self._pending_lock:
+                    rows = list(self._pending.values())
+                    self._pending.clear()
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO query_embeddings (model, query, embedding, created_at)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+                before = self._writes
+                self._writes += len(rows)
+                if self._writes // PRUNE_EVERY != before // PRUNE_EVERY:
+                    self._prune(conn)
+        except Exception as e:
+            logger.debug(f"Query embedding cache write failed: {e}")
+
+    def _prune(self, conn) -> None:
+        if self.ttl is not None:
+            conn.execute(
+                "DELETE FROM query_embeddings WHERE created_at < ?",
+                (time.time() - self.ttl,),
+            )
+        conn.execute(
+            """
+            DELETE FROM query_embeddings WHERE rowid IN (
+                SELECT rowid FROM query_embeddings
+                ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.persist_size,),
+        )
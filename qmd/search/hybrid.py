@@ -1,9 +1,36 @@
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from .fts import FTSSearcher
 from .vector import VectorSearch
 from ..database.manager import DatabaseManager
 from collections import defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
 import math
+import threading
+import time
+
+# Threads of the BM25 executor shared by every HybridSearcher
+BM25_WORKERS = 4
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def shared_bm25_executor() -> ThreadPoolExecutor:
+    """Process-wide BM25 pool, so searcher instances don't each leak threads."""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(
+                max_workers=BM25_WORKERS, thread_name_prefix="qmd-bm25"
+            )
+        return _shared_executor
+
+
+def timed_call(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, float]:
+    """Run ``fn`` and return (result, elapsed seconds)."""
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t0
 
 
 class HybridSearcher:
@@ -12,11 +39,13 @@ class HybridSearcher:
 
     Args:
         db: Database manager
-        vector_db_dir: Directory for ChromaDB persistence
+        vector_db_dir: Optional separate SQLite path for vectors (default: db's pool)
         mode: Embedding mode - "auto", "standalone", or "server"
         server_url: MCP Server URL (used when mode="server")
         embed_fn: Optional callable (text -> embedding) to inject into VectorSearch.
                   When provided, mode/server_url are ignored for vector embedding.
+        executor: Executor for the BM25 leg, which runs concurrently with the
+                  vector leg (default: the process-wide ``shared_bm25_executor()``)
     """
 
     def __init__(
@@ -26,15 +55,25 @@ class HybridSearcher:
         mode: str = "auto",
         server_url: str = "http://localhost:18765",
         embed_fn: Optional[Callable[[str], List[float]]] = None,
+        executor: Optional[Executor] = None,
     ):
         self.fts = FTSSearcher(db)
+        # Without an explicit path, vector search shares the manager's pool
         self.vector = VectorSearch(
             vector_db_dir,
             mode=mode,
             server_url=server_url,
             embed_fn=embed_fn,
+            pool=db.pool if vector_db_dir is None else None,
         )
         self.db = db
+        self._executor = executor
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = shared_bm25_executor()
+        return self._executor
 
     def _reciprocal_rank_fusion(
         self,
@@ -88,24 +127,42 @@ class HybridSearcher:
         return {doc_id: entry["score"] for doc_id, entry in doc_scores.items()}
 
     def search(
-        self, query: str, collection: Optional[str] = None, limit: int = 10, k: int = 60
+        self,
+        query: str,
+        collection: Optional[str] = None,
+        limit: int = 10,
+        k: int = 60,
+        timings: Optional[Dict[str, float]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Perform hybrid search using Reciprocal Rank Fusion (RRF).
 
+        The BM25 and vector legs run concurrently, so latency is that of the
+        slower leg rather than the sum.
+
         TS implementation:
         - RRF formula: w / (k + rank + 1) where rank is 0-indexed
         - Top-rank bonus: +0.05 for rank 0, +0.02 for ranks 1-2
+
+        Args:
+            timings: Optional dict filled with per-leg seconds
+                     ("bm25_s", "vector_s")
         """
-        # 1. Get BM25 results (now with normalized scores)
-        fts_results = self.fts.search(query, limit=limit * 2, collection=collection)
+        # 1. BM25 results (normalized scores) on the executor...
+        fts_future = self.executor.submit(
+            timed_call, self.fts.search, query, limit=limit * 2, collection=collection
+        )
 
-        # 2. Get Vector results
+        # 2. ...while the vector leg (embedding + KNN) runs here.
         # Vector score: higher is better. Results are already sorted.
         # collection=None → VectorSearch.search() will search ALL collections
-        vector_results = self.vector.search(
-            query, collection_name=collection or None, limit=limit * 2
+        vector_results, vector_s = timed_call(
+            self.vector.search, query, collection_name=collection or None, limit=limit * 2
         )
+        fts_results, fts_s = fts_future.result()
+        if timings is not None:
+            timings["bm25_s"] = round(fts_s, 4)
+            timings["vector_s"] = round(vector_s, 4)
 
         # 3. Prepare ranked lists for RRF
         fts_ids = [f"{r['collection']}:{r['path']}" for r in fts_results]
@@ -149,13 +206,15 @@ class HybridSearcher:
                     "title": res.title,
                     "collection": col,
                     "path": path,
-                    "content": res.body,
+                    "content": res.snippet,
                     "vec_score": res.score,
                     "type": "vector",
+                    **res.chunk_fields(),
                 }
             else:
                 doc_info[doc_id]["type"] = "hybrid"
                 doc_info[doc_id]["vec_score"] = res.score
+                doc_info[doc_id].update(res.chunk_fields())
 
         # 6. Sort by RRF score and format results
         sorted_ids = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,207 @@
+"""
+Content-addressed cache of LLM results in the ``llm_cache`` table.
+
+Keys are sha256 digests over the operation name and every input that
+determines the output (query text, flags, model id), so a hit is always
+safe to reuse — greedy decoding is deterministic. Values are JSON.
+
+Used for query expansions and rerank scores. A bounded in-memory LRU sits
+in front of sqlite; the table itself is LRU-bounded by ``max_entries`` via
+``accessed_at``. ``qmd cleanup`` clears it.
+
+Persistence is write-behind, as in ``embed_cache``: inserts and
+``accessed_at`` touches are buffered and flushed through
+``ConnectionPool.try_writer()``, so request paths never wait on the embed
+writer or the indexer.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from qmd.database.pool import ConnectionPool
+from qmd.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MEMORY_SIZE = 4096
+# Skip the accessed_at write when the entry was touched this recently
+TOUCH_INTERVAL = 60.0
+# Inserts/touches buffered while the writer is busy; the oldest are dropped
+# beyond this (inserted values stay in the in-memory LRU)
+MAX_PENDING = 1024
+# Tables with the llm_cache layout (see qmd/database/schema.py)
+CACHE_TABLES = ("llm_cache", "rerank_cache")
+
+
+def make_key(op: str, **inputs: Any) -> str:
+    """sha256 over the operation and its inputs (order-independent)."""
+    payload = json.dumps({"op": op, **inputs}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    LRU-bounded cache for deterministic LLM outputs.
+
+    With a ``pool`` entries persist in ``table`` (``llm_cache``, or
+    ``rerank_cache`` for scores, so each has its own LRU budget); without
+    one the cache is memory-only. ``get_many`` costs one query per call and ``put_many``
+    at most one transaction, for callers that score many candidates at once
+    (rerank). LRU eviction runs only once the table exceeds ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[ConnectionPool] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        memory_size: int = DEFAULT_MEMORY_SIZE,
+        table: str = "llm_cache",
+    ):
+        if table not in CACHE_TABLES:
+            raise ValueError(f"Unknown cache table: {table}")
+        self.pool = pool
+        self.table = table
+        self.max_entries = max(1, max_entries)
+        self._memory: LRUCache[Any] = LRUCache(memory_size)
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._pending_touch: Dict[str, float] = {}
+        self._pending_lock = threading.Lock()
+        # Rows in llm_cache (over-counts replaced keys); counted on first flush
+        self._rows: Optional[int] = None
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, value: Any) -> None:
+        self.put_many({key: value})
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Cached values for the keys that hit; misses are absent."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        for key in keys:
+            value = self._memory.get(key)
+            if value is not None:
+                found[key] = value
+        missing = [k for k in keys if k not in found]
+        if missing and self.pool is not None:
+            for key, value in self._load(missing).items():
+                self._memory.put(key, value)
+                found[key] = value
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        if found and self.pool is not None:
+            self._touch(list(found))
+        return found
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        for key, value in items.items():
+            self._memory.put(key, value)
+        if self.pool is None:
+            return
+        now = time.time()
+        with self._pending_lock:
+            for key, value in items.items():
+                self._pending.pop(key, None)
+                self._pending[key] = (json.dumps(value, ensure_ascii=False), now)
+                self._touched[key] = now
+            while len(self._pending) > MAX_PENDING:
+                del self._pending[next(iter(self._pending))]
+        self.flush(block=False)
+
+    def flush(self, block: bool = True) -> None:
+        """
+        Write buffered inserts and touches to sqlite in one transaction.
+
+        With ``block=False`` (request paths) the flush is skipped when the
+        writer is busy; the buffer is retried on the next put or touch.
+        """
+        if self.pool is None or not (self._pending or self._pending_touch):
+            return
+        try:
+            with (self.pool.writer() if block else self.pool.try_writer()) as conn:
+                if conn is None:
+                    return
+                with self._pending_lock:
+                    inserts = [(k, r, t) for k, (r, t) in self._pending.items()]
+                    touches = [(t, k) for k, t in self._pending_touch.items()]
+                    self._pending.clear()
+                    self._pending_touch.clear()
+                conn.executemany(
+                    f"""
+                    INSERT OR REPLACE INTO {self.table} (hash, result, created_at, accessed_at)
+                    VALUES (?, ?, datetime('now'), ?)
+                    """,
+                    inserts,
+                )
+                conn.executemany(f"UPDATE {self.table} SET accessed_at = ? WHERE hash = ?", touches)
+                if self._rows is None:
+                    self._rows = conn.execute(f"SELECT count(*) FROM {self.table}").fetchone()[0]
+                else:
+                    self._rows += len(inserts)
+                if self._rows > self.max_entries:
+                    self._evict(conn)
+        except Exception as e:
+            logger.debug(f"LLM cache write failed: {e}")
+
+    def _evict(self, conn) -> None:
+        """LRU eviction down to the size limit."""
+        conn.execute(
+            f"""
+            DELETE FROM {self.table} WHERE hash IN (
+                SELECT hash FROM {self.table}
+                ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+        self._rows = conn.execute(f"SELECT count(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_size": len(self._memory),
+            "max_entries": self.max_entries,
+            "persistent": self.pool is not None,
+        }
+
+    def _load(self, keys: List[str]) -> Dict[str, Any]:
+        try:
+            rows = self.pool.reader().execute(
+                f"SELECT hash, result FROM {self.table} WHERE hash IN (SELECT value FROM json_each(?))",
+                (json.dumps(keys),),
+            ).fetchall()
+        except Exception as e:
+            logger.debug(f"LLM cache read failed: {e}")
+            return {}
+        return {row["hash"]: json.loads(row["result"]) for row in rows}
+
+    def _touch(self, keys: List[str]) -> None:
+        """Refresh accessed_at for LRU ordering, at most once per TOUCH_INTERVAL per key."""
+        now = time.time()
+        stale = [k for k in keys if now - self._touched.get(k, 0.0) >= TOUCH_INTERVAL]
+        if not stale:
+            return
+        with self._pending_lock:
+            if len(self._touched) > self.max_entries:
+                self._touched.clear()
+            for key in stale:
+                self._touched[key] = now
+                if key in self._pending:
+                    self._pending[key] = (self._pending[key][0], now)
+                else:
+                    self._pending_touch[key] = now
+            while len(self._pending_touch) > MAX_PENDING:
+                del self._pending_touch[next(iter(self._pending_touch))]
+        self.flush(block=False)
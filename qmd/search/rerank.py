@@ -1,10 +1,32 @@
+import logging
 import os
 import time
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
 from pathlib import Path
 
 from qmd.models.downloader import ModelDownloader
 
+if TYPE_CHECKING:
+    from qmd.search.llm_cache import LLMCache
+
+logger = logging.getLogger(__name__)
+
+EXPANSION_MODEL_NAME = "onnx-community/Qwen3-0.6B-ONNX"
+
+# Rerank input per document: the matched chunk ("snippet") when the result
+# carries one, else the document prefix. The cross-encoder truncates at 512
+# tokens, so longer text would only add padding work.
+RERANK_SNIPPET_CHARS = 800
+RERANK_DOC_CHARS = 300
+
+
+def rerank_text(doc: Dict[str, Any]) -> str:
+    """Text the cross-encoder scores for a search result."""
+    snippet = doc.get("snippet")
+    if snippet:
+        return snippet[:RERANK_SNIPPET_CHARS]
+    return doc.get("content", doc.get("title", ""))[:RERANK_DOC_CHARS]
+
 
 def _get_device() -> str:
     """Auto-detect best available device (cuda > mps > cpu)."""
@@ -33,16 +55,26 @@ class LLMReranker:
         model_name: str = "thomasht86/Qwen3-Reranker-0.6B-int8-ONNX",
         local_reranker_path: Optional[Path] = None,
         local_expansion_path: Optional[Path] = None,
+        expansion_cache: Optional["LLMCache"] = None,
+        score_cache: Optional["LLMCache"] = None,
+        pair_scorer: Optional[Callable[[List[Tuple[str, str]]], Sequence[float]]] = None,
     ):
         """
         Args:
             model_name: HuggingFace model ID or local path
             local_reranker_path: Local path for reranker model
             local_expansion_path: Local path for expansion model
+            expansion_cache: Persistent cache for expand_query results
+            score_cache: Cache of cross-encoder scores (memory-only or sqlite-backed)
+            pair_scorer: Replacement for score_pairs() used by rerank(), e.g. a
+                         cross-request batching queue in front of it
         """
         self.model_name = model_name
         self.local_reranker_path = local_reranker_path
         self.local_expansion_path = local_expansion_path
+        self.expansion_cache = expansion_cache
+        self.score_cache = score_cache
+        self.pair_scorer = pair_scorer
         self._tokenizer = None
         self._model = None
         self._expansion_model = None
@@ -50,6 +82,34 @@ class LLMReranker:
         self._device = _get_device()
         self._torch_device = "cuda" if self._device == "cuda" else "cpu"
         self._downloader: Optional[ModelDownloader] = None
+        self._model_paths: Dict[str, str] = {}
+
+    def _model_path(self, kind: str) -> str:
+        """
+        Model directory (or hub id) for ``kind`` ("reranker"/"expansion"):
+        a non-empty local path, else the downloader cache, else the default.
+
+        Resolved once and also used in cache keys, so cached results are
+        tied to the model that actually produces them.
+        """
+        if kind not in self._model_paths:
+            if kind == "reranker":
+                model_path, local = self.model_name, self.local_reranker_path
+            else:
+                model_path, local = EXPANSION_MODEL_NAME, self.local_expansion_path
+            if local and local.exists():
+                # Check if directory is not empty
+                if any(local.iterdir()):
+                    model_path = str(local)
+            else:
+                # Try downloader cache
+                if self._downloader is None:
+                    self._downloader = ModelDownloader()
+                cached = self._downloader.get_model_path(kind)
+                if cached and any(cached.iterdir()):
+                    model_path = str(cached)
+            self._model_paths[kind] = model_path
+        return self._model_paths[kind]
 
     @property
     def model(self):
@@ -60,16 +120,7 @@ class LLMReranker:
                 import torch  # 二次保险：确保 torch/lib DLL 目录已注册
 
                 # Determine model path (local > download)
-                model_path = self.model_name
-                if self.local_reranker_path and self.local_reranker_path.exists():
-                    if any(self.local_reranker_path.iterdir()):
-                        model_path = str(self.local_reranker_path)
-                else:
-                    if self._downloader is None:
-                        self._downloader = ModelDownloader()
-                    cached = self._downloader.get_model_path("reranker")
-                    if cached and any(cached.iterdir()):
-                        model_path = str(cached)
+                model_path = self._model_path("reranker")
 
                 provider = (
                     "CUDAExecutionProvider"
@@ -117,20 +168,7 @@ class LLMReranker:
                 import torch  # 二次保险：确保 torch/lib DLL 目录已注册
 
                 # Determine model path (local > download)
-                model_name = "onnx-community/Qwen3-0.6B-ONNX"
-                model_path = model_name
-
-                if self.local_expansion_path and self.local_expansion_path.exists():
-                    # Check if directory is not empty
-                    if any(self.local_expansion_path.iterdir()):
-                        model_path = str(self.local_expansion_path)
-                else:
-                    # Try downloader cache
-                    if self._downloader is None:
-                        self._downloader = ModelDownloader()
-                    cached = self._downloader.get_model_path("expansion")
-                    if cached and any(cached.iterdir()):
-                        model_path = str(cached)
+                model_path = self._model_path("expansion")
 
                 provider = (
                     "CUDAExecutionProvider"
@@ -179,6 +217,38 @@ class LLMReranker:
     def expand_query(
         self, query: str, include_lexical: bool = True
     ) -> Dict[str, List[str]]:
+        """
+        Expand query into lex/vec/hyde variants, served from ``expansion_cache``
+        when possible.
+
+        Decoding is greedy, so a given (query, include_lexical, model) always
+        expands the same way; only failures (model missing, decode error)
+        are not cached.
+        """
+        key = None
+        if self.expansion_cache is not None:
+            from qmd.search.llm_cache import make_key
+
+            key = make_key(
+                "expand_query",
+                query=query,
+                include_lexical=include_lexical,
+                model=self._model_path("expansion"),
+            )
+            cached = self.expansion_cache.get(key)
+            if cached is not None:
+                return {k: list(v) for k, v in cached.items()}
+
+        result = self._expand_query_uncached(query, include_lexical)
+        if result is None:
+            return {"lex": [], "vec": [], "hyde": []}
+        if key is not None:
+            self.expansion_cache.put(key, result)
+        return result
+
+    def _expand_query_uncached(
+        self, query: str, include_lexical: bool = True
+    ) -> Optional[Dict[str, List[str]]]:
         """
         Expand query into lex/vec/hyde variants using Qwen3-0.6B-Instruct ONNX.
 
@@ -193,10 +263,11 @@ class LLMReranker:
 
         Returns:
             Dict with keys: {"lex": [...], "vec": [...], "hyde": [...]}
-            Each list contains query variants of that type
+            Each list contains query variants of that type; None when the
+            model is unavailable or decoding failed
         """
         if not self.expansion_model:
-            return {"lex": [], "vec": [], "hyde": []}
+            return None
 
         try:
             # Build prompt with type prefixes
@@ -375,213 +446,57 @@ Generate 2-3 variants total:"""
 
         except Exception as e:
             print(f"Query expansion error: {e}")
-            return {"lex": [], "vec": [], "hyde": []}
-
-        try:
-            # Use ChatML format for Qwen3 (apply_chat_template)
-            messages = [
-                {
-                    "role": "user",
-                    "content": (
-                        f"Given the following search query, generate 2 alternative "
-                        f"search queries that capture the same intent but use different "
-                        f"wording or synonyms. Return only the variants, one per line.\n\n"
-                        f"Query: {query}"
-                    ),
-                }
-            ]
-            try:
-                prompt = self._expansion_tokenizer.apply_chat_template(
-                    messages, tokenize=False, add_generation_prompt=True
-                )
-            except Exception:
-                prompt = (
-                    f"Given the following search query, generate 2 alternative search "
-                    f"queries that capture the same intent but use different wording or "
-                    f"synonyms. Return only the variants, one per line.\n\nQuery: {query}\n"
-                )
-
-            import numpy as np
-
-            enc = self._expansion_tokenizer(
-                prompt, return_tensors="np", truncation=True, max_length=512
-            )
-            input_ids = enc["input_ids"]  # (1, seq)
-            attention_mask = enc["attention_mask"]  # (1, seq)
-
-            # ORT session: 28 layers, 8 kv_heads, head_dim=128
-            ort_session = self._expansion_model  # raw InferenceSession stored here
-            print(f"[Expansion] providers active: {ort_session.get_providers()}")
-            NUM_LAYERS = 28
-            KV_HEADS = 8
-            HEAD_DIM = 128
-
-            generated = input_ids.copy()  # (1, seq)
-
-            # Initialize empty KV cache.
-            # q4f16 model expects float16 KV tensors; int8 model expects float32.
-            # Detect by checking if any input has float16 type.
-            _input_types = {inp.name: inp.type for inp in ort_session.get_inputs()}
-            _kv_dtype = (
-                np.float16
-                if any("float16" in t for t in _input_types.values())
-                else np.float32
-            )
-            past_seq = 0
-            pkv = {
-                f"past_key_values.{i}.{kv}": np.zeros(
-                    (1, KV_HEADS, past_seq, HEAD_DIM), dtype=_kv_dtype
-                )
-                for i in range(NUM_LAYERS)
-                for kv in ("key", "value")
-            }
-
-            eos_id = self._expansion_tokenizer.eos_token_id
-            _t0 = time.perf_counter()
-
-            for step in range(
-                25
-            ):  # max_new_tokens=25 (2 short variants fit in ~20 tokens)
-                seq_len = generated.shape[1]
-                pos_ids = np.arange(past_seq, past_seq + 1, dtype=np.int64).reshape(
-                    1, 1
-                )
-                attn_mask = np.ones(
-                    (1, past_seq + seq_len if past_seq == 0 else past_seq + 1),
-                    dtype=np.int64,
-                )
-
-                if past_seq == 0:
-                    # Prefill: process entire prompt
-                    cur_input = generated
-                    pos_ids = np.arange(seq_len, dtype=np.int64).reshape(1, seq_len)
-                    attn_mask = attention_mask
-                else:
-                    # Decode: process one token at a time
-                    cur_input = generated[:, -1:]
-
-                feeds = {
-                    "input_ids": cur_input,
-                    "attention_mask": attn_mask,
-                    "position_ids": pos_ids,
-                    **pkv,
-                }
-
-                outs = ort_session.run(None, feeds)
-                logits = outs[0]  # (1, step_seq, vocab)
-
-                # Update KV cache from outputs
-                out_names = [o.name for o in ort_session.get_outputs()]
-                new_pkv = {}
-                for i, name in enumerate(out_names):
-                    if "present" in name or "past" in name:
-                        new_pkv[name.replace("present", "past_key_values")] = outs[i]
-                if new_pkv:
-                    pkv = new_pkv
-                    past_seq = list(pkv.values())[0].shape[2]
-                else:
-                    past_seq += cur_input.shape[1]
-
-                # Greedy: argmax on last token logits
-                next_token = int(logits[0, -1].argmax())
-                if next_token == eos_id:
-                    break
-                generated = np.concatenate(
-                    [generated, np.array([[next_token]], dtype=np.int64)], axis=1
-                )
-
-            print(
-                f"[Expansion] decode {step + 1} steps, {time.perf_counter() - _t0:.2f}s"
-            )
-            input_len = input_ids.shape[1]
-            response = self._expansion_tokenizer.decode(
-                generated[0][input_len:], skip_special_tokens=True
-            ).strip()
-
-            variants = [v.strip() for v in response.split("\n") if v.strip()]
-            return [query] + variants[:2]
-        except Exception as e:
-            print(f"Query expansion error: {e}")
-            return [query]
+            return None
 
     def rerank(
         self, query: str, documents: List[Dict[str, Any]], top_k: int = 10
     ) -> List[Dict[str, Any]]:
-        """Rerank documents using cross-encoder."""
+        """
+        Rerank documents using cross-encoder.
+
+        Scores are cached per (normalized query, scored text, model) in
+        ``score_cache``; only misses go through the ORT session, so paginated
+        and refined queries mostly skip inference.
+        """
         if not documents:
             return []
 
         if not self.model:
             return documents[:top_k]
 
-        # Prepare pairs for cross-encoder
-        # Use content if available, otherwise title
+        # Best-matching chunk if known, else content prefix, else title
+        doc_texts = [rerank_text(doc) for doc in documents]
+        scores: List[Optional[float]] = [None] * len(documents)
+        keys: List[str] = []
         try:
-            import numpy as np
-
-            SYSTEM_PROMPT = (
-                "Judge whether the Document meets the requirements based on the Query "
-                'and the Candidate Document, output "yes" or "no" to indicate '
-                "the relevance of the document."
-            )
-
-            def _make_input(query: str, doc: str) -> str:
-                messages = [
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {
-                        "role": "user",
-                        "content": f"<Query>{query}</Query>\n<Document>{doc}</Document>",
-                    },
+            if self.score_cache is not None:
+                from qmd.search.embed_cache import normalize_query
+                from qmd.search.llm_cache import make_key
+
+                norm_query = normalize_query(query)
+                model_path = self._model_path("reranker")
+                keys = [
+                    make_key("rerank", query=norm_query, text=t, model=model_path)
+                    for t in doc_texts
                 ]
-                return (
-                    self._tokenizer.apply_chat_template(
-                        messages, tokenize=False, add_generation_prompt=True
-                    )
-                    + "<think>\n\n</think>\n\n"
+                cached = self.score_cache.get_many(keys)
+                scores = [cached.get(k) for k in keys]
+
+            missing = [i for i, score in enumerate(scores) if score is None]
+            if missing:
+                scorer = self.pair_scorer or self.score_pairs
+                fresh = scorer([(query, doc_texts[i]) for i in missing])
+                for i, score in zip(missing, fresh):
+                    scores[i] = float(score)
+                if keys:
+                    self.score_cache.put_many({keys[i]: scores[i] for i in missing})
+            if len(missing) < len(documents):
+                logger.debug(
+                    f"[Reranker] {len(documents) - len(missing)}/{len(documents)} scores from cache"
                 )
 
-            ort_session = self._model
-            input_names = {inp.name for inp in ort_session.get_inputs()}
-            print(
-                f"[Reranker] providers active: {ort_session.get_providers()}, docs={len(documents)}"
-            )
-            _t0 = time.perf_counter()
-
-            # Build prompts for all docs at once
-            doc_texts = [
-                doc.get("content", doc.get("title", ""))[:300] for doc in documents
-            ]
-            prompts = [_make_input(query, t) for t in doc_texts]
-
-            # Tokenize as a batch with padding
-            enc = self._tokenizer(
-                prompts,
-                padding=True,
-                truncation=True,
-                return_tensors="np",
-                max_length=512,
-            )
-
-            # Build ORT inputs - auto-detect which inputs the model requires
-            ort_inputs = {
-                "input_ids": enc["input_ids"],
-                "attention_mask": enc["attention_mask"],
-            }
-            if "position_ids" in input_names:
-                batch, seq = enc["input_ids"].shape
-                ort_inputs["position_ids"] = np.broadcast_to(
-                    np.arange(seq, dtype=np.int64), (batch, seq)
-                ).copy()
-
-            # Single batch forward → (batch, 1) or (batch, num_labels)
-            outs = ort_session.run(None, ort_inputs)
-            scores = outs[0].squeeze(-1).flatten()  # (batch,)
-
-            print(
-                f"[Reranker] {len(documents)} docs scored in {time.perf_counter() - _t0:.2f}s"
-            )
-            for i, doc in enumerate(documents):
-                doc["rerank_score"] = float(scores[i])
+            for doc, score in zip(documents, scores):
+                doc["rerank_score"] = score
 
             reranked = sorted(
                 documents, key=lambda x: x.get("rerank_score", 0), reverse=True
@@ -590,3 +505,73 @@ Generate 2-3 variants total:"""
         except Exception as e:
             print(f"Reranking error: {e}")
             return documents[:top_k]
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]):
+        """
+        Cross-encoder scores for (query, document text) pairs in one ORT
+        batch → (n,) array.
+
+        Pairs may mix queries, so the server's rerank batcher can merge
+        candidates from concurrent requests into one forward pass.
+        """
+        import numpy as np
+
+        SYSTEM_PROMPT = (
+            "Judge whether the Document meets the requirements based on the Query "
+            'and the Candidate Document, output "yes" or "no" to indicate '
+            "the relevance of the document."
+        )
+
+        def _make_input(query: str, doc: str) -> str:
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"<Query>{query}</Query>\n<Document>{doc}</Document>",
+                },
+            ]
+            return (
+                self._tokenizer.apply_chat_template(
+                    messages, tokenize=False, add_generation_prompt=True
+                )
+                + "<think>\n\n</think>\n\n"
+            )
+
+        ort_session = self._model
+        input_names = {inp.name for inp in ort_session.get_inputs()}
+        print(
+            f"[Reranker] providers active: {ort_session.get_providers()}, docs={len(pairs)}"
+        )
+        _t0 = time.perf_counter()
+
+        # Build prompts for all pairs at once
+        prompts = [_make_input(q, t) for q, t in pairs]
+
+        # Tokenize as a batch with padding
+        enc = self._tokenizer(
+            prompts,
+            padding=True,
+            truncation=True,
+            return_tensors="np",
+            max_length=512,
+        )
+
+        # Build ORT inputs - auto-detect which inputs the model requires
+        ort_inputs = {
+            "input_ids": enc["input_ids"],
+            "attention_mask": enc["attention_mask"],
+        }
+        if "position_ids" in input_names:
+            batch, seq = enc["input_ids"].shape
+            ort_inputs["position_ids"] = np.broadcast_to(
+                np.arange(seq, dtype=np.int64), (batch, seq)
+            ).copy()
+
+        # Single batch forward → (batch, 1) or (batch, num_labels)
+        outs = ort_session.run(None, ort_inputs)
+        scores = outs[0].squeeze(-1).flatten()  # (batch,)
+
+        print(
+            f"[Reranker] {len(pairs)} docs scored in {time.perf_counter() - _t0:.2f}s"
+        )
+        return scores
@@ -6,10 +6,12 @@ compatibility with TypeScript implementation.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional
 from pydantic import BaseModel
+from qmd.database.pool import ConnectionPool
 from qmd.llm.engine import LLMEngine
-from qmd.utils.chunker import embedding_to_bytes
+from qmd.search.embed_cache import QueryEmbeddingCache
+from qmd.utils.chunker import CHUNK_SIZE_CHARS, embedding_to_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -18,10 +20,15 @@ class SearchResult(BaseModel):
     filepath: str  # "qmd://collection/path"
     display_path: str  # "collection/path"
     title: str
-    body: str
+    snippet: str  # text of the best-matching chunk (not the whole document)
     score: float
     hash: str
     collection: str  # extracted from display_path prefix
+    heading: str = ""  # heading path of the matched chunk ("A > B"), if any
+    # Best-matching chunk: character offset/length in the document, chunk index
+    chunk_pos: int = 0
+    chunk_len: int = 0
+    chunk_seq: int = 0
 
     @property
     def path(self) -> str:
@@ -29,6 +36,12 @@ class SearchResult(BaseModel):
         parts = self.display_path.split("/", 1)
         return parts[1] if len(parts) > 1 else self.display_path
 
+    def chunk_fields(self) -> Dict[str, Any]:
+        """Best-chunk fields (snippet, heading, span) for result dicts."""
+        return self.model_dump(
+            include={"snippet", "heading", "chunk_pos", "chunk_len", "chunk_seq"}
+        )
+
 
 class VectorSearch:
     """
@@ -44,6 +57,9 @@ class VectorSearch:
         mode: str = "auto",
         server_url: str = "http://localhost:18765",
         embed_fn: Optional[callable] = None,
+        pool: Optional[ConnectionPool] = None,
+        embed_cache: Optional[QueryEmbeddingCache] = None,
+        embed_batch_fn: Optional[Callable[[List[str]], Any]] = None,
     ):
         """
         Args:
@@ -51,15 +67,27 @@ class VectorSearch:
             mode: Embedding mode - "auto", "standalone", or "server"
             server_url: MCP Server URL (used when mode="server")
             embed_fn: Optional custom embed function
+            pool: Connection pool to share (e.g. DatabaseManager.pool);
+                  a private pool is created when omitted
+            embed_cache: Query embedding cache; when omitted and no embed_fn
+                  is given, an in-memory cache for the local model is used
+                  (an injected embed_fn is expected to bring its own)
+            embed_batch_fn: Optional batch counterpart of embed_fn
+                  (list of texts -> vectors) used by search_many()
         """
         if db_path is None:
             from pathlib import Path
 
-            db_path = str(Path.home() / ".qmd" / "qmd.db")
+            db_path = pool.db_path if pool else str(Path.home() / ".qmd" / "qmd.db")
 
         self.db_path = db_path
+        self.pool = pool or ConnectionPool(db_path)
         self.embed_fn = embed_fn
+        self.embed_batch_fn = embed_batch_fn
         self.llm = None if embed_fn else LLMEngine(mode=mode, server_url=server_url)
+        if embed_cache is None and self.llm is not None:
+            embed_cache = QueryEmbeddingCache(model=self.llm.model_name)
+        self.embed_cache = embed_cache
 
     def _embed_query(self, text: str) -> bytes:
         """
@@ -68,13 +96,34 @@ class VectorSearch:
         Returns:
             bytes: float32 little-endian packed embedding
         """
-        if self.embed_fn:
-            embedding = self.embed_fn(text)
+        embed = self.embed_fn or self.llm.embed_query
+        if self.embed_cache is not None:
+            embedding = self.embed_cache.get_or_embed(text, embed)
         else:
-            embedding = self.llm.embed_query(text)
+            embedding = embed(text)
 
         return embedding_to_bytes(embedding)
 
+    def embed_queries(self, texts: List[str]) -> List[bytes]:
+        """
+        Embed several queries with a single model call (cache misses only).
+
+        Falls back to one call per text when only a single-text embed_fn
+        was injected.
+        """
+        if self.embed_batch_fn is not None:
+            embeddings = self.embed_batch_fn(texts)
+        elif self.llm is not None:
+            if self.embed_cache is not None:
+                embeddings = self.embed_cache.get_or_embed_many(
+                    texts, self.llm.embed_texts
+                )
+            else:
+                embeddings = self.llm.embed_texts(texts)
+        else:
+            return [self._embed_query(t) for t in texts]
+        return [embedding_to_bytes(e) for e in embeddings]
+
     def search(
         self,
         query: str,
@@ -85,7 +134,7 @@ class VectorSearch:
         Perform semantic search using sqlite-vec two-step approach.
 
         Step 1: Query vectors_vec for nearest neighbors (no JOIN)
-        Step 2: Fetch document metadata using hash_seq
+        Step 2: Fetch document metadata via content_vectors.chunk_hash
 
         Args:
             query: Search query string
@@ -95,95 +144,134 @@ class VectorSearch:
         Returns:
             List of SearchResult sorted by score descending
         """
-        import sqlite3
-        import sqlite_vec
+        return self.search_vectors(
+            [self._embed_query(query)], collection_name, limit
+        )[0]
 
-        # Get query embedding as bytes
-        query_bytes = self._embed_query(query)
+    def search_many(
+        self,
+        queries: List[str],
+        collection_name: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[List[SearchResult]]:
+        """
+        Search several queries (e.g. expansion variants) at once.
 
-        # Connect to database and load sqlite-vec
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.enable_load_extension(True)
-        sqlite_vec.load(conn)
-        conn.enable_load_extension(False)
+        All queries are embedded in one model batch; the KNN lookups and a
+        single metadata fetch for their union run on one pooled connection.
 
-        try:
-            # Step 1: Query vectors_vec (no JOIN - avoids deadlock)
+        Returns:
+            One result list per query, in input order (same shape as search())
+        """
+        if not queries:
+            return []
+        return self.search_vectors(
+            self.embed_queries(list(queries)), collection_name, limit
+        )
+
+    def search_vectors(
+        self,
+        query_vectors: List[bytes],
+        collection_name: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[List[SearchResult]]:
+        """
+        KNN + metadata lookup for already-embedded queries (sqlite only).
+
+        search_many() is embed_queries() followed by this; callers that keep
+        model work and DB work on separate threads call the two halves.
+        """
+        # Pooled per-thread connection: sqlite-vec already loaded
+        conn = self.pool.reader()
+
+        # Step 1: Query vectors_vec (no JOIN - avoids deadlock)
+        dist_maps: List[Dict[str, float]] = []
+        for query_bytes in query_vectors:
             vec_rows = conn.execute(
                 """
-                SELECT hash_seq, distance
+                SELECT chunk_hash, distance
                 FROM vectors_vec
                 WHERE embedding MATCH ? AND k = ?
                 """,
                 (query_bytes, limit * 3),  # Get 3x for dedup
             ).fetchall()
+            dist_maps.append({row["chunk_hash"]: row["distance"] for row in vec_rows})
+
+        chunk_hashes = list(dict.fromkeys(ch for dm in dist_maps for ch in dm))
+        if not chunk_hashes:
+            return [[] for _ in query_vectors]
+        placeholders = ",".join(["?" for _ in chunk_hashes])
+
+        # Step 2: Fetch document metadata with JOIN (union of all queries' hits).
+        # A chunk shared by several documents maps to several rows. Only the
+        # chunk's own text is read (substr), never the whole document; rows
+        # written before chunk lengths were stored fall back to the chunk size.
+        sql = f"""
+            SELECT
+                cv.chunk_hash,
+                cv.hash,
+                cv.seq,
+                cv.pos,
+                cv.heading,
+                'qmd://' || d.collection || '/' || d.path as filepath,
+                d.collection || '/' || d.path as display_path,
+                d.title,
+                d.collection,
+                substr(c.doc, cv.pos + 1, CASE WHEN cv.len > 0 THEN cv.len ELSE ? END) as snippet
+            FROM content_vectors cv
+            JOIN documents d ON d.hash = cv.hash AND d.active = 1
+            JOIN content c ON c.hash = d.hash
+            WHERE cv.chunk_hash IN ({placeholders})
+        """
+        params: List[Any] = [CHUNK_SIZE_CHARS, *chunk_hashes]
 
-            if not vec_rows:
-                return []
-
-            # Extract hash_seqs
-            hash_seqs = [row["hash_seq"] for row in vec_rows]
-            placeholders = ",".join(["?" for _ in hash_seqs])
-
-            # Step 2: Fetch document metadata with JOIN
-            sql = f"""
-                SELECT
-                    cv.hash || '_' || cv.seq as hash_seq,
-                    cv.hash,
-                    cv.pos,
-                    'qmd://' || d.collection || '/' || d.path as filepath,
-                    d.collection || '/' || d.path as display_path,
-                    d.title,
-                    d.collection,
-                    c.doc as body
-                FROM content_vectors cv
-                JOIN documents d ON d.hash = cv.hash AND d.active = 1
-                JOIN content c ON c.hash = d.hash
-                WHERE cv.hash || '_' || cv.seq IN ({placeholders})
-            """
-            params = list(hash_seqs)
-
-            if collection_name:
-                sql += " AND d.collection = ?"
-                params.append(collection_name)
-
-            doc_rows = conn.execute(sql, params).fetchall()
-
-            # Map hash_seq to distance
-            dist_map = {row["hash_seq"]: row["distance"] for row in vec_rows}
-
-            # Merge and dedup by (collection, path)
-            seen: set = set()
-            results: List[SearchResult] = []
-
-            for row in doc_rows:
-                key = (row["collection"], row["display_path"])
-                if key in seen:
-                    continue
-
-                seen.add(key)
-                distance = dist_map.get(row["hash_seq"], 1.0)
-                score = 1.0 - distance  # Convert cosine distance to similarity
-
-                results.append(
-                    SearchResult(
-                        filepath=row["filepath"],
-                        display_path=row["display_path"],
-                        title=row["title"],
-                        body=row["body"],
-                        score=score,
-                        hash=row["hash"],
-                        collection=row["collection"],
-                    )
-                )
+        if collection_name:
+            sql += " AND d.collection = ?"
+            params.append(collection_name)
+
+        doc_rows = conn.execute(sql, params).fetchall()
 
-            # Sort by score descending and take top-N
-            results.sort(key=lambda x: x.score, reverse=True)
-            return results[:limit]
+        return [self._merge_rows(doc_rows, dist_map, limit) for dist_map in dist_maps]
+
+    @staticmethod
+    def _merge_rows(
+        doc_rows: List[Any], dist_map: Dict[str, float], limit: int
+    ) -> List[SearchResult]:
+        # Merge and dedup by (collection, path); nearest chunk first, so each
+        # document is represented by its best-matching chunk
+        seen: set = set()
+        results: List[SearchResult] = []
+
+        hits = [row for row in doc_rows if row["chunk_hash"] in dist_map]
+        hits.sort(key=lambda row: (dist_map[row["chunk_hash"]], row["seq"]))
+        for row in hits:
+            key = (row["collection"], row["display_path"])
+            if key in seen:
+                continue
+
+            seen.add(key)
+            distance = dist_map[row["chunk_hash"]]
+            score = 1.0 - distance  # Convert cosine distance to similarity
+
+            results.append(
+                SearchResult(
+                    filepath=row["filepath"],
+                    display_path=row["display_path"],
+                    title=row["title"],
+                    snippet=row["snippet"],
+                    score=score,
+                    hash=row["hash"],
+                    collection=row["collection"],
+                    heading=row["heading"],
+                    chunk_pos=row["pos"],
+                    chunk_len=len(row["snippet"]),
+                    chunk_seq=row["seq"],
+                )
+            )
 
-        finally:
-            conn.close()
+        # Sort by score descending and take top-N
+        results.sort(key=lambda x: x.score, reverse=True)
+        return results[:limit]
 
     def add_documents_with_embeddings(
         self, collection_name: str, documents: List[Dict[str, Any]]
@@ -0,0 +1,205 @@
+"""Request-coalescing micro-batcher for model inference.
+
+Concurrent callers (HTTP requests, executor threads) submit small lists of
+items; a dedicated thread gathers items for up to ``max_wait`` seconds or
+until ``max_batch`` items are pending, runs one inference call, and
+scatters the results back to each caller in submission order. While a
+batch is running, new arrivals accumulate, so batches grow with load.
+
+Thread-based rather than asyncio-based so it can be used from any event
+loop and from worker threads alike (``submit`` blocks, ``asubmit`` awaits).
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Generic, Hashable, List, Optional, Sequence, TypeVar
+
+from qmd.server._executors import OverloadedError
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class _Request:
+    __slots__ = ("results", "remaining", "future")
+
+    def __init__(self, size: int):
+        self.results: List[Any] = [None] * size
+        self.remaining = size
+        self.future: "Future[List[Any]]" = Future()
+
+
+class _Entry:
+    __slots__ = ("item", "request", "index", "enqueued", "bucket")
+
+    def __init__(self, item: Any, request: _Request, index: int, bucket: Hashable = None):
+        self.item = item
+        self.request = request
+        self.index = index
+        self.bucket = bucket
+        self.enqueued = time.monotonic()
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesce items from concurrent callers into shared inference batches.
+
+    Args:
+        fn: Batch function, items -> results (same length and order)
+        max_batch: Max items per ``fn`` call
+        max_wait: Seconds the oldest pending item may wait for company
+        max_queue: Admission limit on pending items; beyond it submissions
+                   fail with OverloadedError (503) unless ``admit=False``
+        name: Thread name suffix and error label
+        bucket_key: Optional item -> bucket (e.g. a length class); a batch
+                    only holds items of the oldest pending item's bucket,
+                    so similar lengths share a batch and padding stays low
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[T]], Sequence[R]],
+        max_batch: int,
+        max_wait: float = 0.005,
+        max_queue: Optional[int] = None,
+        name: str = "batcher",
+        bucket_key: Optional[Callable[[T], Hashable]] = None,
+    ):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.name = name
+        self.bucket_key = bucket_key
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self._pending: Deque[_Entry] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def queue_size(self) -> int:
+        """Items waiting for a batch (excludes the batch being run)."""
+        return len(self._pending)
+
+    def check_admission(self, n: int = 1) -> None:
+        """Fail fast if ``n`` more items would exceed ``max_queue``."""
+        with self._cond:
+            self._check_admission(n)
+
+    def _check_admission(self, n: int) -> None:
+        # An idle batcher always accepts, however large the request
+        if self.max_queue is not None and self._pending and len(self._pending) + n > self.max_queue:
+            self.rejected += 1
+            raise OverloadedError(self.name)
+
+    def submit_future(self, items: Sequence[T], admit: bool = True) -> "Future[List[R]]":
+        request = _Request(len(items))
+        if not items:
+            request.future.set_result([])
+            return request.future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} batcher is closed")
+            if admit:
+                self._check_admission(len(items))
+            key = self.bucket_key
+            self._pending.extend(
+                _Entry(item, request, i, key(item) if key else None)
+                for i, item in enumerate(items)
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"qmd-{self.name}", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return request.future
+
+    def submit(self, items: Sequence[T], admit: bool = True) -> List[R]:
+        """Blocking submit, for worker threads."""
+        return self.submit_future(items, admit).result()
+
+    async def asubmit(self, items: Sequence[T], admit: bool = True) -> List[R]:
+        """Awaitable submit, for request handlers."""
+        return await asyncio.wrap_future(self.submit_future(items, admit))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_size": self.queue_size,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "rejected": self.rejected,
+        }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------
+
+    def _next_batch(self) -> Optional[List[_Entry]]:
+        """Wait for work, then for company; None once closed and drained."""
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            deadline = self._pending[0].enqueued + self.max_wait
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._take(self.max_batch)
+
+    def _take(self, n: int) -> List[_Entry]:
+        if self.bucket_key is None:
+            return [self._pending.popleft() for _ in range(min(n, len(self._pending)))]
+        # Oldest item's bucket first (no starvation); other buckets keep their place
+        bucket = self._pending[0].bucket
+        batch: List[_Entry] = []
+        rest: Deque[_Entry] = deque()
+        for entry in self._pending:
+            if len(batch) < n and entry.bucket == bucket:
+                batch.append(entry)
+            else:
+                rest.append(entry)
+        self._pending = rest
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                results = self.fn([e.item for e in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name}: batch fn returned {len(results)} results for {len(batch)} items"
+                    )
+            except BaseException as exc:
+                for entry in batch:
+                    if not entry.request.future.done():
+                        entry.request.future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for entry, result in zip(batch, results):
+                request = entry.request
+                if request.future.done():  # an earlier slice failed
+                    continue
+                request.results[entry.index] = result
+                request.remaining -= 1
+                if request.remaining == 0:
+                    request.future.set_result(request.results)
@@ -0,0 +1,48 @@
+"""Binary wire format for embedding responses.
+
+Selected by ``Accept: application/x-qmd-f32`` on /embed and /embed/batch.
+The body is a 12-byte header followed by the row-major matrix:
+
+    b"QF32" | uint32 rows | uint32 dim | rows * dim little-endian float32
+
+The header carries the total row count, so the server can stream one
+GPU batch of rows at a time and the client can validate the length.
+"""
+
+import struct
+
+import numpy as np
+
+EMBEDDINGS_MEDIA_TYPE = "application/x-qmd-f32"
+
+_MAGIC = b"QF32"
+_HEADER = struct.Struct("<4sII")
+HEADER_SIZE = _HEADER.size
+
+
+def encode_header(rows: int, dim: int) -> bytes:
+    return _HEADER.pack(_MAGIC, rows, dim)
+
+
+def encode_rows(embeddings: np.ndarray) -> bytes:
+    """Row block payload (no header); zero-copy for C-contiguous float32 input."""
+    return np.ascontiguousarray(embeddings, dtype="<f4").tobytes()
+
+
+def encode_embeddings(embeddings: np.ndarray) -> bytes:
+    """Encode a complete (rows, dim) matrix, header included."""
+    rows, dim = embeddings.shape
+    return encode_header(rows, dim) + encode_rows(embeddings)
+
+
+def decode_embeddings(data: bytes) -> np.ndarray:
+    """Decode a response body into a (rows, dim) float32 array without copying."""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Embedding payload shorter than header")
+    magic, rows, dim = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("Not a QF32 embedding payload")
+    expected = HEADER_SIZE + rows * dim * 4
+    if len(data) != expected:
+        raise ValueError(f"Truncated embedding payload: {len(data)} of {expected} bytes")
+    return np.frombuffer(data, dtype="<f4", offset=HEADER_SIZE).reshape(rows, dim)
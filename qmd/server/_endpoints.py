@@ -8,9 +8,12 @@ import time
 from collections import defaultdict
 from typing import List, Optional, Dict, Any
 
-from fastapi import APIRouter, HTTPException
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 import qmd.server._state as _state
+from qmd.server._codec import EMBEDDINGS_MEDIA_TYPE, encode_header, encode_rows
 from qmd.server._state import DEFAULT_MODEL, srv_console
 from qmd.server._worker import embed_worker
 from qmd.server.models import (
@@ -48,12 +51,26 @@ GPU_EMBED_BATCH_SIZE = 32
 
 
 def make_embed_fn():
-    """Return a callable that embeds a single query string using the server's singleton model."""
+    """Return a callable that embeds a single query string using the server's singleton model.
 
-    def _fn(text: str) -> List[float]:
-        return list(_state.model.embed([text]))[0].tolist()
+    Goes through the shared query-embedding cache, so a query string is
+    embedded once across vsearch, query (incl. expansion variants) and hybrid;
+    misses join the embed micro-batcher with other clients' texts.
+    """
+
+    def _fn(text: str) -> np.ndarray:
+        return _state.get_embed_batcher().submit([text])[0]
+
+    return _state.get_embed_cache().wrap(_fn)
+
+
+def make_embed_batch_fn():
+    """Batch counterpart of make_embed_fn: cache misses are embedded in one model call."""
+
+    def _fn(texts: List[str]) -> np.ndarray:
+        return np.stack(_state.get_embed_batcher().submit(texts))
 
-    return _fn
+    return _state.get_embed_cache().wrap_batch(_fn)
 
 
 def get_vector_search():
@@ -65,8 +82,9 @@ def get_vector_search():
         # Inject the server's already-loaded model so VectorSearch
         # doesn't create a second fastembed instance or HTTP-call itself.
         vector_search = VectorSearch(
-            db_path=None,
             embed_fn=make_embed_fn(),
+            embed_batch_fn=make_embed_batch_fn(),
+            pool=_state.get_db().pool,
         )
         logger.info("VectorSearch initialized at %s", vector_search.db_path)
     return vector_search
@@ -77,12 +95,10 @@ def get_hybrid_search():
     global hybrid_search
     if hybrid_search is None:
         from qmd.search.hybrid import HybridSearcher
-        from qmd.database.manager import DatabaseManager
 
-        db = DatabaseManager(_state.config.db_path)
-        # vector_db_dir=None lets VectorSearch auto-resolve to ~/.qmd/vector_db
+        # vector_db_dir=None lets VectorSearch share the server's connection pool
         hybrid_search = HybridSearcher(
-            db=db,
+            db=_state.get_db(),
             vector_db_dir=None,
             embed_fn=make_embed_fn(),
         )
@@ -97,7 +113,12 @@ def get_reranker():
         from qmd.search.rerank import LLMReranker
 
         logger.info("Loading LLMReranker (query-expansion + cross-encoder)...")
-        reranker = LLMReranker()
+        reranker = LLMReranker(
+            expansion_cache=_state.get_llm_cache(),
+            score_cache=_state.get_rerank_cache(),
+        )
+        # Cache misses from concurrent requests share cross-encoder batches
+        reranker.pair_scorer = _state.get_rerank_batcher(reranker.score_pairs).submit
         # Trigger lazy loading of both sub-models; first call is slow
         _ = reranker.expansion_model
         _ = reranker.model
@@ -105,26 +126,64 @@ def get_reranker():
     return reranker
 
 
-async def process_embeddings(texts: List[str]) -> List[List[float]]:
+async def process_embeddings(texts: List[str]) -> np.ndarray:
     """Process embeddings using the singleton model, batched to avoid OOM.
 
-    Regardless of how many texts are passed, the actual model.embed() call
-    is split into GPU_EMBED_BATCH_SIZE chunks so VRAM usage stays bounded.
+    Texts go through the embed micro-batcher, which coalesces them with
+    concurrent requests into model.embed() calls of at most
+    GPU_EMBED_BATCH_SIZE texts, so VRAM usage stays bounded. Callers do
+    admission control up front.
+    Returns one contiguous float32 array of shape (len(texts), dim).
     Non-finite values (nan/inf) are replaced with 0.0 for JSON safety.
     """
-    all_embeddings: List[List[float]] = []
-    for i in range(0, len(texts), GPU_EMBED_BATCH_SIZE):
-        batch = texts[i : i + GPU_EMBED_BATCH_SIZE]
-        embeddings = list(_state.model.embed(batch))
-        for emb in embeddings:
-            vec = emb.tolist()
-            if not all(math.isfinite(v) for v in vec):
-                logger.warning(
-                    f"Non-finite values in embedding, replacing with 0.0 (text snippet: {batch[0][:50]!r})"
+    rows = await _state.get_embed_batcher().asubmit(texts, admit=False)
+    embeddings = np.stack(rows)
+    if not np.isfinite(embeddings).all():
+        logger.warning(
+            f"Non-finite values in embeddings, replacing with 0.0 (text snippet: {texts[0][:50]!r})"
+        )
+        np.nan_to_num(embeddings, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return embeddings
+
+
+def _wants_binary(http_request: Request) -> bool:
+    """Content negotiation: binary float32 when the client accepts it."""
+    return EMBEDDINGS_MEDIA_TYPE in http_request.headers.get("accept", "")
+
+
+async def _binary_embedding_response(texts: List[str]) -> StreamingResponse:
+    """Stream embeddings as QF32 (see _codec), one GPU batch of rows per chunk.
+
+    The first batch is embedded before the response starts, so early
+    failures still return a 5xx. The header (total rows, dim) goes out with
+    it; later batches stream as they are embedded and the server never
+    materializes the whole response. A later failure can only cut the body
+    short — it is logged here, and the client rejects the truncated payload
+    against the header's row count.
+    """
+    try:
+        first = await process_embeddings(texts[:GPU_EMBED_BATCH_SIZE])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Embedding error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        yield encode_header(len(texts), first.shape[1])
+        yield encode_rows(first)
+        for i in range(GPU_EMBED_BATCH_SIZE, len(texts), GPU_EMBED_BATCH_SIZE):
+            try:
+                block = await process_embeddings(texts[i : i + GPU_EMBED_BATCH_SIZE])
+            except Exception as e:
+                logger.error(
+                    f"Embedding error after {i}/{len(texts)} rows streamed; "
+                    f"response truncated: {e}"
                 )
-                vec = [v if math.isfinite(v) else 0.0 for v in vec]
-            all_embeddings.append(vec)
-    return all_embeddings
+                return
+            yield encode_rows(block)
+
+    return StreamingResponse(body(), media_type=EMBEDDINGS_MEDIA_TYPE)
 
 
 # ---------------------------------------------------------------------------
@@ -139,14 +198,36 @@ async def health_check():
         status="healthy" if _state.model is not None else "unhealthy",
         model_loaded=_state.model is not None,
         reranker_loaded=reranker is not None,
-        queue_size=0,
+        queue_size=_state.embed_batcher.queue_size if _state.embed_batcher else 0,
+        caches={
+            name: cache.stats()
+            for name, cache in (
+                ("query_embedding", _state.embed_cache),
+                ("llm", _state.llm_cache),
+                ("rerank_score", _state.rerank_cache),
+            )
+            if cache is not None
+        },
+        executors={
+            ex.name: ex.stats()
+            for ex in (
+                _state.gpu_executor,
+                _state.sqlite_executor,
+                _state.embed_batcher,
+                _state.rerank_batcher,
+            )
+            if ex is not None
+        },
     )
 
 
 @router.post("/embed", response_model=EmbedResponse)
-async def embed(request: EmbedRequest):
+async def embed(request: EmbedRequest, http_request: Request):
     """Generate embeddings for a list of texts.
 
+    Responds with JSON by default, or streamed binary float32 when the
+    request sends ``Accept: application/x-qmd-f32``.
+
     Note: For large batches (>32 texts), consider using /embed/batch endpoint
     or splitting into smaller requests to avoid memory issues.
     """
@@ -159,18 +240,20 @@ async def embed(request: EmbedRequest):
         )
     if not request.texts:
         raise HTTPException(status_code=400, detail="Empty texts list")
+    _state.get_embed_batcher().check_admission(len(request.texts))
+    if _wants_binary(http_request):
+        return await _binary_embedding_response(request.texts)
     try:
         texts = request.texts
-        async with _state.processing_lock:
-            embeddings_list = await process_embeddings(texts)
-        return EmbedResponse(embeddings=embeddings_list)
+        embeddings = await process_embeddings(texts)
+        return EmbedResponse(embeddings=embeddings.tolist())
     except Exception as e:
         logger.error(f"Embedding error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/embed/batch", response_model=EmbedResponse)
-async def embed_batch(request: EmbedRequest):
+async def embed_batch(request: EmbedRequest, http_request: Request):
     """Generate embeddings for a large batch of texts with internal chunking.
 
     This endpoint automatically splits large batches into smaller chunks
@@ -178,9 +261,12 @@ async def embed_batch(request: EmbedRequest):
 
     Args:
         request: EmbedRequest with texts list (can be large, up to 1000 texts)
+        http_request: Raw request; ``Accept: application/x-qmd-f32`` selects
+                      the streamed binary response
 
     Returns:
-        EmbedResponse with embeddings for all texts
+        EmbedResponse with embeddings for all texts (JSON), or a chunked
+        binary float32 stream
     """
     if _state.model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
@@ -191,15 +277,17 @@ async def embed_batch(request: EmbedRequest):
         )
     if not request.texts:
         raise HTTPException(status_code=400, detail="Empty texts list")
+    _state.get_embed_batcher().check_admission(len(request.texts))
+    if _wants_binary(http_request):
+        return await _binary_embedding_response(request.texts)
 
     try:
         texts = request.texts
 
         # process_embeddings already batches internally (GPU_EMBED_BATCH_SIZE)
-        async with _state.processing_lock:
-            all_embeddings = await process_embeddings(texts)
+        all_embeddings = await process_embeddings(texts)
 
-        return EmbedResponse(embeddings=all_embeddings)
+        return EmbedResponse(embeddings=all_embeddings.tolist())
     except Exception as e:
         logger.error(f"Batch embedding error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -240,6 +328,7 @@ async def embed_index(request: EmbedIndexRequest):
             _state.embed_job.finished = False
             _state.embed_job.collection = request.collection
             _state.embed_job.force = request.force
+            _state.embed_job.hashes = request.hashes
             _state.embed_job.total_chunks = 0
             _state.embed_job.done_chunks = 0
             _state.embed_job.total_docs = 0
@@ -253,8 +342,6 @@ async def embed_index(request: EmbedIndexRequest):
                 request.force,
             )
 
-    from fastapi.responses import StreamingResponse
-
     async def event_stream():
         try:
             while True:
@@ -291,9 +378,7 @@ async def vsearch(request: VSearchRequest):
         # Try query expansion (without lex variants for vsearch)
         try:
             reranker = get_reranker()
-            loop = asyncio.get_event_loop()
-            expanded = await loop.run_in_executor(
-                None,
+            expanded = await _state.get_gpu_executor().run(
                 reranker.expand_query,
                 request.query,
                 False,  # include_lexical=False
@@ -311,13 +396,17 @@ async def vsearch(request: VSearchRequest):
         doc_best_score: Dict[str, float] = {}
         doc_info: Dict[str, Dict] = {}
 
-        for q in queries:
-            results = searcher.search(
-                q,
-                collection_name=request.collection or None,
-                limit=request.limit * 2,  # Get more for dedup
-            )
-
+        # Model work and sqlite work on their own pools
+        query_vectors = await _state.get_gpu_executor().run(
+            searcher.embed_queries, queries
+        )
+        all_results = await _state.get_sqlite_executor().run(
+            searcher.search_vectors,
+            query_vectors,
+            collection_name=request.collection or None,
+            limit=request.limit * 2,  # Get more for dedup
+        )
+        for results in all_results:
             for r in results:
                 doc_key = f"{r.collection}:{r.path}"
                 score = r.score
@@ -329,11 +418,11 @@ async def vsearch(request: VSearchRequest):
                         "filepath": r.filepath,
                         "display_path": r.display_path,
                         "title": r.title,
-                        "body": r.body,
                         "score": score,
                         "hash": r.hash,
                         "collection": r.collection,
                         "path": r.path,
+                        **r.chunk_fields(),
                     }
 
         # Filter by min_score and convert to list
@@ -351,11 +440,19 @@ async def vsearch(request: VSearchRequest):
         )
 
         return VSearchResponse(results=final_results)
+    except HTTPException:
+        raise  # e.g. 503 from executor admission control
     except Exception as e:
         logger.error(f"Vector search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _finish_timings(timings: Dict[str, float], t0: float) -> Dict[str, float]:
+    """Add the end-to-end total and round every stage to 0.1 ms."""
+    timings["total_s"] = time.perf_counter() - t0
+    return {name: round(sec, 4) for name, sec in timings.items()}
+
+
 @router.post("/query", response_model=QueryResponse)
 async def query(request: QueryRequest):
     """Full query pipeline (TS-equivalent):
@@ -375,7 +472,13 @@ async def query(request: QueryRequest):
         # Check if top BM25 result is strong enough to skip LLM expansion
         # TS: topScore >= 0.85 AND (topScore - secondScore) >= 0.15
         t0 = time.perf_counter()
-        initial_results = hybrid.fts.search(request.query, limit=20, collection=col)
+        timings: Dict[str, float] = {}
+        gpu = _state.get_gpu_executor()
+        sqlite = _state.get_sqlite_executor()
+        initial_results = await sqlite.run(
+            hybrid.fts.search, request.query, limit=20, collection=col
+        )
+        timings["probe_s"] = time.perf_counter() - t0
         strong_signal = False
 
         if len(initial_results) >= 2:
@@ -390,6 +493,7 @@ async def query(request: QueryRequest):
                 )
 
         # ── Step 1: Query expansion via LLM (skip if strong signal) ───────
+        t_exp = time.perf_counter()
         fts_queries = [request.query]
         vec_queries = [request.query]
         reranker = None
@@ -397,9 +501,7 @@ async def query(request: QueryRequest):
         if not strong_signal:
             try:
                 reranker = get_reranker()
-                loop = asyncio.get_event_loop()
-                expanded = await loop.run_in_executor(
-                    None,
+                expanded = await gpu.run(
                     reranker.expand_query,
                     request.query,
                     True,  # include_lexical=True for query
@@ -426,6 +528,7 @@ async def query(request: QueryRequest):
                 )
         else:
             logger.info("Skipping LLM expansion due to strong signal")
+        timings["expand_s"] = time.perf_counter() - t_exp
 
         # ── Steps 2 + 3: Multi-query BM25 + vector → ranked id lists ─────
         t1 = time.perf_counter()
@@ -439,9 +542,34 @@ async def query(request: QueryRequest):
             lambda: {"score": 0.0, "top_rank": math.inf}
         )
 
-        # BM25 searches (original query → weight 2.0; expanded → weight 1.0)
-        for i, q in enumerate(fts_queries):
-            results = hybrid.fts.search(q, limit=limit * 3, collection=col)
+        from qmd.search.hybrid import timed_call
+
+        # BM25 and vector legs run concurrently on worker threads; latency is
+        # the slower leg, not the sum. Each leg reports its own wall time.
+        async def vector_leg():
+            # One embedding batch (GPU pool) + one KNN pass (sqlite pool)
+            t = time.perf_counter()
+            query_vectors = await gpu.run(vsearcher.embed_queries, vec_queries)
+            results = await sqlite.run(
+                vsearcher.search_vectors, query_vectors, collection_name=col, limit=limit * 3
+            )
+            return results, time.perf_counter() - t
+
+        (all_fts_results, timings["bm25_s"]), (all_v_results, timings["vector_s"]) = (
+            await asyncio.gather(
+                sqlite.run(
+                    timed_call,
+                    lambda: [
+                        hybrid.fts.search(q, limit=limit * 3, collection=col)
+                        for q in fts_queries
+                    ],
+                ),
+                vector_leg(),
+            )
+        )
+
+        # BM25 results (original query → weight 2.0; expanded → weight 1.0)
+        for i, results in enumerate(all_fts_results):
             if results:
                 ids = [f"{r['collection']}:{r['path']}" for r in results]
                 ranked_lists.append(ids)
@@ -461,9 +589,8 @@ async def query(request: QueryRequest):
                     if rank < doc_rank_tracking[did]["top_rank"]:
                         doc_rank_tracking[did]["top_rank"] = rank
 
-        # Vector searches (original query → weight 2.0; expanded → weight 1.0)
-        for i, q in enumerate(vec_queries):
-            v_results = vsearcher.search(q, collection_name=col, limit=limit * 3)
+        # Vector results (original query → weight 2.0; expanded → weight 1.0)
+        for i, v_results in enumerate(all_v_results):
             if v_results:
                 ids = [f"{r.collection}:{r.path}" for r in v_results]
                 ranked_lists.append(ids)
@@ -475,21 +602,30 @@ async def query(request: QueryRequest):
                             "title": r.title,
                             "collection": r.collection,
                             "path": r.path,
-                            "content": r.body,
+                            "content": r.snippet,
                             "type": "vector",
                             "vec_score": r.score,
+                            **r.chunk_fields(),
                         }
                     else:
                         doc_info[did]["type"] = "hybrid"
                         doc_info[did]["vec_score"] = r.score
+                        if "snippet" not in doc_info[did]:
+                            # Rerank scores this chunk rather than the doc prefix
+                            doc_info[did].update(r.chunk_fields())
                     # Track top rank
                     if rank < doc_rank_tracking[did]["top_rank"]:
                         doc_rank_tracking[did]["top_rank"] = rank
 
-        logger.info("BM25+vector search: %.1fs", time.perf_counter() - t1)
+        logger.info(
+            "BM25+vector search: %.1fs (bm25 %.2fs, vector %.2fs)",
+            time.perf_counter() - t1,
+            timings["bm25_s"],
+            timings["vector_s"],
+        )
 
         if not doc_info:
-            return QueryResponse(results=[])
+            return QueryResponse(results=[], timings=_finish_timings(timings, t0))
 
         # ── Step 4: Weighted Reciprocal Rank Fusion with top-rank bonus ────
         t2 = time.perf_counter()
@@ -535,9 +671,7 @@ async def query(request: QueryRequest):
             try:
                 t3 = time.perf_counter()
                 rerank_candidates = rrf_ordered[:RERANK_TOP_N]
-                loop = asyncio.get_event_loop()
-                reranked = await loop.run_in_executor(
-                    None,
+                reranked = await gpu.run(
                     reranker.rerank,
                     request.query,
                     rerank_candidates,
@@ -548,10 +682,11 @@ async def query(request: QueryRequest):
                 for doc in rrf_ordered[RERANK_TOP_N:]:
                     if doc["id"] not in reranked_ids:
                         reranked.append(doc)
+                timings["rerank_s"] = time.perf_counter() - t3
                 logger.info(
                     "Reranking %d docs: %.1fs",
                     len(rerank_candidates),
-                    time.perf_counter() - t3,
+                    timings["rerank_s"],
                 )
 
                 # ── Step 6: Position-aware score blending (TS-style) ────────
@@ -595,7 +730,9 @@ async def query(request: QueryRequest):
                     len(final),
                     len(deduped),
                 )
-                return QueryResponse(results=deduped[:limit])
+                return QueryResponse(
+                    results=deduped[:limit], timings=_finish_timings(timings, t0)
+                )
             except Exception as rr_err:
                 logger.warning(
                     "Reranking failed (%s), returning plain RRF results", rr_err
@@ -607,8 +744,10 @@ async def query(request: QueryRequest):
             for c in rrf_ordered[:limit]
         ]
         logger.info("Query pipeline complete: %d results (RRF only)", len(fallback))
-        return QueryResponse(results=fallback)
+        return QueryResponse(results=fallback, timings=_finish_timings(timings, t0))
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Query pipeline error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -625,12 +764,16 @@ async def expand(request: ExpandRequest):
     """
     try:
         reranker = get_reranker()
-        expanded = reranker.expand_query(request.query, include_lexical=True)
+        expanded = await _state.get_gpu_executor().run(
+            reranker.expand_query, request.query, include_lexical=True
+        )
         # For backward compatibility with API, flatten all variants into a list
         all_queries = []
         for variants in expanded.values():
             all_queries.extend(variants)
         return ExpandResponse(queries=all_queries)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Query expansion error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -643,8 +786,12 @@ async def rerank(request: RerankRequest):
         return RerankResponse(results=[])
     try:
         reranker = get_reranker()
-        results = reranker.rerank(request.query, request.documents, top_k=request.top_k)
+        results = await _state.get_gpu_executor().run(
+            reranker.rerank, request.query, request.documents, top_k=request.top_k
+        )
         return RerankResponse(results=results)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Reranking error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
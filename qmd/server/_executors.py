@@ -0,0 +1,102 @@
+"""Bounded executors and admission control for blocking server work.
+
+Model inference (embedding, expansion, rerank) and sqlite I/O run on two
+separate thread pools so neither ever blocks the event loop, and a burst of
+GPU work cannot starve cheap DB lookups (or /health). Each pool caps its
+in-flight + queued tasks; past the cap a request fails fast with 503 and a
+Retry-After header instead of queueing without bound.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+
+class OverloadedError(HTTPException):
+    """Executor admission queue is full; surfaces as HTTP 503."""
+
+    def __init__(self, name: str, retry_after: int = 1):
+        super().__init__(
+            status_code=503,
+            detail=f"Server overloaded ({name} queue full), retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class BoundedExecutor:
+    """
+    Thread pool with admission control.
+
+    Args:
+        name: Pool name (thread names, errors, /health)
+        workers: Worker threads
+        max_pending: Max tasks running or queued; further submissions are
+                     rejected with OverloadedError unless ``admit=False``
+    """
+
+    def __init__(self, name: str, workers: int, max_pending: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.pending = 0
+        self.rejected = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix=f"qmd-{self.name}"
+                )
+            return self._pool
+
+    def check_admission(self) -> None:
+        """Fail fast (OverloadedError) if the pool is saturated; reserves nothing."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise OverloadedError(self.name)
+
+    async def run(
+        self, fn: Callable[..., Any], *args: Any, admit: bool = True, **kwargs: Any
+    ) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` on the pool and await the result.
+
+        Args:
+            admit: Apply admission control; background jobs (the embed
+                   worker) pass False so they wait instead of failing
+        """
+        with self._lock:
+            if admit and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise OverloadedError(self.name)
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
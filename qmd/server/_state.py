@@ -3,12 +3,17 @@
 import asyncio
 import dataclasses
 import logging
-from typing import Optional, TYPE_CHECKING
+from typing import Any, Callable, List, Optional, Tuple, TYPE_CHECKING
 
 from rich.console import Console as RichConsole
 
 if TYPE_CHECKING:
+    from qmd.database.manager import DatabaseManager
     from qmd.models.config import AppConfig
+    from qmd.search.embed_cache import QueryEmbeddingCache
+    from qmd.search.llm_cache import LLMCache
+    from qmd.server._batcher import MicroBatcher
+    from qmd.server._executors import BoundedExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +23,187 @@ srv_console = RichConsole(stderr=False)
 # Global singletons
 model = None
 reranker = None
-processing_lock: Optional[asyncio.Lock] = None
 config: Optional["AppConfig"] = None
+db: Optional["DatabaseManager"] = None
 vector_search = None
 hybrid_search = None
 embed_job_lock: Optional[asyncio.Lock] = None
+embed_cache: Optional["QueryEmbeddingCache"] = None
+llm_cache: Optional["LLMCache"] = None
+rerank_cache: Optional["LLMCache"] = None
+gpu_executor: Optional["BoundedExecutor"] = None
+sqlite_executor: Optional["BoundedExecutor"] = None
+embed_batcher: Optional["MicroBatcher"] = None
+rerank_batcher: Optional["MicroBatcher"] = None
+token_chunker: Optional[Callable[[List[str]], List[List[dict]]]] = None
+
+def get_db() -> "DatabaseManager":
+    """Shared DatabaseManager: one connection pool for all endpoints and the embed worker."""
+    global db
+    if db is None:
+        from qmd.database.manager import DatabaseManager
+
+        db = DatabaseManager(config.db_path)
+    return db
+
+
+def get_embed_cache() -> "QueryEmbeddingCache":
+    """Shared query-embedding cache for every query path (vsearch, query, hybrid)."""
+    global embed_cache
+    if embed_cache is None:
+        from qmd.search.embed_cache import QueryEmbeddingCache
+
+        embed_cache = QueryEmbeddingCache(
+            model=DEFAULT_MODEL,
+            maxsize=config.query_cache_size,
+            ttl=config.query_cache_ttl,
+            pool=get_db().pool if config.query_cache_persist else None,
+        )
+    return embed_cache
+
+
+def get_llm_cache() -> "LLMCache":
+    """Shared persistent cache of query expansions in llm_cache."""
+    global llm_cache
+    if llm_cache is None:
+        from qmd.search.llm_cache import LLMCache
+
+        llm_cache = LLMCache(get_db().pool, max_entries=config.llm_cache_max_entries)
+    return llm_cache
+
+
+def get_rerank_cache() -> "LLMCache":
+    """Cross-encoder score cache, kept apart so scores can't evict expansions."""
+    global rerank_cache
+    if rerank_cache is None:
+        from qmd.search.llm_cache import LLMCache
+
+        rerank_cache = LLMCache(
+            get_db().pool if config.rerank_cache_persist else None,
+            max_entries=config.rerank_cache_size,
+            memory_size=config.rerank_cache_size,
+            table="rerank_cache",
+        )
+    return rerank_cache
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(config, name, default) if config is not None else default
+
+
+def get_chunker() -> Optional[Callable[[List[str]], List[List[dict]]]]:
+    """
+    Batch chunker for the configured ``chunk_strategy``; None means char chunking.
+
+    "markdown" splits on headings and code fences (``chunk_markdown``).
+    "tokens" uses the loaded embed model's own tokenizer (fastembed keeps a
+    HF ``tokenizers.Tokenizer`` on ``model.model.tokenizer``), copied with
+    truncation and padding off so whole documents are tokenized. The chunk
+    budget is capped at the model's max length minus its special tokens.
+    """
+    global token_chunker
+    strategy = _setting("chunk_strategy", "chars")
+    if strategy == "markdown":
+        from qmd.utils.chunker import chunk_markdown
+
+        return lambda contents: [chunk_markdown(c) for c in contents]
+    if strategy != "tokens" or model is None:
+        return None
+    if token_chunker is None:
+        inner = getattr(getattr(model, "model", None), "tokenizer", None)
+        if inner is None or not hasattr(inner, "to_str"):
+            logger.warning("chunk_strategy=tokens: model tokenizer unavailable, chunking by chars")
+            return None
+        from functools import partial
+
+        from tokenizers import Tokenizer
+
+        from qmd.utils.chunker import chunk_documents_by_tokens
+
+        tokenizer = Tokenizer.from_str(inner.to_str())
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        max_tokens = _setting("chunk_size_tokens", 800)
+        if inner.truncation:
+            post = inner.post_processor
+            specials = post.num_special_tokens_to_add(False) if post is not None else 0
+            max_tokens = min(max_tokens, inner.truncation["max_length"] - specials)
+        token_chunker = partial(
+            chunk_documents_by_tokens,
+            tokenizer=tokenizer,
+            max_tokens=max_tokens,
+            overlap_tokens=_setting("chunk_overlap_tokens", 120),
+        )
+    return token_chunker
+
+
+def get_gpu_executor() -> "BoundedExecutor":
+    """Pool for model inference: embedding, query expansion, rerank."""
+    global gpu_executor
+    if gpu_executor is None:
+        from qmd.server._executors import BoundedExecutor
+
+        gpu_executor = BoundedExecutor(
+            "gpu",
+            workers=_setting("server_gpu_workers", 2),
+            max_pending=_setting("server_gpu_queue", 32),
+        )
+    return gpu_executor
+
+
+def get_sqlite_executor() -> "BoundedExecutor":
+    """Pool for sqlite reads/writes (FTS, KNN, embed job bookkeeping)."""
+    global sqlite_executor
+    if sqlite_executor is None:
+        from qmd.server._executors import BoundedExecutor
+
+        sqlite_executor = BoundedExecutor(
+            "sqlite",
+            workers=_setting("server_sqlite_workers", 4),
+            max_pending=_setting("server_sqlite_queue", 64),
+        )
+    return sqlite_executor
+
+
+def get_embed_batcher() -> "MicroBatcher":
+    """Coalesces embed requests from concurrent clients into shared model batches."""
+    global embed_batcher
+    if embed_batcher is None:
+        import numpy as np
+
+        from qmd.server._batcher import MicroBatcher
+
+        def _embed(texts: List[str]) -> np.ndarray:
+            return np.asarray(list(model.embed(texts)), dtype=np.float32)
+
+        embed_batcher = MicroBatcher(
+            _embed,
+            max_batch=GPU_EMBED_BATCH_SIZE,
+            max_wait=_setting("server_embed_batch_wait_ms", 5.0) / 1000,
+            max_queue=_setting("server_embed_queue", 4096),
+            name="embed",
+        )
+    return embed_batcher
+
+
+def get_rerank_batcher(score_pairs: Callable[[List[Tuple[str, str]]], Any]) -> "MicroBatcher":
+    """
+    Merges (query, doc) pairs from concurrent rerank calls into shared
+    cross-encoder passes, bucketed by prompt length to limit padding.
+    """
+    global rerank_batcher
+    if rerank_batcher is None:
+        from qmd.server._batcher import MicroBatcher
+
+        rerank_batcher = MicroBatcher(
+            score_pairs,
+            max_batch=RERANK_BATCH_SIZE,
+            max_wait=_setting("server_embed_batch_wait_ms", 5.0) / 1000,
+            name="rerank",
+            bucket_key=lambda pair: (len(pair[0]) + len(pair[1])) // RERANK_BUCKET_CHARS,
+        )
+    return rerank_batcher
+
 
 # Model configuration
 DEFAULT_MODEL = (
@@ -33,6 +214,9 @@ DEFAULT_MODEL = (
 # Jina v2 ZH quantized (768d): a batch of 16 x 3200-char chunks uses ~200 MB VRAM.
 # Much lighter than BGE-M3; can be increased on higher-VRAM GPUs.
 GPU_EMBED_BATCH_SIZE = 32
+# Cross-encoder pairs per forward pass; pairs are bucketed by prompt chars
+RERANK_BATCH_SIZE = 16
+RERANK_BUCKET_CHARS = 128
 
 
 # ---------------------------------------------------------------------------
@@ -48,6 +232,7 @@ class EmbedJobState:
     running: bool = False
     collection: Optional[str] = None
     force: bool = False
+    hashes: Optional[List[str]] = None
     total_chunks: int = 0
     done_chunks: int = 0
     total_docs: int = 0
@@ -3,27 +3,299 @@
 import asyncio
 import json as json_lib
 import logging
-from typing import TYPE_CHECKING
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from qmd.server._state import (
     embed_job,
     srv_console,
-    GPU_EMBED_BATCH_SIZE,
 )
 import qmd.server._state as _state
 
 if TYPE_CHECKING:
+    from qmd.database.manager import DatabaseManager
     from qmd.server._state import EmbedJobState
 
 logger = logging.getLogger(__name__)
 
+# Chunk batches buffered between the chunker thread and the model
+EMBED_QUEUE_DEPTH = 4
+# Padded tokens per inference batch (items × longest item): about
+# GPU_EMBED_BATCH_SIZE full-size English chunks, many more short ones
+EMBED_TOKEN_BUDGET = 32768
+# Hard cap on items per batch, however short
+EMBED_MAX_BATCH = 256
+# Chunks sorted together by length before being cut into batches
+EMBED_SORT_WINDOW = 1024
+# Documents per call of a batch chunker (one encode_batch per group)
+EMBED_CHUNK_DOCS = 16
+
+
+class ChunkProducer(threading.Thread):
+    """
+    Producer stage: paged DB reads → chunker → bounded queue of chunk batches.
+
+    Runs on its own thread so chunking overlaps with inference; the
+    thread's pooled reader is released when it finishes. Chunks are gathered into a window of
+    ``window`` chunks, sorted by estimated token length and cut into
+    batches of at most ``max_tokens`` padded tokens (see
+    ``qmd.utils.batching``), so similar lengths share a batch and batch
+    size adapts to chunk length. The queue holds at most ``depth``
+    batches, so memory stays bounded regardless of corpus size.
+
+    Chunks are content-addressed (``chunk_hash``): a chunk whose vector
+    already exists — unchanged text in an edited document, or text shared
+    by several documents — is flagged ``reuse`` and skips inference; the
+    writer only records its mapping.
+
+    ``chunker`` (list of docs → list of chunk lists, e.g. a partial of
+    ``chunk_documents_by_tokens``) replaces the char-based
+    ``chunk_document``; it is called on groups of ``EMBED_CHUNK_DOCS``
+    documents so tokenization is batched, and its per-chunk ``tokens``
+    counts drive the batching.
+    """
+
+    _END = object()
+
+    def __init__(
+        self,
+        db: "DatabaseManager",
+        collection: Optional[str] = None,
+        hashes: Optional[List[str]] = None,
+        model: str = _state.DEFAULT_MODEL,
+        chunker: Optional[Callable[[List[str]], List[List[Dict[str, Any]]]]] = None,
+        max_tokens: int = EMBED_TOKEN_BUDGET,
+        max_batch: int = EMBED_MAX_BATCH,
+        window: int = EMBED_SORT_WINDOW,
+        depth: int = EMBED_QUEUE_DEPTH,
+    ):
+        super().__init__(name="qmd-embed-chunker", daemon=True)
+        self.db = db
+        self.collection = collection
+        self.hashes = hashes
+        self.model = model
+        self.chunker = chunker
+        self.max_tokens = max_tokens
+        self.max_batch = max_batch
+        self.window = window
+        self.total_chunks = 0
+        self.reused_chunks = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+        self._stop_event = threading.Event()
+
+    def _put(self, item: Any) -> bool:
+        """Blocking put that gives up once the consumer has cancelled."""
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _flush(self, window: List[Dict[str, Any]]) -> bool:
+        from qmd.utils.batching import bucket_batches
+
+        existing = self.db.get_existing_chunk_hashes(c["chunk_hash"] for c in window)
+        reused: List[Dict[str, Any]] = []
+        # chunk_hash → [chunk to embed, duplicates sharing its vector...]
+        fresh: Dict[str, List[Dict[str, Any]]] = {}
+        for c in window:
+            group = fresh.get(c["chunk_hash"])
+            c["reuse"] = c["chunk_hash"] in existing or group is not None
+            if c["chunk_hash"] in existing:
+                reused.append(c)
+            elif group is not None:
+                group.append(c)  # written in the same batch as its vector
+            else:
+                fresh[c["chunk_hash"]] = [c]
+        self.reused_chunks += sum(len(g) - 1 for g in fresh.values()) + len(reused)
+
+        for i in range(0, len(reused), self.max_batch):
+            if not self._put(reused[i : i + self.max_batch]):
+                return False
+        for batch in bucket_batches(
+            [g[0] for g in fresh.values()],
+            self.max_tokens,
+            self.max_batch,
+            lambda c: c["tokens"],
+        ):
+            expanded = [c for first in batch for c in fresh[first["chunk_hash"]]]
+            if not self._put(sorted(expanded, key=lambda c: c["idx"])):
+                return False
+        return True
+
+    def _chunk_docs(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """(doc hash, chunks) for each document still to embed."""
+        from qmd.utils.chunker import chunk_document
+
+        docs = self.db.iter_content_for_embedding(self.collection, self.hashes)
+        if self.chunker is None:
+            for doc_hash, content in docs:
+                yield doc_hash, chunk_document(content)
+            return
+        group: List[Tuple[str, str]] = []
+        for item in docs:
+            group.append(item)
+            if len(group) >= EMBED_CHUNK_DOCS:
+                yield from zip([h for h, _ in group], self.chunker([c for _, c in group]))
+                group = []
+        if group:
+            yield from zip([h for h, _ in group], self.chunker([c for _, c in group]))
+
+    def run(self) -> None:
+        from qmd.utils.batching import approx_tokens
+        from qmd.utils.chunker import chunk_hash
+
+        window: List[Dict[str, Any]] = []
+        try:
+            for doc_hash, chunks in self._chunk_docs():
+                for chunk in chunks:
+                    window.append(
+                        {
+                            "hash": doc_hash,
+                            "seq": chunk["seq"],
+                            "pos": chunk["pos"],
+                            "text": chunk["text"],
+                            "chunk_hash": chunk_hash(chunk["text"], self.model),
+                            "heading": chunk.get("heading", ""),
+                            "tokens": chunk.get("tokens") or approx_tokens(chunk["text"]),
+                            "idx": self.total_chunks,
+                            # Batches are length-sorted, so a document's chunks may
+                            # land out of order; it is done once all are written
+                            "doc_chunks": len(chunks),
+                        }
+                    )
+                    self.total_chunks += 1
+                if len(window) >= self.window:
+                    if not self._flush(window):
+                        return
+                    window = []
+            if window and not self._flush(window):
+                return
+            self._put(self._END)
+        except BaseException as exc:  # surfaced to the consumer by get()
+            self._put(exc)
+        finally:
+            # One producer thread per job: don't leave its reader in the pool
+            self.db.pool.release_reader()
+
+    def get(self) -> Optional[List[Dict[str, Any]]]:
+        """Next chunk batch, or None when the corpus is exhausted."""
+        item = self._queue.get()
+        if item is self._END:
+            return None
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def cancel(self) -> None:
+        self._stop_event.set()
+
+
+class VectorWriter(threading.Thread):
+    """
+    Writer stage: persists embedded batches on a dedicated thread.
+
+    The hand-off buffer holds ``depth`` batches (1 = double buffering):
+    while batch N is written here, batch N+1 is already being embedded.
+    ``busy_s``/``idle_s`` record time spent writing vs waiting for work.
+    """
+
+    _END = object()
+
+    def __init__(
+        self,
+        db: "DatabaseManager",
+        job: "EmbedJobState",
+        embedded_at: str,
+        depth: int = 1,
+    ):
+        super().__init__(name="qmd-embed-writer", daemon=True)
+        self.db = db
+        self.job = job
+        self.embedded_at = embedded_at
+        self.busy_s = 0.0
+        self.idle_s = 0.0
+        self.error: Optional[BaseException] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+        # doc hash → chunks not yet written
+        self._remaining: Dict[str, int] = {}
+
+    def submit(self, batch: List[Dict[str, Any]], embeddings: list) -> None:
+        """
+        Queue an embedded batch; blocks while the writer is a full batch behind.
+
+        ``embeddings`` is aligned with ``batch``; None for reused chunks.
+        """
+        if self.error is not None:
+            raise self.error
+        self._queue.put((batch, embeddings))
+
+    def close(self) -> None:
+        """Flush outstanding batches and stop; re-raises a write failure."""
+        self._queue.put(self._END)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self) -> None:
+        from qmd.utils.chunker import embedding_to_bytes
+
+        while True:
+            t_wait = time.perf_counter()
+            item = self._queue.get()
+            t_start = time.perf_counter()
+            self.idle_s += t_start - t_wait
+            if item is self._END:
+                return
+            if self.error is not None:
+                continue  # keep draining so submit() never blocks forever
+            batch, embeddings = item
+            try:
+                self.db.insert_embeddings_batch(
+                    [
+                        (
+                            c["hash"],
+                            c["seq"],
+                            c["pos"],
+                            c["chunk_hash"],
+                            None if e is None else embedding_to_bytes(e),
+                            c["heading"],
+                            len(c["text"]),
+                        )
+                        for c, e in zip(batch, embeddings)
+                    ],
+                    model=_state.DEFAULT_MODEL,
+                    embedded_at=self.embedded_at,
+                )
+            except BaseException as exc:
+                self.error = exc
+                continue
+            self.job.done_chunks += len(batch)
+            for c in batch:
+                left = self._remaining.get(c["hash"], c["doc_chunks"]) - 1
+                if left:
+                    self._remaining[c["hash"]] = left
+                else:
+                    self._remaining.pop(c["hash"], None)
+                    self.job.done_docs += 1
+            self.busy_s += time.perf_counter() - t_start
+
 
 async def embed_worker() -> None:
     """Run the full embed pipeline server-side and broadcast SSE progress events.
 
-    Reads documents from the DB, chunks them, runs GPU embedding, writes vectors
-    back to the DB, and broadcasts incremental progress to all subscribed SSE
-    clients via asyncio.Queue.  Runs as a background asyncio.Task.
+    Streams content from the DB through a bounded pipeline — paged reads →
+    chunker thread → length-bucketed batch queue → GPU embedding → writer
+    thread — and
+    broadcasts incremental progress to all subscribed SSE clients via
+    asyncio.Queue.  Totals come from a SQL pre-count, so the first vectors
+    are written without chunking the whole corpus up front.  Inference of
+    batch N+1 overlaps the write of batch N; model/writer busy and idle
+    seconds are reported on completion.  Runs as a background asyncio.Task.
     """
     from datetime import datetime
 
@@ -36,53 +308,37 @@ async def embed_worker() -> None:
                 pass
 
     loop = asyncio.get_running_loop()
+    producer: Optional[ChunkProducer] = None
+    writer: Optional[VectorWriter] = None
 
     try:
-        from qmd.database.manager import DatabaseManager
-        from qmd.utils.chunker import chunk_document, embedding_to_bytes
-
-        db = DatabaseManager(_state.config.db_path)
-        db.ensure_vec_table(dimensions=768)
-
-        docs = db.get_all_active_documents()
-        if embed_job.collection:
-            docs = [d for d in docs if d["collection"] == embed_job.collection]
+        db = _state.get_db()
+        # Background job: waits for pool capacity rather than being rejected
+        gpu = _state.get_gpu_executor()
+        sqlite = _state.get_sqlite_executor()
+        await sqlite.run(db.ensure_vec_table, dimensions=768, admit=False)
 
         if embed_job.force:
-            db.clear_all_embeddings()
-            needs_embed_set = {d["hash"] for d in docs}
-        else:
-            needs_embed_set = set(db.get_hashes_for_embedding())
-
-        to_embed = [d for d in docs if d["hash"] in needs_embed_set]
-
-        # Pre-chunk to get accurate total_chunks for progress bar
-        all_chunks: list = []
-        for doc in to_embed:
-            for chunk in chunk_document(doc["content"]):
-                all_chunks.append(
-                    {
-                        "hash": doc["hash"],
-                        "seq": chunk["seq"],
-                        "pos": chunk["pos"],
-                        "text": chunk["text"],
-                    }
-                )
+            await sqlite.run(db.clear_all_embeddings, admit=False)
 
-        embed_job.total_docs = len(to_embed)
-        embed_job.total_chunks = len(all_chunks)
+        total_docs, est_chunks = await sqlite.run(
+            db.count_content_for_embedding,
+            embed_job.collection,
+            embed_job.hashes,
+            admit=False,
+        )
+        embed_job.total_docs = total_docs
+        embed_job.total_chunks = est_chunks
 
-        if not all_chunks:
-            srv_console.print(
-                f"[green]✓ Embed:[/green] all {len(docs)} docs already embedded"
-            )
+        if not total_docs:
+            srv_console.print("[green]✓ Embed:[/green] all docs already embedded")
             await broadcast(
                 {
                     "status": "complete",
                     "done_chunks": 0,
                     "total_chunks": 0,
                     "done_docs": 0,
-                    "total_docs": len(docs),
+                    "total_docs": 0,
                 }
             )
             return
@@ -90,7 +346,7 @@ async def embed_worker() -> None:
         col_label = f" [{embed_job.collection}]" if embed_job.collection else ""
         srv_console.print(
             f"[cyan]▶ Embed{col_label}:[/cyan]"
-            f" {len(to_embed)} docs, {len(all_chunks)} chunks"
+            f" {total_docs} docs, ~{est_chunks} chunks"
         )
 
         await broadcast(
@@ -103,35 +359,50 @@ async def embed_worker() -> None:
             }
         )
 
-        done_hashes: set = set()
+        producer = ChunkProducer(
+            db,
+            embed_job.collection,
+            embed_job.hashes,
+            model=_state.DEFAULT_MODEL,
+            chunker=_state.get_chunker(),
+        )
+        producer.start()
+
         now = datetime.now().isoformat()
+        writer = VectorWriter(db, embed_job, now)
+        writer.start()
         last_report_pct: int = -1  # track last reported 5%-milestone
         t0 = asyncio.get_event_loop().time()
+        model_busy = model_idle = 0.0
 
-        for i in range(0, len(all_chunks), GPU_EMBED_BATCH_SIZE):
-            batch = all_chunks[i : i + GPU_EMBED_BATCH_SIZE]
-            texts = [c["text"] for c in batch]
+        while True:
+            t_wait = time.perf_counter()
+            batch = await loop.run_in_executor(None, producer.get)
+            if batch is None:
+                break
+            texts = [c["text"] for c in batch if not c["reuse"]]
 
-            # Run model inference in thread-pool executor to avoid blocking
+            # Run model inference on the GPU executor to avoid blocking
             # the uvicorn event loop while the GPU is busy.
-            raw_embeddings = await loop.run_in_executor(
-                None,
-                lambda t=texts: list(_state.model.embed(t)),
+            t_start = time.perf_counter()
+            model_idle += t_start - t_wait
+            raw_embeddings = (
+                await gpu.run(lambda t=texts: list(_state.model.embed(t)), admit=False)
+                if texts
+                else []
             )
+            t_end = time.perf_counter()
+            model_busy += t_end - t_start
+            fresh = iter(raw_embeddings)
+            raw_embeddings = [None if c["reuse"] else next(fresh) for c in batch]
 
-            for chunk, emb in zip(batch, raw_embeddings):
-                db.insert_embedding(
-                    doc_hash=chunk["hash"],
-                    seq=chunk["seq"],
-                    pos=chunk["pos"],
-                    embedding=embedding_to_bytes(emb.tolist()),
-                    model="jinaai/jina-embeddings-v2-base-zh-int8",
-                    embedded_at=now,
-                )
-                done_hashes.add(chunk["hash"])
+            # Hand off to the writer thread; only blocks if it is still
+            # persisting the previous batch.
+            await loop.run_in_executor(None, writer.submit, batch, raw_embeddings)
+            model_idle += time.perf_counter() - t_end
 
-            embed_job.done_chunks += len(batch)
-            embed_job.done_docs = len(done_hashes)
+            # The pre-count is an estimate; never report done > total
+            embed_job.total_chunks = max(embed_job.total_chunks, embed_job.done_chunks)
 
             # Print server-side progress every 5% milestone
             total = embed_job.total_chunks
@@ -162,12 +433,28 @@ async def embed_worker() -> None:
                 }
             )
 
+        await loop.run_in_executor(None, writer.close)
+        writer_busy, writer_idle = writer.busy_s, writer.idle_s
+        # Exact chunk total is known once the producer has drained the cursor
+        embed_job.total_chunks = producer.total_chunks
+
         elapsed_total = asyncio.get_event_loop().time() - t0
         srv_console.print(
             f"[bold green]✓ Embed complete:[/bold green]"
             f" {embed_job.done_chunks} chunks, {embed_job.done_docs} docs"
+            f" ({producer.reused_chunks} chunks reused)"
             f"  ({elapsed_total:.1f}s)"
         )
+        timings = {
+            "model_busy_s": round(model_busy, 3),
+            "model_idle_s": round(model_idle, 3),
+            "writer_busy_s": round(writer_busy, 3),
+            "writer_idle_s": round(writer_idle, 3),
+        }
+        srv_console.print(
+            f"  [dim]model busy {model_busy:.1f}s / idle {model_idle:.1f}s,"
+            f" writer busy {writer_busy:.1f}s / idle {writer_idle:.1f}s[/dim]"
+        )
         await broadcast(
             {
                 "status": "complete",
@@ -175,6 +462,8 @@ async def embed_worker() -> None:
                 "total_chunks": embed_job.total_chunks,
                 "done_docs": embed_job.done_docs,
                 "total_docs": embed_job.total_docs,
+                "reused_chunks": producer.reused_chunks,
+                "timings": timings,
             }
         )
 
@@ -185,6 +474,14 @@ async def embed_worker() -> None:
         await broadcast({"status": "error", "error": str(exc)})
 
     finally:
+        if producer is not None:
+            producer.cancel()
+        if writer is not None and writer.is_alive():
+            # Error path: let already-embedded batches land, then stop
+            try:
+                await loop.run_in_executor(None, writer.close)
+            except Exception:
+                pass
         embed_job.running = False
         embed_job.finished = True
         # Send sentinel so all SSE generators terminate cleanly
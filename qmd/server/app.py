@@ -16,7 +16,6 @@ from qmd.server._middleware import RequestSizeLimitMiddleware
 from qmd.server._state import (
     model,
     reranker,
-    processing_lock,
     config,
     embed_job_lock,
     DEFAULT_MODEL,
@@ -92,6 +91,7 @@ def create_app() -> FastAPI:
             from qmd.models.config import AppConfig
 
             _state_mod.config = AppConfig.load()
+            _state_mod.get_db()
             _state_mod.embed_job_lock = asyncio.Lock()
 
             if DEFAULT_MODEL == EMBEDDING_MODEL_NAME:
@@ -110,7 +110,6 @@ def create_app() -> FastAPI:
                 load_kwargs["providers"] = providers
 
             _state_mod.model = TextEmbedding(**load_kwargs)
-            _state_mod.processing_lock = asyncio.Lock()
             logger.info("Embed model loaded successfully")
 
             # Warm up reranker (cross-encoder) + query expansion model
@@ -127,7 +126,21 @@ def create_app() -> FastAPI:
     @app.on_event("shutdown")
     async def shutdown_event():
         """Cleanup on shutdown."""
+        import qmd.server._state as _state_mod
+
         logger.info("Shutting down server")
+        for executor in (_state_mod.gpu_executor, _state_mod.sqlite_executor):
+            if executor is not None:
+                executor.shutdown()
+        for batcher in (_state_mod.embed_batcher, _state_mod.rerank_batcher):
+            if batcher is not None:
+                batcher.close()
+        for cache in (_state_mod.embed_cache, _state_mod.llm_cache, _state_mod.rerank_cache):
+            if cache is not None:
+                # Persist entries still buffered behind a busy writer
+                cache.flush()
+        if _state_mod.db is not None:
+            _state_mod.db.close()
 
     # Include all API endpoints
     app.include_router(router)
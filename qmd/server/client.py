@@ -7,12 +7,14 @@ the embedding server with automatic service discovery.
 
 import httpx
 import json as _json
+import numpy as np
 import subprocess
 import platform
 import time
 from typing import Callable, List, Optional
 import logging
 
+from ._codec import EMBEDDINGS_MEDIA_TYPE, decode_embeddings
 from .port_manager import find_available_port, get_saved_port, DEFAULT_PORT
 from .process import find_server_processes
 
@@ -179,6 +181,7 @@ class EmbedServerClient:
         collection: Optional[str] = None,
         force: bool = False,
         on_progress: Optional[Callable[[dict], None]] = None,
+        hashes: Optional[List[str]] = None,
     ) -> None:
         """Trigger server-side embedding job and stream progress via SSE.
 
@@ -191,6 +194,7 @@ class EmbedServerClient:
             on_progress: Called with each progress event dict from the server.
                          Event keys: status, done_chunks, total_chunks,
                          done_docs, total_docs, error (on error), _attached (bool).
+            hashes: Only embed documents with these content hashes.
 
         Raises:
             httpx.ConnectError: If the server is not running.
@@ -199,6 +203,8 @@ class EmbedServerClient:
         body: dict = {"force": force}
         if collection:
             body["collection"] = collection
+        if hashes is not None:
+            body["hashes"] = list(hashes)
 
         # Infinite read timeout: embedding may take a long time
         timeout = httpx.Timeout(connect=10.0, read=None, write=30.0, pool=5.0)
@@ -223,34 +229,41 @@ class EmbedServerClient:
                 if event.get("status") in ("complete", "error"):
                     break
 
-    def embed_texts(self, texts: List[str]) -> Optional[List[List[float]]]:
+    def embed_texts(self, texts: List[str]) -> Optional[np.ndarray]:
         """
         Send embedding request to server.
 
-        Sends texts in client-side chunks of CLIENT_CHUNK_SIZE to avoid
-        large HTTP request bodies, then concatenates the results.
+        One request for all texts: the server batches for the GPU and streams
+        the rows back as binary float32 (``Accept: application/x-qmd-f32``).
+        Servers that only speak JSON are handled transparently.
 
         Args:
             texts: List of text strings to embed
 
         Returns:
-            List of embedding vectors if successful, None if server unavailable
+            float32 array of shape (len(texts), dim) if successful,
+            None if server unavailable
         """
-        CLIENT_CHUNK_SIZE = 64  # safety cap; CLI already sends ≤32 per call
         try:
             client = self._get_client()
-            all_embeddings: List[List[float]] = []
-
-            for i in range(0, len(texts), CLIENT_CHUNK_SIZE):
-                chunk = texts[i : i + CLIENT_CHUNK_SIZE]
-                response = client.post(
-                    f"{self.base_url}/embed/batch",
-                    json={"texts": chunk},
-                )
-                response.raise_for_status()
-                all_embeddings.extend(response.json()["embeddings"])
+            response = client.post(
+                f"{self.base_url}/embed/batch",
+                json={"texts": texts},
+                headers={"Accept": f"{EMBEDDINGS_MEDIA_TYPE}, application/json;q=0.5"},
+            )
+            response.raise_for_status()
 
-            return all_embeddings
+            if response.headers.get("content-type", "").startswith(EMBEDDINGS_MEDIA_TYPE):
+                try:
+                    return decode_embeddings(response.content)
+                except ValueError as e:
+                    # Server failed mid-stream: fewer rows than the header promised
+                    logger.warning(
+                        f"Truncated embedding response from {self.base_url} "
+                        f"(server error mid-stream, see server log): {e}"
+                    )
+                    return None
+            return np.asarray(response.json()["embeddings"], dtype=np.float32)
 
         except httpx.ConnectError:
             logger.warning(f"Cannot connect to MCP server at {self.base_url}")
@@ -258,6 +271,10 @@ class EmbedServerClient:
         except httpx.TimeoutException:
             logger.warning("MCP server timeout")
             return None
+        except httpx.RemoteProtocolError as e:
+            # Connection dropped mid-stream
+            logger.warning(f"Truncated embedding response from {self.base_url}: {e}")
+            return None
         except Exception as e:
             logger.error(f"MCP server error: {e}")
             return None
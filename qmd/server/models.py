@@ -38,6 +38,8 @@ class QueryRequest(BaseModel):
 class QueryResponse(BaseModel):
     """Response model for hybrid search."""
     results: List[Dict[str, Any]]
+    # Seconds per pipeline stage: probe/expand/bm25/vector/rerank/total
+    timings: Dict[str, float] = {}
 
 
 class ExpandRequest(BaseModel):
@@ -67,10 +69,17 @@ class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
     reranker_loaded: bool = False
+    # Texts waiting in the embed micro-batcher
     queue_size: int = 0
+    # Cache name → counters (hits, misses, size, ...)
+    caches: Dict[str, Dict[str, Any]] = {}
+    # Executor/batcher name (gpu, sqlite, embed) → load and rejection counters
+    executors: Dict[str, Dict[str, Any]] = {}
 
 
 class EmbedIndexRequest(BaseModel):
     """Request model for server-side index embedding job."""
     collection: Optional[str] = None
     force: bool = False
+    # Restrict the job to these content hashes (e.g. files touched under `qmd watch`)
+    hashes: Optional[List[str]] = None
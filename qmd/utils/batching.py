@@ -0,0 +1,75 @@
+"""
+Length-aware batching for embedding inference.
+
+Transformer encoders pad every sequence in a batch to the longest one, so a
+batch mixing a 20-char tail chunk with 3200-char chunks spends most of its
+compute on padding. ``plan_batches`` sorts items by (estimated) token
+length and cuts the sorted run into batches whose *padded* size — items ×
+longest item — stays within a token budget: short chunks travel in large
+batches, long chunks in small ones, and VRAM per batch stays roughly flat.
+
+Callers keep each item's identity (e.g. ``(hash, seq)``) or use the returned
+indices to restore the original order after inference.
+"""
+
+import re
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Rough tokenizer-free estimate: CJK characters are ~1 token each,
+# other scripts ~4 characters per token.
+CHARS_PER_TOKEN = 4
+
+_CJK_RE = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def approx_tokens(text: str) -> int:
+    """Estimate the token count of ``text`` without loading a tokenizer."""
+    cjk = len(_CJK_RE.findall(text))
+    return max(1, cjk + (len(text) - cjk + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def plan_batches(lengths: Sequence[int], max_tokens: int, max_batch: int) -> List[List[int]]:
+    """
+    Group item indices into length-sorted batches under a padded-token budget.
+
+    Args:
+        lengths: Token (or char) length of each item
+        max_tokens: Budget per batch, counted as ``len(batch) * max(lengths)``;
+                    an item longer than the budget still gets a batch of its own
+        max_batch: Hard cap on items per batch
+
+    Returns:
+        Batches of indices into ``lengths``; every index appears exactly once,
+        shortest items first, and indices within a batch are ascending
+        (original order) so writes stay in corpus order.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    max_batch = max(1, max_batch)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        # Sorted ascending: the newest item is the longest in the batch
+        if current and (
+            len(current) >= max_batch or (len(current) + 1) * lengths[i] > max_tokens
+        ):
+            batches.append(sorted(current))
+            current = []
+        current.append(i)
+    if current:
+        batches.append(sorted(current))
+    return batches
+
+
+def bucket_batches(
+    items: Sequence[T],
+    max_tokens: int,
+    max_batch: int,
+    length_fn: Callable[[T], int],
+) -> List[List[T]]:
+    """``plan_batches`` over ``items``, returning the items themselves."""
+    return [
+        [items[i] for i in batch]
+        for batch in plan_batches([length_fn(x) for x in items], max_tokens, max_batch)
+    ]
@@ -3,16 +3,94 @@
 
 按段落/句子/换行/空格边界切分，支持 overlap。
 适用于 jina-embeddings-v2-base-zh 长文档处理（8192 tokens）。
+
+两种切分方式：
+- ``chunk_document``：按字符近似（4 字符 ≈ 1 token），无需 tokenizer
+- ``chunk_documents_by_tokens``：用 embedding 模型的 tokenizer（offset
+  mapping）按精确 token 预算切分，中文文本不再严重偏离模型容量
+- ``chunk_markdown``：按标题层级与围栏代码块切分，chunk 带标题路径
 """
 
-from typing import List, Dict
-import struct
+import hashlib
+import re
+from bisect import bisect_left
+from typing import Any, Iterator, List, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 # Chunking 参数（与 TS 对齐）
 # TS: CHUNK_SIZE_TOKENS = 800, CHUNK_OVERLAP_TOKENS = 120
 # Python: 按字符近似（无 tokenizer 时）
 CHUNK_SIZE_CHARS = 3200  # ~800 tokens * 4 chars/token
 CHUNK_OVERLAP_CHARS = 480  # ~120 tokens * 4 chars/token
+# Tokenizer-backed chunking (chunk_strategy = "tokens")
+CHUNK_SIZE_TOKENS = 800
+CHUNK_OVERLAP_TOKENS = 120
+
+
+def _find_break(content: str, search_start: int, end_pos: int) -> int:
+    """
+    在 content[search_start:end_pos] 中寻找最靠后的断点，返回断点后的位置；没有则 -1。
+
+    优先级：段落 > 句子 > 换行 > 空格。用 ``rfind(sub, start, end)`` 直接在
+    原串上按区间查找（C 层扫描），不切片复制窗口。
+    """
+    para_break = content.rfind("\n\n", search_start, end_pos)
+    if para_break >= 0:
+        return para_break + 2
+    # 句子结尾：`. `、`.\n`、`? `、`?\n`、`! `、`!\n`
+    sent_end = max(
+        content.rfind(". ", search_start, end_pos),
+        content.rfind(".\n", search_start, end_pos),
+        content.rfind("? ", search_start, end_pos),
+        content.rfind("?\n", search_start, end_pos),
+        content.rfind("! ", search_start, end_pos),
+        content.rfind("!\n", search_start, end_pos),
+    )
+    if sent_end >= 0:
+        return sent_end + 2
+    line_break = content.rfind("\n", search_start, end_pos)
+    if line_break >= 0:
+        return line_break + 1
+    space = content.rfind(" ", search_start, end_pos)
+    if space >= 0:
+        return space + 1
+    return -1
+
+
+def iter_chunk_spans(
+    content: str,
+    max_chars: int = CHUNK_SIZE_CHARS,
+    overlap_chars: int = CHUNK_OVERLAP_CHARS,
+) -> Iterator[Tuple[int, int]]:
+    """
+    惰性生成 chunk 的 (pos, end) 字符区间，与 ``chunk_document`` 完全一致。
+
+    每步只在窗口最后 30% 内做有界 ``rfind``（每个字符至多被扫描常数次，
+    整体线性），不复制窗口文本；调用方按需 ``content[pos:end]`` 取文本。
+    """
+    n = len(content)
+    if n <= max_chars:
+        yield 0, n
+        return
+
+    char_pos = 0
+    while char_pos < n:
+        end_pos = min(char_pos + max_chars, n)
+
+        if end_pos < n:
+            # 在最后 30% 范围内寻找合适的断点
+            search_start = int((end_pos - char_pos) * 0.7) + char_pos
+            break_offset = _find_break(content, search_start, end_pos)
+            if break_offset > char_pos:
+                end_pos = break_offset
+
+        yield char_pos, end_pos
+        if end_pos >= n:
+            # Reached the end: stepping back by the overlap here would emit
+            # one-character-shifted tail chunks until char_pos hits the end
+            return
+        char_pos = max(char_pos + 1, end_pos - overlap_chars)
 
 
 def chunk_document(
@@ -37,65 +115,206 @@ def chunk_document(
     Returns:
         List of {"text": str, "pos": int, "seq": int}
     """
-    if len(content) <= max_chars:
-        return [{"text": content, "pos": 0, "seq": 0}]
+    return [
+        {"text": content[pos:end], "pos": pos, "seq": seq}
+        for seq, (pos, end) in enumerate(iter_chunk_spans(content, max_chars, overlap_chars))
+    ]
+
+
+# Markdown 结构：ATX 标题（围栏代码块内的不算）与围栏代码块的起止行
+_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})[ \t]+(.+?)(?:[ \t]+#+)?[ \t]*$")
+_FENCE_OPEN_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_FENCE_CLOSE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})[ \t]*$")
+HEADING_SEPARATOR = " > "
+
+
+def _markdown_sections(content: str) -> List[Tuple[int, int, str, List[int]]]:
+    """
+    按标题层级切出 section：[(start, end, 标题路径, 围栏代码块边界位置)]。
+
+    标题路径为各级标题以 `` > `` 连接（如 ``安装 > Linux``），首个标题前
+    的内容路径为空。围栏代码块内以 ``#`` 开头的行不视为标题。
+    """
+    sections: List[Tuple[int, int, str, List[int]]] = []
+    stack: List[Tuple[int, str]] = []  # (level, title)
+    sec_start, heading, cuts = 0, "", []
+    fence: Optional[str] = None  # opening fence run, e.g. "```"
+    pos = 0
+    for line in content.splitlines(keepends=True):
+        line_end = pos + len(line)
+        text = line.rstrip("\r\n")
+        if fence is None:
+            opening = _FENCE_OPEN_RE.match(text)
+            heading_match = None if opening else _HEADING_RE.match(text)
+            if opening:
+                fence = opening.group(1)
+                cuts.append(pos)
+            elif heading_match:
+                if pos > sec_start:
+                    sections.append((sec_start, pos, heading, cuts))
+                level = len(heading_match.group(1))
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                stack.append((level, heading_match.group(2)))
+                heading = HEADING_SEPARATOR.join(title for _, title in stack)
+                sec_start, cuts = pos, []
+        else:
+            closing = _FENCE_CLOSE_RE.match(text)
+            if (
+                closing
+                and closing.group(1)[0] == fence[0]
+                and len(closing.group(1)) >= len(fence)
+            ):
+                fence = None
+                cuts.append(line_end)
+        pos = line_end
+    if len(content) > sec_start or not sections:
+        sections.append((sec_start, len(content), heading, cuts))
+    return sections
+
+
+def chunk_markdown(
+    content: str,
+    max_chars: int = CHUNK_SIZE_CHARS,
+    overlap_chars: int = CHUNK_OVERLAP_CHARS,
+) -> List[Dict]:
+    """
+    按 Markdown 结构切分，返回 [{text, pos, seq, heading}]。
+
+    - 每个标题开始一个新 chunk，chunk 不跨 section；``heading`` 为标题路径
+    - 围栏代码块是完整的块：相邻的段落与代码块合并到 ``max_chars``，
+      代码块不会被从中间切开，除非它本身超过 ``max_chars``
+    - 超长的块退回 ``iter_chunk_spans``（段落 > 句子 > 换行 > 空格，带 overlap）
+
+    没有标题和代码块的文本与 ``chunk_document`` 的切分相同。
+    """
+    chunks: List[Dict] = []
+
+    def emit(start: int, end: int, heading: str) -> None:
+        if content[start:end].strip():
+            chunks.append(
+                {"text": content[start:end], "pos": start, "seq": len(chunks), "heading": heading}
+            )
+
+    for start, end, heading, cuts in _markdown_sections(content):
+        bounds = [start] + [c for c in cuts if start < c < end] + [end]
+        cur_start = cur_end = start
+        for block_start, block_end in zip(bounds, bounds[1:]):
+            if block_end - cur_start <= max_chars:
+                cur_end = block_end  # block fits into the current chunk
+                continue
+            emit(cur_start, cur_end, heading)
+            if block_end - block_start <= max_chars:
+                cur_start, cur_end = block_start, block_end
+                continue
+            for pos, span_end in iter_chunk_spans(
+                content[block_start:block_end], max_chars, overlap_chars
+            ):
+                emit(block_start + pos, block_start + span_end, heading)
+            cur_start = cur_end = block_end
+        emit(cur_start, cur_end, heading)
+
+    if not chunks:  # empty or whitespace-only document
+        return [{"text": content, "pos": 0, "seq": 0, "heading": ""}]
+    return chunks
+
+
+def _chunk_by_offsets(
+    content: str, starts: Sequence[int], max_tokens: int, overlap_tokens: int
+) -> List[Dict]:
+    """Token-budget chunking over per-token start offsets (see chunk_documents_by_tokens)."""
+    n = len(starts)
+    if n <= max_tokens:
+        return [{"text": content, "pos": 0, "seq": 0, "tokens": n}]
 
     chunks = []
+    t0 = 0  # first token of the current chunk
     char_pos = 0
     seq = 0
+    while True:
+        if t0 + max_tokens >= n:
+            chunks.append(
+                {"text": content[char_pos:], "pos": char_pos, "seq": seq, "tokens": n - t0}
+            )
+            break
+        # Cutting anywhere up to the first token that does not fit keeps the budget
+        end_pos = starts[t0 + max_tokens]
+        # 在最后 30% 的 token 范围内寻找合适的断点
+        search_start = max(char_pos, starts[t0 + int(max_tokens * 0.7)])
+        break_offset = _find_break(content, search_start, end_pos)
+        if break_offset > char_pos:
+            end_pos = break_offset
+        t_end = max(t0 + 1, bisect_left(starts, end_pos, t0))  # tokens before the cut
+        chunks.append(
+            {
+                "text": content[char_pos:end_pos],
+                "pos": char_pos,
+                "seq": seq,
+                "tokens": t_end - t0,
+            }
+        )
+        seq += 1
+        t0 = max(t0 + 1, t_end - overlap_tokens)
+        # No overlap: continue exactly at the cut so no characters are dropped
+        char_pos = starts[t0] if t0 < t_end else end_pos
 
-    while char_pos < len(content):
-        end_pos = min(char_pos + max_chars, len(content))
+    return chunks
 
-        if end_pos < len(content):
-            # 在最后 30% 范围内寻找合适的断点
-            search_start = int((end_pos - char_pos) * 0.7) + char_pos
-            search_slice = content[search_start:end_pos]
-
-            break_offset = -1
-
-            # 优先级：段落 > 句子 > 换行 > 空格
-            para_break = search_slice.rfind("\n\n")
-            if para_break >= 0:
-                break_offset = search_start + para_break + 2
-            else:
-                # 句子结尾：`. `、`.\n`、`? `、`?\n`、`! `、`!\n`
-                sent_end = max(
-                    search_slice.rfind(". "),
-                    search_slice.rfind(".\n"),
-                    search_slice.rfind("? "),
-                    search_slice.rfind("?\n"),
-                    search_slice.rfind("! "),
-                    search_slice.rfind("!\n"),
-                )
-                if sent_end >= 0:
-                    break_offset = search_start + sent_end + 2
-                else:
-                    line_break = search_slice.rfind("\n")
-                    if line_break >= 0:
-                        break_offset = search_start + line_break + 1
-                    else:
-                        space = search_slice.rfind(" ")
-                        if space >= 0:
-                            break_offset = search_start + space + 1
 
-            if break_offset > char_pos:
-                end_pos = break_offset
+def chunk_documents_by_tokens(
+    contents: Sequence[str],
+    tokenizer: Any,
+    max_tokens: int = CHUNK_SIZE_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> List[List[Dict]]:
+    """
+    用 tokenizer 按精确 token 预算切分多个文档，返回每个文档的 [{text, pos, seq, tokens}]。
 
-        chunk_text = content[char_pos:end_pos]
-        chunks.append({"text": chunk_text, "pos": char_pos, "seq": seq})
-        seq += 1
-        char_pos = max(char_pos + 1, end_pos - overlap_chars)
+    文档一次性批量编码（``encode_batch``，HF tokenizers 在 Rust 侧并行），
+    再按 offset mapping 把 token 边界映射回字符位置：每个 chunk 最多
+    ``max_tokens`` 个 token，断点优先级与 ``chunk_document`` 相同（段落 >
+    句子 > 换行 > 空格，在预算最后 30% 内寻找）。
 
-    return chunks
+    Args:
+        contents: 原始文本列表
+        tokenizer: ``tokenizers.Tokenizer`` 或兼容对象（``encode_batch`` 返回
+                   带 ``offsets`` 的 encoding）；应关闭截断，否则长文档只能看到开头
+        max_tokens: 每个 chunk 最大 token 数（不含特殊 token）
+        overlap_tokens: 相邻 chunk 的重叠 token 数
 
+    Returns:
+        每个文档一个 chunk 列表；``tokens`` 为 chunk 的 token 数，供批处理使用
+    """
+    if not contents:
+        return []
+    encodings = tokenizer.encode_batch(list(contents), add_special_tokens=False)
+    return [
+        _chunk_by_offsets(
+            content, [start for start, _ in enc.offsets], max_tokens, overlap_tokens
+        )
+        for content, enc in zip(contents, encodings)
+    ]
+
+
+def chunk_hash(text: str, model: str) -> str:
+    """
+    chunk 的内容寻址 key：sha256(model + text)。
 
-def embedding_to_bytes(embedding: List[float]) -> bytes:
+    相同文本在同一模型下得到相同向量，因此文档修改后未变的 chunk
+    （以及跨文档重复的 chunk）可直接复用已有向量。
     """
-    将 float 列表转换为 sqlite-vec 所需的 bytes 格式（float32 LE）。
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def embedding_to_bytes(embedding: Union[np.ndarray, Sequence[float]]) -> bytes:
+    """
+    将向量转换为 sqlite-vec 所需的 bytes 格式（float32 LE）。
+
+    A contiguous float32 ndarray is serialized with a single ``tobytes()``
+    (no per-element Python floats); lists are converted once by numpy.
 
     Args:
-        embedding: float 列表（通常是 1024 维）
+        embedding: float32 ndarray 或 float 列表（通常是 768 维）
 
     Returns:
         bytes: packed float32 in little-endian format
@@ -105,4 +324,4 @@ def embedding_to_bytes(embedding: List[float]) -> bytes:
         >>> embedding_to_bytes(emb)
         b'\\xcd\\xcc\\xcc=\\xcd\\xcc\\xcc>\\x9a\\x99\\x99?'
     """
-    return struct.pack(f"{len(embedding)}f", *embedding)
+    return np.ascontiguousarray(embedding, dtype="<f4").tobytes()
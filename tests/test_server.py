@@ -71,6 +71,7 @@ def test_client_embed_texts(monkeypatch):
 
     class MockResponse:
         status_code = 200
+        headers = {"content-type": "application/json"}  # JSON-only server
 
         def json(self):
             return {"embeddings": [[0.1] * 384, [0.2] * 384]}
@@ -98,3 +99,135 @@ def test_client_embed_texts(monkeypatch):
     assert result is not None
     assert len(result) == 2
     assert len(result[0]) == 384
+
+
+def test_embedding_codec_roundtrip():
+    """QF32 binary payload round-trips and rejects truncated bodies."""
+    import numpy as np
+    from qmd.server._codec import decode_embeddings, encode_embeddings
+
+    matrix = np.arange(12, dtype=np.float32).reshape(3, 4)
+    payload = encode_embeddings(matrix)
+    assert np.array_equal(decode_embeddings(payload), matrix)
+    with pytest.raises(ValueError):
+        decode_embeddings(payload[:-4])
+
+
+def test_embed_batch_binary_negotiation(test_client, monkeypatch):
+    """Accept: application/x-qmd-f32 streams binary rows; default stays JSON."""
+    import numpy as np
+    import qmd.server._state as _state
+    from qmd.server._codec import EMBEDDINGS_MEDIA_TYPE, decode_embeddings
+
+    class FakeModel:
+        def embed(self, texts):
+            for t in texts:
+                yield np.full(4, len(t), dtype=np.float32)
+
+    monkeypatch.setattr(_state, "model", FakeModel())
+    texts = ["x" * (i % 7) for i in range(70)]  # spans several GPU batches
+
+    response = test_client.post(
+        "/embed/batch", json={"texts": texts}, headers={"Accept": EMBEDDINGS_MEDIA_TYPE}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(EMBEDDINGS_MEDIA_TYPE)
+    matrix = decode_embeddings(response.content)
+    assert matrix.shape == (70, 4)
+    assert matrix[:, 0].tolist() == [float(len(t)) for t in texts]
+
+    response = test_client.post("/embed/batch", json={"texts": texts[:2]})
+    assert response.json()["embeddings"] == [[0.0] * 4, [1.0] * 4]
+
+
+def test_embed_batch_binary_errors(test_client, monkeypatch, caplog):
+    """A failing first batch is a 500; a later failure truncates and is logged."""
+    import httpx
+    import numpy as np
+    import qmd.server._state as _state
+    from qmd.server._codec import EMBEDDINGS_MEDIA_TYPE
+    from qmd.server.client import EmbedServerClient
+
+    class FailingModel:
+        def __init__(self, fail_after):
+            self.fail_after = fail_after
+            self.rows = 0
+
+        def embed(self, texts):
+            if self.rows >= self.fail_after:
+                raise RuntimeError("GPU fell over")
+            self.rows += len(texts)
+            for _ in texts:
+                yield np.ones(4, dtype=np.float32)
+
+    texts = ["t"] * 70  # spans several GPU batches
+    headers = {"Accept": EMBEDDINGS_MEDIA_TYPE}
+
+    monkeypatch.setattr(_state, "model", FailingModel(fail_after=0))
+    response = test_client.post("/embed/batch", json={"texts": texts}, headers=headers)
+    assert response.status_code == 500
+
+    monkeypatch.setattr(_state, "model", FailingModel(fail_after=1))
+    response = test_client.post("/embed/batch", json={"texts": texts}, headers=headers)
+    assert response.status_code == 200
+    truncated = response.content
+
+    client = EmbedServerClient(base_url="http://qmd.test")
+    client._client = httpx.Client(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(
+                200, content=truncated, headers={"content-type": EMBEDDINGS_MEDIA_TYPE}
+            )
+        )
+    )
+    with caplog.at_level("WARNING", logger="qmd.server.client"):
+        assert client.embed_texts(texts) is None
+    assert "Truncated embedding response" in caplog.text
+
+
+def test_bounded_executor_admission():
+    """A saturated pool rejects new work with 503 but lets background jobs wait."""
+    import asyncio
+    import threading
+    from qmd.server._executors import BoundedExecutor, OverloadedError
+
+    executor = BoundedExecutor("gpu", workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        busy = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(OverloadedError) as exc_info:
+            await executor.run(lambda: None)
+        assert exc_info.value.status_code == 503
+        queued = asyncio.ensure_future(executor.run(lambda: "done", admit=False))
+        release.set()
+        return await busy, await queued
+
+    assert asyncio.run(scenario()) == (True, "done")
+    assert executor.stats() == {"workers": 1, "pending": 0, "max_pending": 1, "rejected": 1}
+    executor.shutdown()
+
+
+def test_overloaded_endpoint_returns_503(test_client, monkeypatch):
+    """/rerank fails fast when the GPU pool is full; /health stays responsive."""
+    import types
+    import qmd.server._endpoints as _endpoints
+    import qmd.server._state as _state
+    from qmd.server._executors import BoundedExecutor
+
+    saturated = BoundedExecutor("gpu", workers=1, max_pending=1)
+    saturated.pending = 1
+    monkeypatch.setattr(_state, "gpu_executor", saturated)
+    reranker = types.SimpleNamespace(rerank=lambda *a, **kw: [])
+    monkeypatch.setattr(_endpoints, "get_reranker", lambda: reranker)
+
+    response = test_client.post(
+        "/rerank", json={"query": "q", "documents": [{"content": "d"}]}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    health = test_client.get("/health")
+    assert health.status_code == 200
+    assert health.json()["executors"]["gpu"]["rejected"] == 1
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+from qmd.search.rerank import LLMReranker
+from qmd.server._batcher import MicroBatcher
+from qmd.server._executors import OverloadedError
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+
+    def _double(self, items):
+        self.batches.append(list(items))
+        return [x * 2 for x in items]
+
+    def test_concurrent_requests_share_one_batch(self):
+        batcher = MicroBatcher(self._double, max_batch=5, max_wait=1.0)
+        futures = [batcher.submit_future([1, 2]), batcher.submit_future([3]), batcher.submit_future([4, 5])]
+        self.assertEqual([f.result(timeout=5) for f in futures], [[2, 4], [6], [8, 10]])
+        self.assertEqual(self.batches, [[1, 2, 3, 4, 5]])
+        self.assertEqual(batcher.stats()["mean_batch"], 5.0)
+        batcher.close()
+
+    def test_large_request_is_split_and_reassembled(self):
+        batcher = MicroBatcher(self._double, max_batch=4, max_wait=0.001)
+        self.assertEqual(batcher.submit(list(range(10))), [x * 2 for x in range(10)])
+        self.assertEqual([len(b) for b in self.batches], [4, 4, 2])
+        self.assertEqual(batcher.submit([]), [])
+        batcher.close()
+
+    def test_lone_request_waits_at_most_max_wait(self):
+        batcher = MicroBatcher(self._double, max_batch=64, max_wait=0.02)
+        t0 = time.monotonic()
+        self.assertEqual(asyncio.run(batcher.asubmit([7])), [14])
+        self.assertLess(time.monotonic() - t0, 1.0)
+        batcher.close()
+
+    def test_failure_reaches_every_caller_in_the_batch(self):
+        def boom(items):
+            raise ValueError("model exploded")
+
+        batcher = MicroBatcher(boom, max_batch=2, max_wait=1.0)
+        futures = [batcher.submit_future(["a"]), batcher.submit_future(["b"])]
+        for f in futures:
+            with self.assertRaises(ValueError):
+                f.result(timeout=5)
+        batcher.close()
+
+    def test_admission_limit(self):
+        release = threading.Event()
+
+        def slow(items):
+            release.wait(5)
+            return items
+
+        batcher = MicroBatcher(slow, max_batch=1, max_wait=0.0, max_queue=2)
+        running = batcher.submit_future(["running"])
+        while batcher.queue_size:  # first item picked up by the worker
+            time.sleep(0.001)
+        queued = batcher.submit_future(["q1", "q2"])
+        with self.assertRaises(OverloadedError):
+            batcher.submit_future(["rejected"])
+        background = batcher.submit_future(["bg"], admit=False)
+        self.assertEqual(batcher.queue_size, 3)
+        release.set()
+        self.assertEqual(running.result(5) + queued.result(5) + background.result(5), ["running", "q1", "q2", "bg"])
+        self.assertEqual(batcher.stats()["rejected"], 1)
+        batcher.close()
+
+    def test_buckets_keep_similar_lengths_together(self):
+        batcher = MicroBatcher(self._double, max_batch=8, max_wait=1.0, bucket_key=lambda x: x // 10)
+        futures = [batcher.submit_future([1, 55, 2]), batcher.submit_future([57, 3, 91, 4, 5, 6, 7, 8])]
+        self.assertEqual(futures[0].result(5), [2, 110, 4])
+        self.assertEqual(futures[1].result(5), [114, 6, 182, 8, 10, 12, 14, 16])
+        # Oldest bucket first; a full batch of small items, then the rest by bucket
+        self.assertEqual(self.batches, [[1, 2, 3, 4, 5, 6, 7, 8], [55, 57], [91]])
+        batcher.close()
+
+    def test_concurrent_reranks_share_cross_encoder_passes(self):
+        passes = []
+
+        def score_pairs(pairs):
+            passes.append(list(pairs))
+            return [float(len(t)) for _, t in pairs]
+
+        batcher = MicroBatcher(score_pairs, max_batch=4, max_wait=1.0)
+        reranker = LLMReranker(pair_scorer=batcher.submit)
+        results = {}
+
+        def run(query, docs):
+            results[query] = reranker.rerank(query, [{"content": d} for d in docs])
+
+        with mock.patch.object(LLMReranker, "model", new_callable=mock.PropertyMock):
+            threads = [
+                threading.Thread(target=run, args=("q1", ["a", "bbb"])),
+                threading.Thread(target=run, args=("q2", ["cc", "d"])),
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+
+        self.assertEqual(len(passes), 1)
+        self.assertEqual({q for q, _ in passes[0]}, {"q1", "q2"})
+        self.assertEqual([d["content"] for d in results["q1"]], ["bbb", "a"])
+        self.assertEqual([d["rerank_score"] for d in results["q2"]], [2.0, 1.0])
+        batcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from qmd.utils.batching import approx_tokens, bucket_batches, plan_batches
+
+
+class TestLengthBatching(unittest.TestCase):
+    def test_approx_tokens(self):
+        self.assertEqual(approx_tokens(""), 1)
+        self.assertEqual(approx_tokens("abcdefgh"), 2)
+        self.assertEqual(approx_tokens("向量检索"), 4)
+
+    def test_batches_are_length_sorted_and_cover_every_item(self):
+        lengths = [10, 500, 20, 480, 15, 30]
+        batches = plan_batches(lengths, max_tokens=1000, max_batch=8)
+        self.assertEqual(batches, [[0, 2, 4, 5], [1, 3]])
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(len(lengths))))
+        for b in batches:
+            self.assertLessEqual(len(b) * max(lengths[i] for i in b), 1000)
+
+    def test_batch_size_adapts_to_length(self):
+        lengths = [5] * 40 + [400] * 6
+        sizes = [len(b) for b in plan_batches(lengths, max_tokens=800, max_batch=32)]
+        self.assertEqual(sizes, [32, 8, 2, 2, 2])
+
+    def test_oversized_item_gets_its_own_batch(self):
+        self.assertEqual(plan_batches([5000, 10], max_tokens=100, max_batch=4), [[1], [0]])
+
+    def test_bucket_batches_returns_items(self):
+        items = ["long text here", "a", "bb"]
+        self.assertEqual(
+            bucket_batches(items, max_tokens=20, max_batch=2, length_fn=len),
+            [["a", "bb"], ["long text here"]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
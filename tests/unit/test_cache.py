@@ -0,0 +1,294 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from qmd.database.manager import DatabaseManager
+from qmd.search.embed_cache import QueryEmbeddingCache, normalize_query
+from qmd.search.llm_cache import LLMCache, make_key
+from qmd.search.rerank import LLMReranker
+from qmd.utils.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # "b" is now the oldest
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "size": 2, "maxsize": 2})
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(maxsize=4, ttl=10)
+        with mock.patch("qmd.utils.cache.time.monotonic", return_value=100.0):
+            cache.put("a", 1)
+        with mock.patch("qmd.utils.cache.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("qmd.utils.cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def _embed(self, text):
+        self.calls.append(text)
+        return np.full(4, len(text), dtype=np.float32)
+
+    def test_normalized_text_shares_an_entry(self):
+        self.assertEqual(normalize_query("  vector　 search\n"), "vector search")
+        embed = QueryEmbeddingCache(model="m").wrap(self._embed)
+        first = embed("vector search")
+        second = embed("  vector   search ")
+        self.assertIs(first, second)
+        self.assertEqual(self.calls, ["vector search"])
+
+    def test_model_is_part_of_the_key_and_counters(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            db = DatabaseManager(os.path.join(tmp, "qmd.db"))
+            a = QueryEmbeddingCache(model="model-a", pool=db.pool)
+            b = QueryEmbeddingCache(model="model-b", pool=db.pool)
+            a.get_or_embed("q", self._embed)
+            b.get_or_embed("q", self._embed)
+            self.assertEqual(len(self.calls), 2)
+            self.assertEqual(a.stats()["misses"], 1)
+            db.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_get_or_embed_many_batches_misses(self):
+        cache = QueryEmbeddingCache(model="m")
+        cache.get_or_embed("a", self._embed)
+        batches = []
+
+        def embed_batch(texts):
+            batches.append(list(texts))
+            return [self._embed(t) for t in texts]
+
+        vecs = cache.get_or_embed_many(["a", "bb", " bb ", "ccc"], embed_batch)
+        self.assertEqual(batches, [["bb", "ccc"]])
+        self.assertEqual([v[0] for v in vecs], [1.0, 2.0, 2.0, 3.0])
+        self.assertEqual(cache.wrap_batch(embed_batch)(["ccc"])[0][0], 3.0)
+        self.assertEqual(len(batches), 1)
+
+    def test_sqlite_persistence_survives_restart(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            db = DatabaseManager(os.path.join(tmp, "qmd.db"))
+            QueryEmbeddingCache(model="m", pool=db.pool).get_or_embed("hello", self._embed)
+
+            restarted = QueryEmbeddingCache(model="m", pool=db.pool)
+            vec = restarted.get_or_embed("hello", self._embed)
+            self.assertEqual(self.calls, ["hello"])
+            self.assertEqual(vec.tolist(), [5.0] * 4)
+            self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+            # Expired rows are ignored
+            expired = QueryEmbeddingCache(model="m", pool=db.pool, ttl=60)
+            with mock.patch("qmd.search.embed_cache.time.time", return_value=time.time() + 120):
+                self.assertIsNone(expired.get("hello"))
+            db.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_store_does_not_wait_for_a_busy_writer(self):
+        import threading
+
+        tmp = tempfile.mkdtemp()
+        try:
+            db = DatabaseManager(os.path.join(tmp, "qmd.db"))
+            cache = QueryEmbeddingCache(model="m", pool=db.pool)
+            held, release = threading.Event(), threading.Event()
+
+            def hold_writer():
+                with db.pool.writer():
+                    held.set()
+                    release.wait(5)
+
+            t = threading.Thread(target=hold_writer)
+            t.start()
+            held.wait(5)
+            started = time.monotonic()
+            cache.get_or_embed("hello", self._embed)
+            self.assertLess(time.monotonic() - started, 1.0)
+            release.set()
+            t.join()
+
+            count = "SELECT count(*) FROM query_embeddings"
+            self.assertEqual(db.pool.reader().execute(count).fetchone()[0], 0)
+            cache.flush()
+            self.assertEqual(db.pool.reader().execute(count).fetchone()[0], 1)
+            db.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.tmp, "qmd.db"))
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_key_covers_every_input(self):
+        base = make_key("expand_query", query="q", include_lexical=True, model="m")
+        self.assertEqual(
+            base, make_key("expand_query", model="m", include_lexical=True, query="q")
+        )
+        self.assertNotEqual(
+            base, make_key("expand_query", query="q", include_lexical=False, model="m")
+        )
+        self.assertNotEqual(
+            base, make_key("expand_query", query="q", include_lexical=True, model="m2")
+        )
+
+    def test_persists_and_evicts_least_recently_used(self):
+        cache = LLMCache(self.db.pool, max_entries=2)
+        with mock.patch("qmd.search.llm_cache.time.time", side_effect=[1.0, 2.0, 100.0, 101.0]):
+            cache.put("a", {"vec": ["x"]})
+            cache.put("b", {"vec": ["y"]})
+            self.assertEqual(cache.get("a"), {"vec": ["x"]})  # touched at 100.0
+            cache.put("c", {"vec": ["z"]})
+
+        restarted = LLMCache(self.db.pool, max_entries=2)
+        self.assertEqual(restarted.get("a"), {"vec": ["x"]})
+        self.assertIsNone(restarted.get("b"))
+        self.assertEqual(restarted.get("c"), {"vec": ["z"]})
+        self.assertEqual(self.db.cleanup_llm_cache(), 2)
+
+    def test_writes_do_not_wait_for_a_busy_writer(self):
+        import threading
+
+        cache = LLMCache(self.db.pool)
+        held, release = threading.Event(), threading.Event()
+
+        def hold_writer():
+            with self.db.pool.writer():
+                held.set()
+                release.wait(5)
+
+        t = threading.Thread(target=hold_writer)
+        t.start()
+        held.wait(5)
+        started = time.monotonic()
+        cache.put("a", {"vec": ["x"]})
+        self.assertEqual(cache.get("a"), {"vec": ["x"]})
+        self.assertLess(time.monotonic() - started, 1.0)
+        release.set()
+        t.join()
+
+        self.assertIsNone(LLMCache(self.db.pool).get("a"))
+        cache.flush()
+        self.assertEqual(LLMCache(self.db.pool).get("a"), {"vec": ["x"]})
+
+    def test_eviction_runs_only_over_the_limit(self):
+        cache = LLMCache(self.db.pool, max_entries=3)
+        with mock.patch.object(LLMCache, "_evict", autospec=True) as evict:
+            cache.put_many({"a": 1, "b": 2})
+            cache.put("c", 3)
+            evict.assert_not_called()
+            cache.put("d", 4)
+            evict.assert_called_once()
+
+    def test_expand_query_is_cached(self):
+        result = {"lex": [], "vec": ["rust borrow checker"], "hyde": []}
+        reranker = LLMReranker(expansion_cache=LLMCache(self.db.pool))
+        with mock.patch.object(
+            LLMReranker, "_expand_query_uncached", return_value=result
+        ) as expand:
+            self.assertEqual(reranker.expand_query("rust borrow"), result)
+            self.assertEqual(reranker.expand_query("rust borrow"), result)
+            reranker.expand_query("rust borrow", include_lexical=False)
+        self.assertEqual(expand.call_count, 2)
+
+    def test_expansion_key_follows_the_loaded_model(self):
+        from pathlib import Path
+
+        cache = LLMCache(self.db.pool)
+        result = {"lex": [], "vec": ["v"], "hyde": []}
+        for name in ("model-a", "model-b"):
+            local = Path(self.tmp) / name
+            local.mkdir()
+            (local / "config.json").write_text("{}")
+            reranker = LLMReranker(local_expansion_path=local, expansion_cache=cache)
+            with mock.patch.object(
+                LLMReranker, "_expand_query_uncached", return_value=result
+            ) as expand:
+                reranker.expand_query("q")
+            # A different local model never reuses the other's expansions
+            self.assertEqual(expand.call_count, 1)
+
+    def test_failed_expansion_is_not_cached(self):
+        cache = LLMCache(self.db.pool)
+        reranker = LLMReranker(expansion_cache=cache)
+        with mock.patch.object(LLMReranker, "_expand_query_uncached", return_value=None):
+            self.assertEqual(
+                reranker.expand_query("q"), {"lex": [], "vec": [], "hyde": []}
+            )
+        self.assertEqual(self.db.cleanup_llm_cache(), 0)
+
+
+class TestRerankScoreCache(unittest.TestCase):
+    def _reranker(self, cache):
+        reranker = LLMReranker(score_cache=cache)
+        self.scored = []
+
+        def score(pairs):
+            self.scored.append([t for _, t in pairs])
+            return np.array([float(len(t)) for _, t in pairs])
+
+        patches = [
+            mock.patch.object(LLMReranker, "model", new_callable=mock.PropertyMock),
+            mock.patch.object(reranker, "score_pairs", side_effect=score),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        return reranker
+
+    def test_only_misses_are_scored(self):
+        reranker = self._reranker(LLMCache(memory_size=64))
+        docs = [{"content": "aa"}, {"content": "bbbb"}]
+        ranked = reranker.rerank("query", docs, top_k=2)
+        self.assertEqual([d["content"] for d in ranked], ["bbbb", "aa"])
+
+        more = [{"content": "bbbb"}, {"content": "c"}, {"content": "aa"}]
+        ranked = reranker.rerank("  query ", more, top_k=3)
+        self.assertEqual(self.scored, [["aa", "bbbb"], ["c"]])
+        self.assertEqual([d["rerank_score"] for d in ranked], [4.0, 2.0, 1.0])
+
+        reranker.rerank("other query", [{"content": "aa"}])
+        self.assertEqual(self.scored[-1], ["aa"])
+
+    def test_scores_persist_in_sqlite(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            db = DatabaseManager(os.path.join(tmp, "qmd.db"))
+            self._reranker(LLMCache(db.pool, table="rerank_cache")).rerank("q", [{"content": "aa"}])
+            self._reranker(LLMCache(db.pool, table="rerank_cache")).rerank("q", [{"content": "aa"}])
+            self.assertEqual(self.scored, [])
+            # Scores have their own table and LRU budget, apart from expansions
+            count = "SELECT count(*) FROM {}"
+            conn = db.pool.reader()
+            self.assertEqual(conn.execute(count.format("rerank_cache")).fetchone()[0], 1)
+            self.assertEqual(conn.execute(count.format("llm_cache")).fetchone()[0], 0)
+            self.assertEqual(db.cleanup_llm_cache(), 1)
+            db.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import re
+import struct
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from qmd.utils.chunker import (
+    chunk_document,
+    chunk_documents_by_tokens,
+    chunk_markdown,
+    embedding_to_bytes,
+    iter_chunk_spans,
+)
+
+
+class _RegexTokenizer:
+    """Stand-in for tokenizers.Tokenizer: one token per CJK char, word or symbol."""
+
+    _TOKEN = re.compile(r"[\u4e00-\u9fff]|\w+|[^\w\s]")
+
+    def __init__(self):
+        self.batches = []
+
+    def encode_batch(self, texts, add_special_tokens=True):
+        self.batches.append(len(texts))
+        return [
+            SimpleNamespace(offsets=[m.span() for m in self._TOKEN.finditer(t)])
+            for t in texts
+        ]
+
+
+class TestChunkDocument(unittest.TestCase):
+    def test_short_document_is_single_chunk(self):
+        self.assertEqual(chunk_document("hello"), [{"text": "hello", "pos": 0, "seq": 0}])
+
+    def test_chunks_cover_document_without_degenerate_tail(self):
+        content = "Sentence number one. " * 800
+        chunks = chunk_document(content)
+        self.assertEqual([c["seq"] for c in chunks], list(range(len(chunks))))
+        last = chunks[-1]
+        self.assertEqual(last["pos"] + len(last["text"]), len(content))
+        # Only the final chunk may reach the end of the document
+        self.assertTrue(all(c["pos"] + len(c["text"]) < len(content) for c in chunks[:-1]))
+        for c in chunks:
+            self.assertEqual(content[c["pos"] : c["pos"] + len(c["text"])], c["text"])
+
+
+def _reference_spans(content, max_chars, overlap_chars):
+    """Frozen copy of the slicing chunk_document loop that iter_chunk_spans replaced."""
+    if len(content) <= max_chars:
+        return [(0, len(content))]
+    spans = []
+    char_pos = 0
+    while char_pos < len(content):
+        end_pos = min(char_pos + max_chars, len(content))
+        if end_pos < len(content):
+            search_start = int((end_pos - char_pos) * 0.7) + char_pos
+            window = content[search_start:end_pos]
+            para = window.rfind("\n\n")
+            sent = max(window.rfind(p) for p in (". ", ".\n", "? ", "?\n", "! ", "!\n"))
+            if para >= 0:
+                brk = search_start + para + 2
+            elif sent >= 0:
+                brk = search_start + sent + 2
+            elif window.rfind("\n") >= 0:
+                brk = search_start + window.rfind("\n") + 1
+            elif window.rfind(" ") >= 0:
+                brk = search_start + window.rfind(" ") + 1
+            else:
+                brk = -1
+            if brk > char_pos:
+                end_pos = brk
+        spans.append((char_pos, end_pos))
+        if end_pos >= len(content):
+            break
+        char_pos = max(char_pos + 1, end_pos - overlap_chars)
+    return spans
+
+
+class TestIterChunkSpans(unittest.TestCase):
+    def test_pinned_spans(self):
+        content = (
+            "Alpha beta. Gamma delta!\n\n"
+            "Epsilon zeta eta theta iota. Kappa\nlambda mu nu xi omicron pi rho."
+        )
+        expected = [(0, 26), (20, 49), (43, 71), (65, 92)]
+        self.assertEqual(list(iter_chunk_spans(content, 30, 6)), expected)
+        self.assertEqual(
+            [(c["pos"], c["pos"] + len(c["text"])) for c in chunk_document(content, 30, 6)],
+            expected,
+        )
+
+    def test_spans_match_reference_implementation(self):
+        import random
+
+        rng = random.Random(1234)
+        pieces = ["word", "the", "\u5411\u91cf", ". ", ".\n", "? ", "!\n", "\n", "\n\n", " ", "x" * 40]
+        for _ in range(500):
+            content = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 400)))
+            max_chars = rng.choice([16, 64, 300, 3200])
+            overlap = rng.choice([0, 5, max_chars // 4])
+            self.assertEqual(
+                list(iter_chunk_spans(content, max_chars, overlap)),
+                _reference_spans(content, max_chars, overlap),
+                (content, max_chars, overlap),
+            )
+
+    def test_spans_are_lazy(self):
+        spans = iter_chunk_spans("word " * 100_000)
+        self.assertEqual(next(spans)[0], 0)
+        self.assertEqual(list(iter_chunk_spans("")), [(0, 0)])
+
+
+class TestChunkMarkdown(unittest.TestCase):
+    DOC = (
+        "Intro text.\n\n"
+        "# Install\n\nSome words.\n\n"
+        "## Linux\n\n```bash\n# not a heading\napt install qmd\n```\n\nMore linux.\n\n"
+        "## macOS ##\nbrew install\n\n"
+        "# Usage\nRun it.\n"
+    )
+
+    def test_sections_carry_heading_paths(self):
+        chunks = chunk_markdown(self.DOC)
+        self.assertEqual(
+            [c["heading"] for c in chunks],
+            ["", "Install", "Install > Linux", "Install > macOS", "Usage"],
+        )
+        self.assertEqual([c["seq"] for c in chunks], list(range(len(chunks))))
+        for c in chunks:
+            self.assertEqual(self.DOC[c["pos"] : c["pos"] + len(c["text"])], c["text"])
+        # "# not a heading" inside the fence stays in the Linux section
+        self.assertIn("apt install qmd", chunks[2]["text"])
+
+    def test_code_fence_is_not_split(self):
+        chunks = chunk_markdown(self.DOC, max_chars=60, overlap_chars=10)
+        fence = [c for c in chunks if "```bash" in c["text"]]
+        self.assertEqual(len(fence), 1)
+        self.assertTrue(fence[0]["text"].rstrip().endswith("```"))
+        self.assertTrue(all(len(c["text"]) <= 60 for c in chunks))
+
+    def test_plain_text_matches_chunk_document(self):
+        content = "".join(f"Sentence number {i}. " for i in range(800))
+        plain = [{k: v for k, v in c.items() if k != "heading"} for c in chunk_markdown(content)]
+        self.assertEqual(plain, chunk_document(content))
+        self.assertEqual(chunk_markdown(""), [{"text": "", "pos": 0, "seq": 0, "heading": ""}])
+
+
+class TestChunkByTokens(unittest.TestCase):
+    def setUp(self):
+        self.tok = _RegexTokenizer()
+
+    def _count(self, text):
+        return len(self.tok.encode_batch([text])[0].offsets)
+
+    def test_chunks_fill_an_exact_token_budget(self):
+        # Chinese: ~1 token per char, far from the 4-chars-per-token estimate
+        content = "\n\n".join("向量检索把文档切成块。" * 8 for _ in range(30))
+        chunks = chunk_documents_by_tokens([content], self.tok, max_tokens=100, overlap_tokens=10)[0]
+        self.assertGreater(len(chunks), 1)
+        for c in chunks:
+            self.assertLessEqual(c["tokens"], 100)
+            self.assertEqual(c["tokens"], self._count(c["text"]))
+            self.assertEqual(content[c["pos"] : c["pos"] + len(c["text"])], c["text"])
+        # Paragraph boundaries are still preferred
+        self.assertTrue(all(c["text"].endswith("\n\n") for c in chunks[:-1]))
+        self.assertEqual(chunks[-1]["pos"] + len(chunks[-1]["text"]), len(content))
+
+    def test_documents_are_tokenized_in_one_batch(self):
+        docs = ["short doc", "word " * 300, ""]
+        out = chunk_documents_by_tokens(docs, self.tok, max_tokens=64, overlap_tokens=8)
+        self.assertEqual(self.tok.batches, [3])
+        self.assertEqual(out[0], [{"text": "short doc", "pos": 0, "seq": 0, "tokens": 2}])
+        self.assertEqual([c["seq"] for c in out[1]], list(range(len(out[1]))))
+        self.assertEqual(out[2], [{"text": "", "pos": 0, "seq": 0, "tokens": 0}])
+
+    def test_without_overlap_no_text_is_lost(self):
+        content = "alpha beta gamma delta " * 50
+        chunks = chunk_documents_by_tokens([content], self.tok, max_tokens=32, overlap_tokens=0)[0]
+        self.assertEqual("".join(c["text"] for c in chunks), content)
+
+
+class TestEmbeddingToBytes(unittest.TestCase):
+    def test_ndarray_and_list_match_struct_packing(self):
+        values = [0.1, -0.2, 3.5]
+        expected = struct.pack("<3f", *values)
+        self.assertEqual(embedding_to_bytes(values), expected)
+        self.assertEqual(embedding_to_bytes(np.array(values, dtype=np.float32)), expected)
+        # float64 and strided views are converted rather than misread
+        self.assertEqual(embedding_to_bytes(np.array(values, dtype=np.float64)), expected)
+        matrix = np.array([values, values], dtype=np.float32)
+        self.assertEqual(embedding_to_bytes(matrix[:, 0]), struct.pack("<2f", 0.1, 0.1))
+
+
+if __name__ == "__main__":
+    unittest.main()
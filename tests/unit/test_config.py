@@ -28,3 +28,10 @@ class TestConfig(unittest.TestCase):
         # Should return default config
         self.assertEqual(len(loaded.collections), 0)
         self.assertTrue(loaded.db_path.endswith("qmd.db"))
+
+    def test_unknown_chunk_strategy_is_rejected(self):
+        from pydantic import ValidationError
+
+        self.assertEqual(AppConfig(chunk_strategy="markdown").chunk_strategy, "markdown")
+        with self.assertRaises(ValidationError):
+            AppConfig(chunk_strategy="markdwon")
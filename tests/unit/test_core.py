@@ -67,5 +67,118 @@ class TestQMD(unittest.TestCase):
         self.assertGreater(len(results), 0)
         self.assertIn("Test", results[0]["title"])
 
+
+class TestIndexingWrites(unittest.TestCase):
+    """Bulk session and deletion sweep, each test on a fresh database."""
+
+    def setUp(self):
+        import tempfile
+
+        self.tmp = tempfile.mkdtemp()
+        self.test_dir = os.path.join(self.tmp, "files")
+        os.makedirs(self.test_dir)
+        for name in ("test1", "test2"):
+            with open(os.path.join(self.test_dir, f"{name}.md"), "w", encoding="utf-8") as f:
+                f.write(f"# {name}\nContent of {name}")
+        self.db = DatabaseManager(os.path.join(self.tmp, "qmd.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_bulk_upsert_documents(self):
+        crawler = Crawler(self.test_dir)
+        written = self.db.bulk_upsert_documents(
+            "bulk_col", crawler.scan(), commit_interval=1
+        )
+        self.assertEqual(written, 2)
+        self.assertEqual(len(self.db.list_files("bulk_col")), 2)
+
+        # Failed session rolls back its uncommitted tail
+        with self.assertRaises(RuntimeError):
+            with self.db.bulk_session(commit_interval=100) as session:
+                session.upsert_document("bulk_col", "tail.md", "tailhash", "Tail", "tail")
+                raise RuntimeError("boom")
+        self.assertIsNone(self.db.get_document_by_path("bulk_col", "tail.md"))
+
+    def test_deactivate_missing_documents(self):
+        from qmd.search.fts import FTSSearcher
+
+        crawler = Crawler(self.test_dir)
+        for rel_path, content, doc_hash, title in crawler.scan():
+            self.db.upsert_document("sweep_col", rel_path, doc_hash, title, content)
+        self.db.upsert_document("sweep_col", "gone.md", "gonehash", "Gone", "# Gone\nvanished")
+
+        swept = self.db.deactivate_missing_documents("sweep_col", crawler.seen_paths)
+        self.assertEqual(swept, 1)
+        self.assertIsNone(self.db.get_document_by_path("sweep_col", "gone.md"))
+        self.assertEqual(FTSSearcher(self.db).search("vanished"), [])
+        self.assertEqual(self.db.delete_inactive_documents(), 1)
+
+    def test_insert_embeddings_batch(self):
+        import struct
+
+        self.db.ensure_vec_table(dimensions=4)
+        self.db.upsert_document("vec_col", "a.md", "h1", "A", "alpha")
+        self.db.upsert_document("vec_col", "b.md", "h2", "B", "beta")
+        vec = struct.pack("4f", 1.0, 0.0, 0.0, 0.0)
+        rows = [("h1", 0, 0, "c1", vec), ("h1", 1, 100, "c2", vec), ("h2", 0, 0, "c3", vec)]
+        self.assertEqual(self.db.insert_embeddings_batch(rows, model="m"), 3)
+        # Re-writing the same chunks replaces rather than duplicates
+        self.assertEqual(self.db.insert_embeddings_batch(rows[:2], model="m"), 2)
+
+        conn = self.db._get_connection()
+        self.assertEqual(conn.execute("SELECT count(*) FROM content_vectors").fetchone()[0], 3)
+        self.assertEqual(conn.execute("SELECT count(*) FROM vectors_vec").fetchone()[0], 3)
+        self.assertEqual(self.db.insert_embeddings_batch([]), 0)
+
+    def test_chunks_share_content_addressed_vectors(self):
+        import struct
+
+        self.db.ensure_vec_table(dimensions=4)
+        self.db.upsert_document("vec_col", "a.md", "h1", "A", "alpha alpha")
+        self.db.upsert_document("vec_col", "b.md", "h2", "B", "alpha")
+        vec = struct.pack("4f", 1.0, 0.0, 0.0, 0.0)
+        # The same chunk twice in one batch, then reused by another document
+        self.db.insert_embeddings_batch(
+            [("h1", 0, 0, "c1", vec), ("h1", 1, 90, "c1", vec)], model="m"
+        )
+        self.db.insert_embeddings_batch([("h2", 0, 0, "c1", None, "Guide > Setup")], model="m")
+
+        conn = self.db._get_connection()
+        self.assertEqual(conn.execute("SELECT count(*) FROM content_vectors").fetchone()[0], 3)
+        self.assertEqual(conn.execute("SELECT count(*) FROM vectors_vec").fetchone()[0], 1)
+        headings = conn.execute("SELECT hash, heading FROM content_vectors ORDER BY hash, seq").fetchall()
+        self.assertEqual([tuple(r) for r in headings], [("h1", ""), ("h1", ""), ("h2", "Guide > Setup")])
+        self.assertEqual(self.db.get_existing_chunk_hashes(["c1", "c9", "c1"]), {"c1"})
+        self.assertEqual(self.db.get_existing_chunk_hashes([]), set())
+
+    def test_legacy_vec_table_is_rebuilt(self):
+        import struct
+
+        self.db.upsert_document("vec_col", "a.md", "h1", "A", "alpha")
+        with self.db.pool.writer() as conn:
+            conn.execute(
+                "CREATE VIRTUAL TABLE vectors_vec USING vec0("
+                "hash_seq TEXT PRIMARY KEY, embedding float[4] distance_metric=cosine)"
+            )
+            conn.execute(
+                "INSERT INTO vectors_vec VALUES (?, ?)",
+                ("h1_0", struct.pack("4f", 1.0, 0.0, 0.0, 0.0)),
+            )
+            conn.execute(
+                "INSERT INTO content_vectors (hash, seq, pos, model, embedded_at)"
+                " VALUES ('h1', 0, 0, 'm', 'now')"
+            )
+        self.db.ensure_vec_table(dimensions=4)
+
+        conn = self.db._get_connection()
+        sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'vectors_vec'"
+        ).fetchone()[0]
+        self.assertIn("chunk_hash", sql)
+        # Old vectors cannot be mapped to chunk hashes: everything is re-embedded
+        self.assertEqual(conn.execute("SELECT count(*) FROM content_vectors").fetchone()[0], 0)
+
+
 if __name__ == "__main__":
     unittest.main()
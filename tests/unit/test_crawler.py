@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from qmd.index.crawler import Crawler
+
+
+def _write(path, text, age_s=60):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Push mtime out of the racy window so the stat entry is cacheable
+    ts = time.time() - age_s
+    os.utime(path, (ts, ts))
+
+
+class TestIncrementalCrawler(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        _write(os.path.join(self.root, "a.md"), "# A\nalpha")
+        _write(os.path.join(self.root, "b.md"), "# B\nbeta")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _scan(self, stat_cache):
+        crawler = Crawler(self.root, stat_cache=stat_cache)
+        docs = list(crawler.scan())
+        return crawler, docs
+
+    def test_first_scan_adds_everything(self):
+        crawler, docs = self._scan({})
+        self.assertEqual(len(docs), 2)
+        self.assertEqual(crawler.stats.added, 2)
+        self.assertEqual(set(crawler.updated_stats), {"a.md", "b.md"})
+
+    def test_unchanged_files_are_skipped(self):
+        first, _ = self._scan({})
+        crawler, docs = self._scan(dict(first.updated_stats))
+        self.assertEqual(docs, [])
+        self.assertEqual(crawler.stats.unchanged, 2)
+        self.assertEqual(crawler.stats.indexed, 0)
+
+    def test_added_modified_deleted_counts(self):
+        first, _ = self._scan({})
+        _write(os.path.join(self.root, "a.md"), "# A\nalpha changed", age_s=30)
+        _write(os.path.join(self.root, "c.md"), "# C\ngamma")
+        os.remove(os.path.join(self.root, "b.md"))
+
+        crawler, docs = self._scan(dict(first.updated_stats))
+        self.assertEqual(sorted(d[0] for d in docs), ["a.md", "c.md"])
+        self.assertEqual(crawler.stats.added, 1)
+        self.assertEqual(crawler.stats.modified, 1)
+        self.assertEqual(crawler.stats.deleted, 1)
+        self.assertEqual(crawler.deleted_paths, ["b.md"])
+
+    def test_touched_file_with_same_content_is_unchanged(self):
+        first, _ = self._scan({})
+        _write(os.path.join(self.root, "a.md"), "# A\nalpha", age_s=30)
+        crawler, docs = self._scan(dict(first.updated_stats))
+        self.assertEqual(docs, [])
+        self.assertEqual(crawler.stats.unchanged, 2)
+        self.assertIn("a.md", crawler.updated_stats)
+
+    def test_recent_files_are_rehashed_once_not_readded(self):
+        path = os.path.join(self.root, "fresh.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# Fresh")
+        first, _ = self._scan({})
+        self.assertEqual(first.stats.added, 3)
+        # Stored, but racy: its stat can't be trusted yet
+        self.assertEqual(first.updated_stats["fresh.md"].size, -1)
+
+        cache = dict(first.updated_stats)
+        second, docs = self._scan(cache)
+        self.assertEqual(docs, [])
+        self.assertEqual((second.stats.added, second.stats.unchanged), (0, 3))
+
+        # Rewritten inside the same window: caught by the hash comparison
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# Fresh, edited")
+        cache.update(second.updated_stats)  # persisted entries are upserted
+        third, docs = self._scan(cache)
+        self.assertEqual([d[0] for d in docs], ["fresh.md"])
+        self.assertEqual((third.stats.added, third.stats.modified), (0, 1))
+
+    def test_hash_is_over_raw_bytes_and_newlines_are_normalized(self):
+        import hashlib
+
+        path = os.path.join(self.root, "crlf.md")
+        with open(path, "wb") as f:
+            f.write("# Crlf\r\n\u5411\u91cf\r\n".encode("utf-8"))
+        docs = {d[0]: d for d in Crawler(self.root).scan()}
+        _, content, doc_hash, title = docs["crlf.md"]
+        self.assertEqual(content, "# Crlf\n\u5411\u91cf\n")
+        self.assertEqual(title, "Crlf")
+        with open(path, "rb") as f:
+            self.assertEqual(doc_hash, hashlib.sha256(f.read()).hexdigest())
+        # LF-only files keep the digest of their decoded text
+        self.assertEqual(
+            docs["a.md"][2], hashlib.sha256("# A\nalpha".encode("utf-8")).hexdigest()
+        )
+
+
+class TestParallelCrawler(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for i in range(40):
+            _write(os.path.join(self.root, f"doc{i:02d}.md"), f"# Doc {i}\nbody {i}")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_parallel_matches_serial(self):
+        serial = list(Crawler(self.root, jobs=1).scan())
+        ordered = list(Crawler(self.root, jobs=4).scan())
+        unordered = Crawler(self.root, jobs=4, ordered=False)
+        docs = list(unordered.scan())
+
+        self.assertEqual(ordered, serial)
+        self.assertEqual(sorted(docs), sorted(serial))
+        self.assertTrue(unordered.completed)
+        self.assertEqual(len(unordered.seen_paths), 40)
+
+    def test_parallel_respects_stat_cache(self):
+        first = Crawler(self.root, stat_cache={}, jobs=4)
+        list(first.scan())
+        _write(os.path.join(self.root, "doc07.md"), "# Doc 7\nedited", age_s=30)
+
+        crawler = Crawler(self.root, stat_cache=dict(first.updated_stats), jobs=4)
+        docs = list(crawler.scan())
+        self.assertEqual([d[0] for d in docs], ["doc07.md"])
+        self.assertEqual(crawler.stats.modified, 1)
+        self.assertEqual(crawler.stats.unchanged, 39)
+
+
+if __name__ == "__main__":
+    unittest.main()
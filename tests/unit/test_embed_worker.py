@@ -0,0 +1,229 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import qmd.server._state as _state
+from qmd.database.manager import DatabaseManager
+from qmd.server._worker import embed_worker
+from qmd.utils.chunker import chunk_document
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(len(texts))
+        for i, _ in enumerate(texts):
+            vec = np.zeros(768, dtype=np.float32)
+            vec[i % 768] = 1.0
+            yield vec
+
+
+class TestStreamingEmbedWorker(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.tmp, "qmd.db"))
+        # several chunks, each with distinct text
+        self.long_doc = "".join(f"Sentence number {i}. " for i in range(800))
+        self.db.upsert_document("a", "long.md", "h-long", "Long", self.long_doc)
+        self.db.upsert_document("a", "short.md", "h-short", "Short", "short body")
+        # Same content under another path is embedded once
+        self.db.upsert_document("b", "copy.md", "h-short", "Short", "short body")
+        self.db.upsert_document("b", "other.md", "h-other", "Other", "other body")
+
+        self._saved = (_state.db, _state.model)
+        _state.db = self.db
+        _state.model = _FakeModel()
+        job = _state.embed_job
+        job.collection, job.force, job.hashes = None, False, None
+        job.total_chunks = job.done_chunks = job.total_docs = job.done_docs = 0
+        job.error, job._queues = None, []
+
+    def tearDown(self):
+        _state.db, _state.model = self._saved
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _vector_count(self):
+        conn = self.db._get_connection()
+        return conn.execute("SELECT count(*) FROM content_vectors").fetchone()[0]
+
+    def test_precount_estimates_chunker(self):
+        docs, chunks = self.db.count_content_for_embedding()
+        self.assertEqual(docs, 3)
+        # Estimated from length(doc); boundary snapping may add a chunk or so
+        self.assertAlmostEqual(chunks, len(chunk_document(self.long_doc)) + 2, delta=2)
+        self.assertEqual(self.db.count_content_for_embedding(collection="b"), (2, 2))
+        self.assertEqual(self.db.count_content_for_embedding(hashes=["h-other"]), (1, 1))
+
+    def test_content_is_paged_by_hash(self):
+        pages = list(self.db.iter_content_for_embedding(page_size=1))
+        self.assertEqual([h for h, _ in pages], ["h-long", "h-other", "h-short"])
+        self.assertEqual(list(self.db.iter_content_for_embedding(page_size=2)), pages)
+
+    def test_producer_releases_its_reader(self):
+        from qmd.server._worker import ChunkProducer
+
+        self.db.ensure_vec_table(768)
+        opened = len(self.db.pool._connections)
+        for _ in range(5):
+            producer = ChunkProducer(self.db)
+            producer.start()
+            while producer.get() is not None:
+                pass
+            producer.join()
+        # One producer thread per job, none left pinned in the pool
+        self.assertEqual(len(self.db.pool._connections), opened)
+
+    def test_worker_streams_all_chunks(self):
+        asyncio.run(embed_worker())
+        job = _state.embed_job
+        self.assertIsNone(job.error)
+        expected = len(chunk_document(self.long_doc)) + 2
+        self.assertEqual(job.done_chunks, expected)
+        self.assertEqual(job.total_chunks, expected)
+        self.assertEqual(job.done_docs, 3)
+        self.assertEqual(self._vector_count(), expected)
+        self.assertEqual(self.db.count_content_for_embedding(), (0, 0))
+
+    def test_small_token_budget_splits_long_and_short_chunks(self):
+        import functools
+        from unittest import mock
+
+        import qmd.server._worker as worker
+
+        producer = functools.partial(worker.ChunkProducer, max_tokens=2000)
+        with mock.patch.object(worker, "ChunkProducer", producer):
+            asyncio.run(embed_worker())
+        job = _state.embed_job
+        self.assertIsNone(job.error)
+        self.assertEqual(job.done_docs, 3)
+        # Short bodies share the first batch; full-size chunks come a couple at a time
+        calls = _state.model.calls
+        self.assertGreater(len(calls), 2)
+        self.assertLessEqual(max(calls[1:]), 2)
+        self.assertEqual(sum(calls), len(chunk_document(self.long_doc)) + 2)
+        self.assertEqual(self._vector_count(), sum(calls))
+
+    def test_edited_document_reuses_unchanged_chunks(self):
+        asyncio.run(embed_worker())
+        embedded = sum(_state.model.calls)
+        self.assertEqual(embedded, len(chunk_document(self.long_doc)) + 2)
+
+        # Append a paragraph: only the chunks touching the edit are new
+        edited = self.long_doc + "\n\nA brand new closing paragraph."
+        self.db.upsert_document("a", "long.md", "h-long-2", "Long", edited)
+        _state.model.calls.clear()
+        job = _state.embed_job
+        job.total_chunks = job.done_chunks = job.total_docs = job.done_docs = 0
+        asyncio.run(embed_worker())
+        self.assertIsNone(job.error)
+        self.assertEqual(job.done_docs, 1)
+        self.assertEqual(job.done_chunks, len(chunk_document(edited)))
+        self.assertLessEqual(sum(_state.model.calls), 2)
+        conn = self.db._get_connection()
+        rows = conn.execute(
+            "SELECT count(*) FROM content_vectors WHERE hash = 'h-long-2'"
+        ).fetchone()[0]
+        self.assertEqual(rows, len(chunk_document(edited)))
+
+    def test_batch_chunker_replaces_char_chunking(self):
+        from unittest import mock
+
+        groups = []
+
+        def chunker(contents):
+            groups.append(len(contents))
+            return [[{"text": c[:50], "pos": 0, "seq": 0, "tokens": 7}] for c in contents]
+
+        with mock.patch.object(_state, "get_chunker", return_value=chunker):
+            asyncio.run(embed_worker())
+        self.assertIsNone(_state.embed_job.error)
+        self.assertEqual(groups, [3])  # all pending docs in one call
+        self.assertEqual(_state.embed_job.done_docs, 3)
+        self.assertEqual(self._vector_count(), 3)
+
+    def test_markdown_strategy_stores_heading_paths(self):
+        from types import SimpleNamespace
+        from unittest import mock
+
+        self.db.upsert_document("b", "guide.md", "h-md", "Guide", "# Guide\nhi\n## Setup\nrun\n")
+        _state.embed_job.hashes = ["h-md"]
+        with mock.patch.object(_state, "config", SimpleNamespace(chunk_strategy="markdown")):
+            asyncio.run(embed_worker())
+        self.assertIsNone(_state.embed_job.error)
+        conn = self.db._get_connection()
+        rows = conn.execute(
+            "SELECT seq, heading, len FROM content_vectors WHERE hash = 'h-md' ORDER BY seq"
+        ).fetchall()
+        self.assertEqual(
+            [tuple(r) for r in rows], [(0, "Guide", 11), (1, "Guide > Setup", 13)]
+        )
+
+    def test_worker_respects_hash_filter(self):
+        _state.embed_job.hashes = ["h-other"]
+        asyncio.run(embed_worker())
+        self.assertEqual(_state.embed_job.done_docs, 1)
+        self.assertEqual(self._vector_count(), 1)
+
+    def test_writer_failure_is_reported(self):
+        from unittest import mock
+
+        with mock.patch.object(
+            self.db, "insert_embeddings_batch", side_effect=RuntimeError("disk full")
+        ):
+            asyncio.run(embed_worker())
+        self.assertEqual(_state.embed_job.error, "disk full")
+        self.assertEqual(self._vector_count(), 0)
+
+    def test_complete_event_reports_idle_time(self):
+        import json
+
+        events = []
+
+        async def run():
+            q = asyncio.Queue()
+            _state.embed_job._queues = [q]
+            await embed_worker()
+            while not q.empty():
+                item = q.get_nowait()
+                if item is not None:
+                    events.append(json.loads(item))
+
+        asyncio.run(run())
+        self.assertEqual(events[-1]["status"], "complete")
+        self.assertEqual(
+            set(events[-1]["timings"]),
+            {"model_busy_s", "model_idle_s", "writer_busy_s", "writer_idle_s"},
+        )
+
+
+class TestProcessEmbeddings(unittest.TestCase):
+    def test_returns_float32_matrix_and_scrubs_non_finite(self):
+        from qmd.server._endpoints import GPU_EMBED_BATCH_SIZE, process_embeddings
+
+        class _NanModel:
+            def embed(self, texts):
+                for _ in texts:
+                    yield np.array([np.nan, np.inf, 1.0], dtype=np.float32)
+
+        saved = _state.model
+        _state.model = _NanModel()
+        try:
+            texts = ["t"] * (GPU_EMBED_BATCH_SIZE + 3)
+            out = asyncio.run(process_embeddings(texts))
+        finally:
+            _state.model = saved
+        self.assertEqual(out.dtype, np.float32)
+        self.assertEqual(out.shape, (len(texts), 3))
+        self.assertTrue(np.isfinite(out).all())
+        self.assertEqual(out[0].tolist(), [0.0, 0.0, 1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from qmd.database.manager import DatabaseManager
+from qmd.database.pool import ConnectionPool
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.pool = ConnectionPool(os.path.join(self.tmp, "pool.db"))
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_reader_is_reused_per_thread(self):
+        self.assertIs(self.pool.reader(), self.pool.reader())
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(self.pool.reader()))
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], self.pool.reader())
+
+    def test_dead_thread_readers_are_closed(self):
+        for _ in range(20):
+            t = threading.Thread(target=self.pool.reader)
+            t.start()
+            t.join()
+        self.pool.reader()
+        # Only the live (main) thread's reader remains registered
+        self.assertEqual(len(self.pool._connections), 1)
+
+    def test_release_reader_closes_connection(self):
+        conn = self.pool.reader()
+        self.pool.release_reader()
+        self.assertEqual(self.pool._connections, [])
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertIsNot(self.pool.reader(), conn)
+
+    def test_close_closes_other_threads_readers(self):
+        other = []
+        t = threading.Thread(target=lambda: other.append(self.pool.reader()))
+        t.start()
+        t.join()
+        self.pool.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            other[0].execute("SELECT 1")
+
+    def test_connections_have_sqlite_vec_and_wal(self):
+        conn = self.pool.reader()
+        self.assertTrue(conn.execute("SELECT vec_version()").fetchone()[0])
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_writer_is_single_and_rolls_back(self):
+        with self.pool.writer() as w1:
+            w1.execute("CREATE TABLE t (x INTEGER)")
+        with self.pool.writer() as w2:
+            self.assertIs(w1, w2)
+
+        with self.assertRaises(RuntimeError):
+            with self.pool.writer() as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                raise RuntimeError("boom")
+        self.assertEqual(self.pool.reader().execute("SELECT count(*) FROM t").fetchone()[0], 0)
+
+    def test_nested_writer_joins_outer_transaction(self):
+        with self.pool.writer() as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+        with self.assertRaises(RuntimeError):
+            with self.pool.writer() as outer:
+                with self.pool.writer() as inner:
+                    inner.execute("INSERT INTO t VALUES (1)")
+                outer.execute("INSERT INTO t VALUES (2)")
+                raise RuntimeError("boom")
+        self.assertEqual(self.pool.reader().execute("SELECT count(*) FROM t").fetchone()[0], 0)
+
+
+class TestDatabaseManagerPool(unittest.TestCase):
+    def test_manager_reuses_pooled_connections(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            db = DatabaseManager(os.path.join(tmp, "qmd.db"))
+            self.assertIs(db._get_connection(), db._get_connection())
+            db.upsert_document("c", "a.md", "h1", "A", "alpha")
+            self.assertEqual(db.get_stats()["documents"], 1)
+            db.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
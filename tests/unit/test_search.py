@@ -55,3 +55,120 @@ def test_hybrid_search(db, tmp_path):
     results = hybrid.search("Python", collection="test")
     assert len(results) > 0
     assert results[0]["title"] == "Title 1"
+
+def test_search_many_embeds_once(db):
+    from qmd.utils.chunker import embedding_to_bytes
+
+    db.ensure_vec_table(dimensions=2)
+    db.add_collection("test", "path", "*.md")
+    db.upsert_document("test", "x.md", "hx", "X", "about x")
+    db.upsert_document("test", "y.md", "hy", "Y", "about y")
+    db.insert_embeddings_batch(
+        [
+            ("hx", 0, 0, "cx", embedding_to_bytes([1.0, 0.0]), "X > Intro"),
+            ("hy", 0, 0, "cy", embedding_to_bytes([0.0, 1.0])),
+        ],
+        model="m",
+    )
+    axes = {"x": [1.0, 0.0], "y": [0.0, 1.0]}
+    batches = []
+
+    def embed_batch(texts):
+        batches.append(list(texts))
+        return [axes[t] for t in texts]
+
+    vs = VectorSearch(pool=db.pool, embed_fn=lambda t: axes[t], embed_batch_fn=embed_batch)
+    many = vs.search_many(["x", "y"], limit=2)
+
+    assert batches == [["x", "y"]]
+    assert [r.title for r in many[0]] == ["X", "Y"]
+    assert [r.heading for r in many[0]] == ["X > Intro", ""]
+    assert [r.title for r in many[1]] == ["Y", "X"]
+    assert [[r.score for r in rs] for rs in many] == [
+        [r.score for r in vs.search(q, limit=2)] for q in ["x", "y"]
+    ]
+    assert vs.search_many([]) == []
+
+
+def test_vector_hit_is_best_matching_chunk(db):
+    from qmd.search.rerank import rerank_text
+    from qmd.utils.chunker import embedding_to_bytes
+
+    db.ensure_vec_table(dimensions=2)
+    db.add_collection("test", "path", "*.md")
+    body = "# Intro\nhello\n# Setup\nrun qmd\n"
+    db.upsert_document("test", "doc.md", "hd", "Doc", body)
+    setup = body.index("# Setup")
+    db.insert_embeddings_batch(
+        [
+            ("hd", 0, 0, "c0", embedding_to_bytes([1.0, 0.0]), "Intro", setup),
+            ("hd", 1, setup, "c1", embedding_to_bytes([0.0, 1.0]), "Setup", len(body) - setup),
+        ],
+        model="m",
+    )
+    vs = VectorSearch(pool=db.pool, embed_fn=lambda t: [0.1, 1.0])
+    (hit,) = vs.search("setup", limit=5)
+
+    # One hit per document, represented by its nearest chunk
+    assert (hit.chunk_seq, hit.chunk_pos, hit.chunk_len) == (1, setup, len(body) - setup)
+    assert hit.snippet == "# Setup\nrun qmd\n"
+    assert hit.heading == "Setup"
+    assert rerank_text(hit.chunk_fields()) == hit.snippet
+
+
+def test_hybrid_legs_run_concurrently(db):
+    import threading
+    import time
+
+    hybrid = HybridSearcher(db, embed_fn=lambda t: [1.0, 0.0])
+    both_running = threading.Barrier(2, timeout=5)
+
+    def leg(*args, **kwargs):
+        both_running.wait()  # deadlocks (times out) if the legs run serially
+        time.sleep(0.05)
+        return []
+
+    hybrid.fts.search = leg
+    hybrid.vector.search = leg
+    timings = {}
+    assert hybrid.search("python", timings=timings) == []
+    assert set(timings) == {"bm25_s", "vector_s"}
+    assert all(t >= 0.05 for t in timings.values())
+
+
+def test_hybrid_searchers_share_the_bm25_executor(db):
+    first = HybridSearcher(db, embed_fn=lambda t: [1.0, 0.0])
+    second = HybridSearcher(db, embed_fn=lambda t: [1.0, 0.0])
+    assert first.executor is second.executor
+
+
+def test_legacy_vector_table_is_migrated_on_open(tmp_path):
+    from qmd.utils.chunker import embedding_to_bytes
+
+    db_path = str(tmp_path / "legacy.db")
+    legacy = DatabaseManager(db_path)
+    legacy.upsert_document("test", "x.md", "hx", "X", "about x")
+    with legacy.pool.writer() as conn:
+        conn.execute(
+            "CREATE VIRTUAL TABLE vectors_vec USING vec0("
+            "hash_seq TEXT PRIMARY KEY, embedding float[2])"
+        )
+        conn.execute(
+            "INSERT INTO vectors_vec VALUES (?, ?)", ("hx_0", embedding_to_bytes([1.0, 0.0]))
+        )
+        conn.execute(
+            "INSERT INTO content_vectors (hash, seq, pos, model, embedded_at) "
+            "VALUES ('hx', 0, 0, 'm', datetime('now'))"
+        )
+    legacy.close()
+
+    # Search works right after upgrading, without running an embed first
+    db = DatabaseManager(db_path)
+    vs = VectorSearch(pool=db.pool, embed_fn=lambda t: [1.0, 0.0])
+    assert vs.search("x", limit=5) == []
+    assert db.count_content_for_embedding() == (1, 1)
+    sql = db.pool.reader().execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'vectors_vec'"
+    ).fetchone()[0]
+    assert "chunk_hash" in sql and "float[2]" in sql
+    db.close()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from qmd.cli import _index_collection
+from qmd.database.manager import DatabaseManager
+from qmd.index.watcher import Debouncer, StatSnapshot, matches_glob
+from qmd.models.config import CollectionConfig
+
+
+def _write(path, text, age_s=60):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    ts = time.time() - age_s
+    os.utime(path, (ts, ts))
+
+
+class TestWatcherPrimitives(unittest.TestCase):
+    def test_matches_glob(self):
+        self.assertTrue(matches_glob("a.md", "**/*.md"))
+        self.assertTrue(matches_glob("sub/dir/a.md", "**/*.md"))
+        self.assertFalse(matches_glob("a.txt", "**/*.md"))
+
+    def test_debouncer_waits_for_quiet_period(self):
+        d = Debouncer(delay=1.0)
+        d.add("notes", "a.md", now=10.0)
+        d.add("notes", "b.md", now=10.5)
+        self.assertFalse(d.ready(now=11.0))
+        self.assertTrue(d.ready(now=11.5))
+        self.assertEqual(d.drain(), {"notes": {"a.md", "b.md"}})
+        self.assertFalse(d.ready(now=20.0))
+
+    def test_stat_snapshot_reports_touched_paths(self):
+        root = tempfile.mkdtemp()
+        try:
+            _write(os.path.join(root, "a.md"), "a")
+            _write(os.path.join(root, "b.md"), "b")
+            snap = StatSnapshot(root, "**/*.md")
+            self.assertEqual(snap.poll(), set())
+
+            _write(os.path.join(root, "a.md"), "a changed", age_s=30)
+            _write(os.path.join(root, "c.md"), "c")
+            os.remove(os.path.join(root, "b.md"))
+            self.assertEqual(snap.poll(), {"a.md", "b.md", "c.md"})
+            self.assertEqual(snap.poll(), set())
+        finally:
+            shutil.rmtree(root)
+
+
+class TestPartialReindex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp, "docs")
+        os.makedirs(self.root)
+        for name in ("a.md", "b.md", "c.md"):
+            _write(os.path.join(self.root, name), f"# {name}\n{name}")
+        self.db = DatabaseManager(os.path.join(self.tmp, "qmd.db"))
+        self.col = CollectionConfig(name="docs", path=self.root)
+        _index_collection(self.col, self.db)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_only_touched_paths_are_reindexed(self):
+        _write(os.path.join(self.root, "a.md"), "# a\nedited", age_s=30)
+        _write(os.path.join(self.root, "c.md"), "# c\nedited too", age_s=30)
+        os.remove(os.path.join(self.root, "b.md"))
+
+        # c.md changed on disk but was not reported, so it is left alone
+        stats = _index_collection(self.col, self.db, paths={"a.md", "b.md"})
+        self.assertEqual(stats.modified, 1)
+        self.assertEqual(stats.deleted, 1)
+        self.assertEqual(len(stats.hashes), 1)
+
+        active = {d["path"]: d for d in self.db.list_files("docs")}
+        self.assertEqual(set(active), {"a.md", "c.md"})
+        self.assertEqual(active["a.md"]["hash"], stats.hashes[0])
+
+
+if __name__ == "__main__":
+    unittest.main()